@@ -2,9 +2,11 @@ import streamlit as st
 
 home = st.Page("app_home.py", title="Home", icon="🏠", default=True)
 upload = st.Page("pages/1_Upload.py", title="Upload Resumes", icon="📤")
+jobs = st.Page("pages/7_Jobs.py", title="Upload Jobs", icon="⏳")
 search = st.Page("pages/2_Search.py", title="Search Candidates", icon="🔍")
 shortlist = st.Page("pages/4_Shortlist.py", title="Shortlisted", icon="⭐")
 database = st.Page("pages/5_Database.py", title="Database", icon="🗄️")
+metrics = st.Page("pages/6_Metrics.py", title="Metrics", icon="📈")
 
-pg = st.navigation([home, upload, search, shortlist, database])
+pg = st.navigation([home, upload, jobs, search, shortlist, database, metrics])
 pg.run()
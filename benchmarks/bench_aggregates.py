@@ -0,0 +1,87 @@
+"""
+Page-load cost of the batch / role listings: client-side vs. server-side aggregation.
+
+    python -m benchmarks.bench_aggregates --rows 1000 10000 100000
+
+Runs against a local SQLite stand-in for the resumes table. "client" is the
+fallback path (fetch every row, aggregate in Python); "server" is the
+GROUP BY the batch_stats view performs. Transfer size is the JSON payload
+PostgREST would send for each result set. The server-side cost should stay
+roughly flat as rows grow, bounded by the number of batches.
+"""
+import argparse
+import json
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+from benchmarks.common import emit, percentiles, timed
+from lib.db import aggregate_batch_stats, distinct_in_order
+
+
+def build_table(rows: int, batches: int, seed: int) -> sqlite3.Connection:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(":memory:")
+    conn.execute("create table resumes (batch_name text, upload_date text)")
+    start = datetime(2026, 1, 1)
+    conn.executemany(
+        "insert into resumes values (?, ?)",
+        (
+            (f"batch-{rng.randrange(batches)}", (start + timedelta(seconds=rng.randrange(10**7))).isoformat())
+            for _ in range(rows)
+        ),
+    )
+    conn.execute("create index resumes_batch_idx on resumes (batch_name, upload_date)")
+    conn.commit()
+    return conn
+
+
+def client_side(conn: sqlite3.Connection) -> tuple[list, int]:
+    data = [
+        {"batch_name": b, "upload_date": d}
+        for b, d in conn.execute("select batch_name, upload_date from resumes order by upload_date desc")
+    ]
+    payload = len(json.dumps(data))
+    aggregate_batch_stats(data)
+    distinct_in_order(data, "batch_name")
+    return data, payload
+
+
+def server_side(conn: sqlite3.Connection) -> tuple[list, int]:
+    data = [
+        {"batch_name": b, "count": c, "latest": l}
+        for b, c, l in conn.execute(
+            "select batch_name, count(*), max(upload_date) as latest "
+            "from resumes group by batch_name order by latest desc"
+        )
+    ]
+    return data, len(json.dumps(data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--batches", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        conn = build_table(rows, args.batches, args.seed)
+        entry = {"rows": rows, "batches": args.batches}
+        for name, fn in (("client", client_side), ("server", server_side)):
+            samples = []
+            payload = 0
+            for _ in range(args.repeat):
+                elapsed, (_, payload) = timed(fn, conn)
+                samples.append(elapsed)
+            entry[name] = {"payload_bytes": payload, **percentiles(samples)}
+        results.append(entry)
+        conn.close()
+    emit({"benchmark": "aggregates", "results": results}, args.json)
+
+
+if __name__ == "__main__":
+    main()
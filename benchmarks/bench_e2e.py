@@ -0,0 +1,275 @@
+"""
+Headless load test of the Upload and Search flows against the fake services.
+
+    python -m benchmarks.bench_e2e --files 40 --concurrency 1 4 8 --queries 20 \\
+        --gemini-latency-ms 400 --db-latency-ms 30 --rate-limit-rate 0.02
+
+Runs the same lib calls the pages make, with lib.fakes standing in for
+Supabase and Gemini (configurable latency and 429 injection), so nothing
+leaves the machine. Local caches and indexes go to a temporary directory.
+
+Upload: synthetic resumes (benchmarks.synthetic_pdfs), once per concurrency
+level, each with fresh content so no dedup shortcut applies. With
+--upload-mode queue (the default, as the Upload page does it) they are queued
+with jobs.create_job and drained by --workers job_worker threads; per-file
+latency runs from the file being spooled to its outcome being recorded.
+--upload-mode direct calls ingest_files in-process instead; per-file latency
+runs from the file being read to its result being yielded. Each run reports
+the service calls it made.
+
+Search: distinct job queries through get_query_embedding → hybrid_search →
+select_for_llm → score_candidates (or the streaming scorer) → get_signed_urls,
+run by --search-users concurrent users. Reports latency per stage.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import emit, percentiles
+from benchmarks.synthetic_pdfs import LAYOUTS, make_resume_pdf
+
+_SKILLS = (
+    "python java kubernetes aws terraform postgres react typescript spark kafka airflow "
+    "docker golang rust pandas pytorch tensorflow graphql redis"
+).split()
+_ROLES = ["backend engineer", "data engineer", "ml engineer", "platform engineer", "frontend developer"]
+
+
+class _NamedBytes(io.BytesIO):
+    """Upload stand-in: .name and .read() like Streamlit's UploadedFile, noting when it is first read."""
+
+    def __init__(self, name: str, data: bytes, read_times: dict):
+        super().__init__(data)
+        self.name = name
+        self._read_times = read_times
+
+    def read(self, *args):
+        self._read_times.setdefault(self.name, time.time())
+        return super().read(*args)
+
+
+def _configure_env(args, workdir: str):
+    """Settings read at import time by lib modules, so set before importing them."""
+    os.environ["FAKE_SERVICES"] = "1"
+    os.environ["EMBED_CACHE_PATH"] = os.path.join(workdir, "embeddings.sqlite3")
+    os.environ["SCORE_CACHE_PATH"] = os.path.join(workdir, "scores.sqlite3")
+    os.environ["LEXICAL_INDEX_PATH"] = os.path.join(workdir, "lexical_index.sqlite3")
+    os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+    os.environ["JOBS_DB_PATH"] = os.path.join(workdir, "jobs.sqlite3")
+    os.environ["JOBS_SPOOL_DIR"] = os.path.join(workdir, "job_spool")
+    os.environ["GEMINI_REQUESTS_PER_MINUTE"] = str(args.gemini_rpm)
+    os.environ["GEMINI_MAX_CONCURRENCY"] = str(args.gemini_concurrency)
+    os.environ["PDF_BACKEND"] = args.pdf_backend
+    os.environ["PDF_WORKERS"] = str(args.pdf_workers)
+    os.environ["SEARCH_BACKEND"] = args.search_backend
+
+
+def _make_uploads(files: int, seed: int) -> tuple[list[_NamedBytes], dict[str, float]]:
+    rng = random.Random(seed)
+    read_times: dict[str, float] = {}
+    uploads = []
+    for i in range(files):
+        layout = LAYOUTS[i % len(LAYOUTS)]
+        data, _ = make_resume_pdf(layout, rng.randrange(10**9))
+        uploads.append(_NamedBytes(f"{layout}_{i:04d}.pdf", data, read_times))
+    return uploads, read_times
+
+
+def _upload_summary(concurrency: int, files: int, outcomes: list[tuple[str, str | None, float]], wall: float) -> dict:
+    """outcomes: (state, error, latency) per file, state one of ok / duplicate / error."""
+    counts = Counter(state for state, _, _ in outcomes)
+    return {
+        "concurrency": concurrency,
+        "files": files,
+        **{state: counts[state] for state in ("ok", "duplicate", "error")},
+        "wall_seconds": wall,
+        "files_per_sec": files / wall,
+        "latency": percentiles([latency for _, _, latency in outcomes]),
+        "sample_errors": [error for _, error, _ in outcomes if error][:5],
+    }
+
+
+def run_upload(files: int, concurrency: int, seed: int) -> dict:
+    from lib.ingest import ingest_files
+
+    uploads, read_times = _make_uploads(files, seed)
+    outcomes = []
+    start = time.time()
+    for result in ingest_files(uploads, batch_name=f"bench-{seed}", concurrency=concurrency):
+        state = "error" if result["error"] else "duplicate" if result["duplicate"] else "ok"
+        outcomes.append((state, result["error"], time.time() - read_times.get(result["file_name"], start)))
+    return _upload_summary(concurrency, files, outcomes, time.time() - start)
+
+
+def run_upload_queued(files: int, workers: int, concurrency: int, seed: int, poll_seconds: float) -> dict:
+    """Queue the files as one job, as the Upload page does, and let `workers` job_worker threads drain it."""
+    from lib import job_worker, jobs
+
+    job_worker.POLL_SECONDS = poll_seconds
+    uploads, read_times = _make_uploads(files, seed)
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=job_worker.run, args=(f"bench-{seed}-{w}", concurrency), kwargs={"stop": stop})
+        for w in range(workers)
+    ]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    job_id = jobs.create_job(f"bench-{seed}", uploads)
+    spooled = time.time()
+    while next(j for j in jobs.list_jobs() if j["job_id"] == job_id)["status"] != "done":
+        time.sleep(0.05)
+    wall = time.time() - start
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    states = {"done": "ok", "duplicate": "duplicate", "error": "error"}
+    outcomes = [
+        (states.get(f["state"], "error"), f["error"], f["updated_at"] - read_times.get(f["file_name"], start))
+        for f in jobs.job_files(job_id)
+    ]
+    return {
+        **_upload_summary(concurrency, files, outcomes, wall),
+        "workers": workers,
+        "spool_seconds": spooled - start,
+    }
+
+
+def run_search(queries: list[str], users: int, stream: bool) -> dict:
+    from lib.ai import get_query_embedding, score_candidates, score_candidates_stream
+    from lib.cascade import POOL_SIZE, select_for_llm
+    from lib.search import hybrid_search
+    from lib.storage import get_signed_urls
+
+    def one(query: str) -> dict:
+        times = {}
+        t0 = time.perf_counter()
+        embedding = get_query_embedding(query)
+        t1 = time.perf_counter()
+        candidates = hybrid_search(query, embedding, limit=POOL_SIZE)
+        t2 = time.perf_counter()
+        selected, _ = select_for_llm(query, candidates)
+        t3 = time.perf_counter()
+        if stream:
+            scored = []
+            for result in score_candidates_stream(query, selected):
+                if not scored:
+                    times["first_score"] = time.perf_counter() - t3
+                scored.append(result)
+        else:
+            scored = score_candidates(query, selected)
+        t4 = time.perf_counter()
+        by_id = {c["id"]: c for c in selected}
+        get_signed_urls([by_id.get(r.get("id"), {}).get("storage_path") for r in scored])
+        t5 = time.perf_counter()
+        times.update({
+            "embed_query": t1 - t0,
+            "retrieve": t2 - t1,
+            "cascade": t3 - t2,
+            "score": t4 - t3,
+            "sign_urls": t5 - t4,
+            "total": t5 - t0,
+        })
+        return {"times": times, "results": len(scored), "failed": sum(1 for r in scored if "reason" in r)}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, users)) as pool:
+        runs = list(pool.map(one, queries))
+    wall = time.perf_counter() - start
+    stages = sorted({stage for r in runs for stage in r["times"]})
+    return {
+        "users": users,
+        "queries": len(queries),
+        "stream": stream,
+        "wall_seconds": wall,
+        "queries_per_sec": len(queries) / wall,
+        "results_per_query": sum(r["results"] for r in runs) / max(1, len(runs)),
+        "failed_scores": sum(r["failed"] for r in runs),
+        "latency": {
+            stage: percentiles([r["times"][stage] for r in runs if stage in r["times"]])
+            for stage in stages
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=40, help="resumes per upload run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="files in flight per worker")
+    parser.add_argument("--upload-mode", choices=["queue", "direct"], default="queue")
+    parser.add_argument("--workers", type=int, default=2, help="job workers in queue mode")
+    parser.add_argument("--worker-poll-seconds", type=float, default=0.1, help="idle job worker poll interval")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--search-users", type=int, default=4)
+    parser.add_argument("--stream", action="store_true", help="use the streaming scorer")
+    parser.add_argument("--search-backend", choices=["rpc", "local"], default="rpc")
+    parser.add_argument("--db-latency-ms", type=float, default=20)
+    parser.add_argument("--storage-latency-ms", type=float, default=50)
+    parser.add_argument("--gemini-latency-ms", type=float, default=300)
+    parser.add_argument("--jitter", type=float, default=0.3, help="± fraction of latency")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="probability of a Gemini 429")
+    parser.add_argument("--gemini-rpm", type=float, default=6000)
+    parser.add_argument("--gemini-concurrency", type=int, default=8)
+    parser.add_argument("--pdf-backend", default="pdfium")
+    parser.add_argument("--pdf-workers", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    _configure_env(args, workdir)
+
+    from lib import ai, fakes
+
+    ms = 1 / 1000
+    supabase, gemini = fakes.install(
+        db=fakes.FaultProfile(args.db_latency_ms * ms, args.jitter, seed=args.seed),
+        storage=fakes.FaultProfile(args.storage_latency_ms * ms, args.jitter, seed=args.seed + 1),
+        gemini=fakes.FaultProfile(
+            args.gemini_latency_ms * ms, args.jitter, args.rate_limit_rate, retry_after=0.2, seed=args.seed + 2
+        ),
+    )
+
+    upload = []
+    for i, concurrency in enumerate(args.concurrency):
+        seed = args.seed * 1000 + i
+        before = supabase.calls + gemini.calls
+        if args.upload_mode == "queue":
+            run = run_upload_queued(args.files, args.workers, concurrency, seed, args.worker_poll_seconds)
+        else:
+            run = run_upload(args.files, concurrency, seed)
+        run["service_calls"] = dict((supabase.calls + gemini.calls) - before)
+        upload.append(run)
+
+    rng = random.Random(args.seed)
+    queries = [
+        f"{rng.choice(['Senior', 'Lead', 'Staff', 'Junior'])} {rng.choice(_ROLES)} with "
+        f"{', '.join(rng.sample(_SKILLS, 3))} #{i}"
+        for i in range(args.queries)
+    ]
+    search = run_search(queries, args.search_users, args.stream)
+
+    emit(
+        {
+            "benchmark": "e2e",
+            "python": sys.version.split()[0],
+            "settings": {k: v for k, v in vars(args).items() if k != "json"},
+            "upload": upload,
+            "search": search,
+            "service_calls": {"supabase": dict(supabase.calls), "gemini": dict(gemini.calls)},
+            "rate_limiter": ai.rate_limiter_stats(),
+        },
+        args.json,
+    )
+
+
+if __name__ == "__main__":
+    main()
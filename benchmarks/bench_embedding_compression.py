@@ -0,0 +1,136 @@
+"""
+Recall vs. size of compact embeddings for two-phase vector search.
+
+    python -m benchmarks.bench_embedding_compression --n 20000
+    python -m benchmarks.bench_embedding_compression --from-db   # stored resume embeddings
+
+For each compact dimension and precision the local VectorIndex is given that
+compact copy, and the run reports bytes per vector, recall@k of the coarse
+pass alone and after exact rescoring of rescore_factor × k candidates
+(against exact float32 search over the full vectors), and search latency.
+
+The synthetic corpus mimics Matryoshka-trained embeddings such as
+gemini-embedding-001's, whose leading dimensions carry most of the signal:
+documents are noisy members of topic clusters with per-dimension spread
+decaying along the vector, and queries are perturbed documents. --from-db
+needs SUPABASE_URL / SUPABASE_SERVICE_KEY and uses the stored embeddings,
+holding out a sample of them as queries.
+"""
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import emit, percentiles, timed
+from lib.vector_index import VectorIndex
+
+# Bytes per row of the pgvector column types: 4-byte header + 2-byte dim + 2 unused
+PGVECTOR_TYPES = {"float32": ("vector", 4), "float16": ("halfvec", 2)}
+
+
+def synthetic_corpus(n: int, queries: int, dim: int, topics: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    spread = (1 + np.arange(dim) / 64) ** -0.75
+    centers = rng.standard_normal((topics, dim)).astype(np.float32) * spread
+    docs = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 10_000):
+        size = min(10_000, n - start)
+        noise = rng.standard_normal((size, dim), dtype=np.float32) * spread
+        docs[start:start + size] = centers[rng.integers(0, topics, size)] + 0.8 * noise
+    picks = rng.integers(0, n, queries)
+    query_vectors = docs[picks] + 0.6 * rng.standard_normal((queries, dim), dtype=np.float32) * spread
+    return docs, query_vectors
+
+
+def stored_corpus(queries: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    from lib.db import _get_client
+    from lib.vector_index import _fetch_new_rows
+
+    rows = [r for r in _fetch_new_rows(_get_client(), None) if r.get("embedding") is not None]
+    if len(rows) <= queries:
+        raise SystemExit(f"need more than {queries} stored embeddings, found {len(rows)}")
+    vectors = np.asarray([r["embedding"] for r in rows], dtype=np.float32)
+    held_out = np.random.default_rng(seed).permutation(len(vectors))
+    return vectors[held_out[queries:]], vectors[held_out[:queries]]
+
+
+def recall(results: list[list[tuple[str, float]]], truth: list[set[str]], k: int) -> float:
+    return float(np.mean([len({rid for rid, _ in r} & t) / k for r, t in zip(results, truth)]))
+
+
+def run_config(index: VectorIndex, queries: np.ndarray, truth: list[set[str]], k: int, rescore_factor: int) -> dict:
+    index.rescore_factor = 1  # the coarse pass picks the final k on its own
+    coarse = [index.search(q, None, k) for q in queries]
+    index.rescore_factor = rescore_factor
+    samples, two_phase = [], []
+    for q in queries:
+        elapsed, hits = timed(index.search, q, None, k)
+        samples.append(elapsed)
+        two_phase.append(hits)
+    return {
+        "recall_coarse": recall(coarse, truth, k),
+        "recall_two_phase": recall(two_phase, truth, k),
+        "latency": percentiles(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20_000, help="synthetic documents")
+    parser.add_argument("--dim", type=int, default=3072, help="synthetic embedding size")
+    parser.add_argument("--topics", type=int, default=200, help="synthetic topic clusters")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dims", type=int, nargs="+", default=[3072, 1536, 768, 256])
+    parser.add_argument("--precisions", nargs="+", default=["float32", "float16", "int8"])
+    parser.add_argument("--rescore-factor", type=int, default=10)
+    parser.add_argument("--from-db", action="store_true", help="use stored resume embeddings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.from_db:
+        docs, queries = stored_corpus(args.queries, args.seed)
+    else:
+        docs, queries = synthetic_corpus(args.n, args.queries, args.dim, args.topics, args.seed)
+    n, dim = docs.shape
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(tmp, compact_dim=0)
+        ids = [f"doc-{i}" for i in range(n)]
+        for start in range(0, n, 10_000):
+            index.add_arrays(ids[start:start + 10_000], ["corpus"] * len(ids[start:start + 10_000]), docs[start:start + 10_000])
+        del docs
+
+        truth = [{rid for rid, _ in index.search(q, None, args.k)} for q in queries]
+        baseline = percentiles([timed(index.search, q, None, args.k)[0] for q in queries])
+        results = {
+            "corpus": "stored" if args.from_db else "synthetic",
+            "n": n,
+            "dim": dim,
+            "k": args.k,
+            "rescore_factor": args.rescore_factor,
+            "exact": {"bytes_per_vector": 4 * dim, "latency": baseline},
+            "configs": [],
+        }
+        for compact_dim in args.dims:
+            if compact_dim > dim:
+                continue
+            for precision in args.precisions:
+                if compact_dim == dim and precision == "float32":
+                    continue  # same as exact search
+                index.configure_compact(compact_dim, precision)
+                column = PGVECTOR_TYPES.get(precision)
+                results["configs"].append({
+                    "dim": compact_dim,
+                    "precision": precision,
+                    "bytes_per_vector": index.nbytes()["compact"] / n,
+                    "pgvector_column": f"{column[0]}({compact_dim})" if column else None,
+                    "pgvector_bytes": column[1] * compact_dim + 8 if column else None,
+                    **run_config(index, queries, truth, args.k, args.rescore_factor),
+                })
+        emit(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
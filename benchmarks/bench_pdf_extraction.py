@@ -0,0 +1,158 @@
+"""
+PDF text extraction throughput per backend and worker count.
+
+    python -m benchmarks.bench_pdf_extraction --backends pdfplumber pdfium --workers 0 1 2 4
+
+Extracts a reproducible synthetic resume corpus (see benchmarks.synthetic_pdfs:
+one-column, two-column, long multi-page and table-heavy layouts) through
+lib.pdf_parser.extract_text, with as many files in flight as there are
+workers. Workers = 0 extracts in-process. Reports pages/sec, MB/sec, peak RSS
+of the benchmark process and of the extraction workers, and per-page latency
+percentiles (file latency / file pages), overall and per layout.
+
+Each (backend, workers) configuration runs in a fresh interpreter so peak RSS
+is not carried over from the previous one.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import emit, percentiles
+from benchmarks.synthetic_pdfs import LAYOUTS, generate_corpus
+
+
+def _peak_rss_mb(who: int) -> float:
+    import resource
+
+    kb = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    return kb / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_config(backend: str, workers: int, files: list[dict], repeat: int) -> dict:
+    """Extract the corpus `repeat` times with one backend / worker count."""
+    import resource
+
+    from lib import pdf_parser
+
+    pdf_parser.configure_pool(workers)
+    corpus = []
+    for f in files:
+        with open(f["path"], "rb") as fh:
+            corpus.append((f, fh.read()))
+
+    def extract(item):
+        meta, data = item
+        start = time.perf_counter()
+        text = pdf_parser.extract_text(data, backend=backend)
+        return meta, time.perf_counter() - start, len(text)
+
+    # One untimed file so process start-up and imports are not in the numbers
+    extract(corpus[0])
+
+    per_page: dict[str, list[float]] = {layout: [] for layout in LAYOUTS}
+    chars = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for _ in range(repeat):
+            for meta, elapsed, n_chars in pool.map(extract, corpus):
+                pages = min(meta["pages"], pdf_parser.PDF_MAX_PAGES)
+                per_page[meta["layout"]] += [elapsed / pages] * pages
+                chars += n_chars
+    wall = time.perf_counter() - start
+    pdf_parser.configure_pool(0)  # shut the workers down so their RSS is counted
+
+    total_pages = sum(min(f["pages"], pdf_parser.PDF_MAX_PAGES) for f in files) * repeat
+    total_bytes = sum(f["bytes"] for f in files) * repeat
+    return {
+        "backend": backend,
+        "workers": workers,
+        "files": len(files) * repeat,
+        "pages": total_pages,
+        "chars_extracted": chars,
+        "wall_seconds": wall,
+        "pages_per_sec": total_pages / wall,
+        "mb_per_sec": total_bytes / wall / (1024 * 1024),
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_worker_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if workers else None,
+        "per_page_latency": percentiles([s for samples in per_page.values() for s in samples]),
+        "per_page_latency_by_layout": {
+            layout: percentiles(samples) for layout, samples in per_page.items() if samples
+        },
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["pdfplumber", "pdfium"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--per-layout", type=int, default=10, help="PDFs generated per layout")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the corpus per configuration")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus-dir", default=".cache/bench_pdfs")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--run-one", nargs=2, metavar=("BACKEND", "WORKERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    files = generate_corpus(args.corpus_dir, args.per_layout, args.seed)
+
+    if args.run_one:
+        backend, workers = args.run_one[0], int(args.run_one[1])
+        print(json.dumps(run_config(backend, workers, files, args.repeat)))
+        return
+
+    results = []
+    for backend in args.backends:
+        for workers in args.workers:
+            proc = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.bench_pdf_extraction",
+                    "--per-layout", str(args.per_layout), "--repeat", str(args.repeat),
+                    "--seed", str(args.seed), "--corpus-dir", args.corpus_dir,
+                    "--run-one", backend, str(workers),
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                results.append({"backend": backend, "workers": workers, "error": proc.stderr.strip()[-2000:]})
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    corpus = {
+        layout: {
+            "files": sum(1 for f in files if f["layout"] == layout),
+            "pages": sum(f["pages"] for f in files if f["layout"] == layout),
+            "bytes": sum(f["bytes"] for f in files if f["layout"] == layout),
+        }
+        for layout in LAYOUTS
+    }
+    emit(
+        {
+            "benchmark": "pdf_extraction",
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "corpus": {"per_layout": args.per_layout, "seed": args.seed, "layouts": corpus},
+            "results": results,
+        },
+        args.json,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Latency of the in-process vector index vs. a pgvector search RPC.
+
+    python -m benchmarks.bench_vector_index --n 100000 --dim 3072
+    python -m benchmarks.bench_vector_index --n 10000 --rpc   # also time pgvector
+
+The local index is built from synthetic vectors in a temporary directory.
+--rpc loads the same vectors into the bench_vectors scratch table
+(benchmarks/vector_scratch.sql, applied to a development project) and times
+bench_search_vectors, which searches it the way search_resumes searches
+resumes; the rows are deleted afterwards. It needs SUPABASE_URL /
+SUPABASE_SERVICE_KEY, and uploading costs ~30 KB per 3072-dim vector, hence
+the smaller --n.
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import emit, percentiles, timed
+from lib.vector_index import VectorIndex
+
+
+# Rows per insert request when loading the scratch table
+UPLOAD_ROWS = 100
+
+
+def synthetic_blocks(n: int, dim: int, batches: int, seed: int):
+    """The synthetic corpus as (ids, batch_names, vectors) blocks; the same for the same arguments."""
+    rng = np.random.default_rng(seed)
+    chunk = 10_000
+    for start in range(0, n, chunk):
+        size = min(chunk, n - start)
+        vectors = rng.standard_normal((size, dim), dtype=np.float32)
+        ids = [f"synthetic-{i}" for i in range(start, start + size)]
+        batch_names = [f"batch-{i % batches}" for i in range(start, start + size)]
+        yield ids, batch_names, vectors
+
+
+def build_index(path: str, n: int, dim: int, batches: int, seed: int) -> VectorIndex:
+    index = VectorIndex(path)
+    for ids, batch_names, vectors in synthetic_blocks(n, dim, batches, seed):
+        index.add_arrays(ids, batch_names, vectors)
+    return index
+
+
+def load_scratch(client, n: int, dim: int, batches: int, seed: int):
+    """Replace the contents of bench_vectors with the synthetic corpus."""
+    client.table("bench_vectors").delete().like("id", "synthetic-%").execute()
+    for ids, batch_names, vectors in synthetic_blocks(n, dim, batches, seed):
+        for start in range(0, len(ids), UPLOAD_ROWS):
+            end = start + UPLOAD_ROWS
+            client.table("bench_vectors").insert([
+                {"id": rid, "batch_name": name, "embedding": vector.tolist()}
+                for rid, name, vector in zip(ids[start:end], batch_names[start:end], vectors[start:end])
+            ]).execute()
+
+
+def bench_local(index: VectorIndex, queries: np.ndarray, limit: int, batch_filter: list[str] | None) -> dict:
+    index.search(queries[0], batch_filter, limit)  # warm the page cache
+    samples = [timed(index.search, q, batch_filter, limit)[0] for q in queries]
+    return percentiles(samples)
+
+
+def bench_rpc(client, queries: np.ndarray, limit: int, batch_filter: list[str] | None) -> dict:
+    def search(q: np.ndarray):
+        params = {"query_embedding": q.tolist(), "match_count": limit, "batch_names": batch_filter or []}
+        return client.rpc("bench_search_vectors", params).execute()
+
+    search(queries[0])  # warm the connection and the table's pages
+    return percentiles([timed(search, q)[0] for q in queries])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100_000, help="synthetic vectors in the local index")
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--batches", type=int, default=50, help="distinct batch names")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rpc", action="store_true", help="also time pgvector over the same corpus")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_seconds, index = timed(build_index, tmp, args.n, args.dim, args.batches, args.seed)
+        results = {
+            "n": args.n,
+            "dim": args.dim,
+            "index_bytes": os.path.getsize(os.path.join(tmp, "vectors.f32")),
+            "build_seconds": build_seconds,
+            "local": bench_local(index, queries, args.limit, None),
+            "local_batch_filter": bench_local(index, queries, args.limit, ["batch-0", "batch-1"]),
+        }
+        if args.rpc:
+            from lib.db import _get_client
+
+            client = _get_client()
+            results["rpc_load_seconds"], _ = timed(load_scratch, client, args.n, args.dim, args.batches, args.seed)
+            try:
+                results["rpc"] = bench_rpc(client, queries, args.limit, None)
+                results["rpc_batch_filter"] = bench_rpc(client, queries, args.limit, ["batch-0", "batch-1"])
+            finally:
+                client.table("bench_vectors").delete().like("id", "synthetic-%").execute()
+        emit(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
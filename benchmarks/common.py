@@ -0,0 +1,35 @@
+import json
+import statistics
+import time
+
+
+def percentiles(samples: list[float]) -> dict:
+    """p50/p95/p99/mean of a list of latencies, in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ms = sorted(s * 1000 for s in samples)
+    cuts = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else [ms[0]] * 99
+    return {
+        "n": len(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": cuts[49],
+        "p95_ms": cuts[94],
+        "p99_ms": cuts[98],
+        "max_ms": ms[-1],
+    }
+
+
+def timed(fn, *args, **kwargs) -> tuple[float, object]:
+    """Run fn and return (elapsed seconds, result)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def emit(results: dict, json_path: str | None = None):
+    """Print results as indented JSON, and also write them to json_path if given."""
+    text = json.dumps(results, indent=2, default=str)
+    print(text)
+    if json_path:
+        with open(json_path, "w") as f:
+            f.write(text + "\n")
@@ -0,0 +1,207 @@
+"""
+Reproducible synthetic resume PDFs for extraction benchmarks.
+
+Writes plain PDF 1.4 with the standard Helvetica font, so no PDF library is
+needed. Layouts:
+  one_column   classic single-column resume, 1-2 pages
+  two_column   sidebar of skills next to the experience column
+  long         multi-page CV (publications, projects), 6-12 pages
+  table_heavy  skills / experience laid out in ruled tables with many cells
+"""
+import json
+import os
+import random
+
+LAYOUTS = ("one_column", "two_column", "long", "table_heavy")
+
+_WORDS = (
+    "python java kubernetes aws terraform postgres react typescript spark kafka airflow "
+    "docker linux golang rust pandas numpy pytorch tensorflow scikit-learn graphql redis "
+    "led designed built migrated shipped scaled optimized mentored owned automated reduced "
+    "latency throughput pipeline platform service api team customers revenue reliability "
+    "infrastructure analytics dashboard model training inference deployment monitoring"
+).split()
+_FIRST = ["Jane", "Arjun", "Maria", "Chen", "Olu", "Sofia", "Liam", "Priya", "Noah", "Aiko"]
+_LAST = ["Doe", "Patel", "Garcia", "Wei", "Adeyemi", "Rossi", "Murphy", "Shah", "Kim", "Tanaka"]
+
+PAGE_W, PAGE_H = 612, 792
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n)).capitalize() + "."
+
+
+class _Page:
+    def __init__(self):
+        self.ops: list[str] = []
+
+    def text(self, x: float, y: float, text: str, size: float = 10):
+        self.ops.append(f"BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET")
+
+    def line(self, x1: float, y1: float, x2: float, y2: float):
+        self.ops.append(f"{x1:.1f} {y1:.1f} m {x2:.1f} {y2:.1f} l S")
+
+    def rect(self, x: float, y: float, w: float, h: float):
+        self.ops.append(f"{x:.1f} {y:.1f} {w:.1f} {h:.1f} re S")
+
+    def content(self) -> bytes:
+        return ("0.5 w\n" + "\n".join(self.ops)).encode("latin-1")
+
+
+def _write_pdf(pages: list[_Page]) -> bytes:
+    objects: list[bytes] = []
+    font_id = 1
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = 2 + 2 * len(pages)
+    page_ids = []
+    for page in pages:
+        content = page.content()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, PAGE_W, PAGE_H, font_id, content_id)
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects.append(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+    catalog_id = len(objects)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref,
+    )
+    return bytes(out)
+
+
+def _header(page: _Page, rng: random.Random) -> float:
+    page.text(50, 740, f"{rng.choice(_FIRST)} {rng.choice(_LAST)}", size=20)
+    page.text(50, 722, f"{rng.choice(_FIRST).lower()}@example.com  |  +1 555 {rng.randrange(1000, 9999)}", size=9)
+    page.line(50, 712, PAGE_W - 50, 712)
+    return 695
+
+
+def _column(pages: list[_Page], rng: random.Random, x: float, width_words: int, y: float, sections: int) -> float:
+    page = pages[-1]
+    for _ in range(sections):
+        if y < 90:
+            page = _Page()
+            pages.append(page)
+            y = 740
+        page.text(x, y, rng.choice(["Experience", "Projects", "Education", "Publications"]), size=13)
+        y -= 18
+        for _ in range(rng.randint(3, 7)):
+            if y < 60:
+                page = _Page()
+                pages.append(page)
+                y = 740
+            page.text(x, y, "- " + _sentence(rng, width_words), size=9.5)
+            y -= 13
+        y -= 8
+    return y
+
+
+def _one_column(rng: random.Random) -> list[_Page]:
+    pages = [_Page()]
+    y = _header(pages[0], rng)
+    _column(pages, rng, 50, 14, y, rng.randint(4, 8))
+    return pages
+
+
+def _two_column(rng: random.Random) -> list[_Page]:
+    pages = [_Page()]
+    y = _header(pages[0], rng)
+    side = pages[0]
+    side.text(50, y, "Skills", size=13)
+    for i in range(rng.randint(15, 30)):
+        side.text(50, y - 18 - 12 * i, rng.choice(_WORDS), size=9)
+    side.line(180, y + 10, 180, 60)
+    _column(pages, rng, 195, 9, y, rng.randint(3, 6))
+    return pages
+
+
+def _long(rng: random.Random) -> list[_Page]:
+    pages = [_Page()]
+    y = _header(pages[0], rng)
+    _column(pages, rng, 50, 14, y, rng.randint(45, 80))
+    return pages
+
+
+def _table_heavy(rng: random.Random) -> list[_Page]:
+    pages = [_Page()]
+    y = _header(pages[0], rng)
+    cols, col_w, row_h = 5, (PAGE_W - 100) / 5, 16
+    for _ in range(rng.randint(2, 4)):
+        page = pages[-1]
+        rows = rng.randint(10, 25)
+        if y - rows * row_h < 60:
+            page = _Page()
+            pages.append(page)
+            y = 740
+        page.text(50, y, rng.choice(["Skills Matrix", "Employment History", "Certifications"]), size=13)
+        y -= 20
+        for r in range(rows):
+            for c in range(cols):
+                x = 50 + c * col_w
+                page.rect(x, y - row_h + 4, col_w, row_h)
+                page.text(x + 3, y - 8, " ".join(rng.choice(_WORDS) for _ in range(2)), size=8)
+            y -= row_h
+        y -= 20
+    return pages
+
+
+_BUILDERS = {
+    "one_column": _one_column,
+    "two_column": _two_column,
+    "long": _long,
+    "table_heavy": _table_heavy,
+}
+
+
+def make_resume_pdf(layout: str, seed: int) -> tuple[bytes, int]:
+    """
+    One synthetic resume PDF and its page count. The same (layout, seed)
+    always gives the same bytes.
+    """
+    pages = _BUILDERS[layout](random.Random(f"{layout}-{seed}"))
+    return _write_pdf(pages), len(pages)
+
+
+def generate_corpus(directory: str, per_layout: int = 25, seed: int = 0) -> list[dict]:
+    """
+    Write per_layout PDFs of each layout into directory and return the manifest
+    [{path, layout, bytes, pages}]. An existing corpus with the same parameters is reused.
+    """
+    manifest_path = os.path.join(directory, "manifest.json")
+    params = {"per_layout": per_layout, "seed": seed, "layouts": list(LAYOUTS)}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            existing = json.load(f)
+        if existing["params"] == params:
+            return existing["files"]
+
+    os.makedirs(directory, exist_ok=True)
+    files = []
+    for layout in LAYOUTS:
+        for i in range(per_layout):
+            data, pages = make_resume_pdf(layout, seed * 100_000 + i)
+            path = os.path.join(directory, f"{layout}_{i:03d}.pdf")
+            with open(path, "wb") as f:
+                f.write(data)
+            files.append({"path": path, "layout": layout, "bytes": len(data), "pages": pages})
+    with open(manifest_path, "w") as f:
+        json.dump({"params": params, "files": files}, f, indent=2)
+    return files
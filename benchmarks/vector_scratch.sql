@@ -0,0 +1,31 @@
+-- Scratch table for python -m benchmarks.bench_vector_index --rpc. The
+-- benchmark loads its synthetic corpus here, so the RPC and the local index
+-- are timed over the same vectors, and removes it again afterwards. Not part
+-- of the app schema: apply it to a development project only.
+
+create table if not exists bench_vectors (
+    id          text primary key,
+    batch_name  text not null,
+    embedding   vector not null
+);
+
+-- The same query shape as search_resumes, over bench_vectors
+create or replace function bench_search_vectors(
+    query_embedding vector,
+    match_count int,
+    batch_names text[]
+)
+returns table (
+    id         text,
+    similarity float
+)
+language sql stable
+as $$
+    select
+        v.id,
+        1 - (v.embedding <=> query_embedding) as similarity
+    from bench_vectors v
+    where cardinality(batch_names) = 0 or v.batch_name = any(batch_names)
+    order by v.embedding <=> query_embedding
+    limit match_count;
+$$;
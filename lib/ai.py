@@ -1,13 +1,42 @@
 import json
+import math
 import os
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+from typing import Iterator
 import streamlit as st
 from google import genai
 from google.genai import types
 
+from lib import embedding_cache, fakes, jobs, metrics, score_cache
+from lib.cache import TTLCache
+from lib.rate_limit import RateLimiter, RateLimited
+
 _client: genai.Client | None = None
 
+# GEMINI_REQUESTS_PER_MINUTE is the project-wide budget. The app and its
+# ingest workers (lib.jobs) draw from one token bucket kept in the jobs
+# database, so an idle process leaves the whole budget to the busy ones. Set
+# GEMINI_QUOTA_SHARES when other deployments, with their own jobs database,
+# use the same key: each then takes an equal share. GEMINI_MAX_CONCURRENCY
+# caps the calls each process has in flight.
+GEMINI_QUOTA_SHARES = max(1, int(os.environ.get("GEMINI_QUOTA_SHARES", "1")))
+GEMINI_MAX_RATE = float(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", "60")) / 60 / GEMINI_QUOTA_SHARES
+
+# Every Gemini call in the process goes through this limiter.
+_limiter = RateLimiter(
+    max_rate=GEMINI_MAX_RATE,
+    max_concurrency=max(1, int(os.environ.get("GEMINI_MAX_CONCURRENCY", "8"))),
+    bucket=jobs.SharedTokenBucket("gemini", GEMINI_MAX_RATE),
+)
+# Rates are the shared bucket's, the same in every process, so they aren't summed with the rest
+metrics.register_gauges(
+    "gemini_limiter", lambda: {k: v for k, v in _limiter.stats().items() if not k.endswith("rate_per_second")}
+)
+
 
 def _get_secret(key: str) -> str:
     try:
@@ -19,23 +48,216 @@ def _get_secret(key: str) -> str:
 def _get_client() -> genai.Client:
     global _client
     if _client is None:
+        if fakes.FAKE_SERVICES:
+            _client = fakes.gemini_client()
+            return _client
         _client = genai.Client(api_key=_get_secret("GEMINI_API_KEY"))
     return _client
 
 
+def rate_limiter_stats() -> dict:
+    """Queue depth, throttle counts and current rate of the shared Gemini limiter."""
+    return _limiter.stats()
+
+
+EMBED_MODEL = "gemini-embedding-001"
+EMBED_TASK_TYPE = "RETRIEVAL_DOCUMENT"
+QUERY_TASK_TYPE = "RETRIEVAL_QUERY"
+EMBED_MAX_CHARS = 8000
+
+# Requested embedding size. gemini-embedding-001 returns 3072 dimensions by
+# default and supports smaller sizes (768 and 1536 are recommended) that keep
+# most of the quality; 0 keeps the default. Must match the resumes.embedding
+# column, so changing it means re-embedding stored resumes.
+EMBED_DIMENSIONS = int(os.environ.get("EMBED_DIMENSIONS", "0"))
+
+# Limits for a single batched embed_content request.
+EMBED_BATCH_MAX_ITEMS = 100
+EMBED_BATCH_MAX_CHARS = 200_000
+EMBED_MAX_ATTEMPTS = 3
+
+
+# Process-wide cache of query embeddings, shared by all Streamlit sessions.
+_query_cache = TTLCache(
+    maxsize=int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", "512")),
+    ttl=float(os.environ.get("QUERY_CACHE_TTL_SECONDS", "86400")),
+)
+_query_embed_seconds = 0.0
+
+
+def _embed_batch(texts: list[str], task_type: str = EMBED_TASK_TYPE) -> list[list[float]]:
+    """Embed a list of already-truncated texts in one embed_content request."""
+    client = _get_client()
+    result = _limiter.call(
+        client.models.embed_content,
+        model=EMBED_MODEL,
+        contents=texts,
+        config=types.EmbedContentConfig(
+            task_type=task_type,
+            output_dimensionality=EMBED_DIMENSIONS or None,
+        ),
+    )
+    metrics.count("embedded_chars", sum(len(t) for t in texts), task_type=task_type)
+    if len(result.embeddings) != len(texts):
+        raise ValueError(f"Expected {len(texts)} embeddings, got {len(result.embeddings)}")
+    if not EMBED_DIMENSIONS:
+        return [e.values for e in result.embeddings]
+    # Only full-size embeddings come back normalized
+    vectors = []
+    for e in result.embeddings:
+        norm = math.sqrt(sum(v * v for v in e.values)) or 1.0
+        vectors.append([v / norm for v in e.values])
+    return vectors
+
+
+def _cache_model() -> str:
+    """Embedding cache key for the model, which differs per output size."""
+    return f"{EMBED_MODEL}@{EMBED_DIMENSIONS}" if EMBED_DIMENSIONS else EMBED_MODEL
+
+
+def _pack_batches(texts: list[str]) -> list[list[int]]:
+    """Group text indices into batches that respect the item and size limits."""
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_chars = 0
+    for i, text in enumerate(texts):
+        if current and (
+            len(current) >= EMBED_BATCH_MAX_ITEMS
+            or current_chars + len(text) > EMBED_BATCH_MAX_CHARS
+        ):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(i)
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
 def get_embedding(text: str) -> list[float]:
     """
     Generate an embedding for the given text using gemini-embedding-001.
     Text is truncated to ~8000 characters to stay within limits.
     """
-    client = _get_client()
-    truncated = text[:8000]
-    result = client.models.embed_content(
-        model="gemini-embedding-001",
-        contents=truncated,
-        config=types.EmbedContentConfig(task_type="RETRIEVAL_DOCUMENT"),
-    )
-    return result.embeddings[0].values
+    return get_embeddings([text])[0]
+
+
+@metrics.traced("get_embeddings")
+def get_embeddings(texts: list[str], return_exceptions: bool = False) -> list:
+    """
+    Generate embeddings for many texts with as few requests as possible.
+    Texts are truncated like get_embedding. Vectors already in the local
+    embedding cache are reused; the rest are de-duplicated and packed into
+    size-limited batches. A failed batch is split in half and retried, so only the failing texts are
+    re-sent. Results are returned in input order.
+    If return_exceptions is True, texts that still fail after EMBED_MAX_ATTEMPTS
+    get their exception in place of an embedding; otherwise the first such
+    exception is raised.
+    """
+    truncated = [t[:EMBED_MAX_CHARS] for t in texts]
+    hashes = [embedding_cache.text_hash(t) for t in truncated]
+    try:
+        cached = embedding_cache.get_many(_cache_model(), EMBED_TASK_TYPE, hashes)
+    except Exception:
+        cached = {}
+
+    # Only embed each distinct uncached text once
+    missing: dict[str, str] = {}
+    for h, t in zip(hashes, truncated):
+        if h not in cached and h not in missing:
+            missing[h] = t
+    missing_hashes = list(missing)
+    missing_texts = list(missing.values())
+    metrics.annotate(texts=len(texts), cached=len(texts) - len(missing_texts))
+
+    computed: list = [None] * len(missing_texts)
+    pending = [(batch, 1) for batch in _pack_batches(missing_texts)]
+    while pending:
+        indices, attempt = pending.pop(0)
+        try:
+            vectors = _embed_batch([missing_texts[i] for i in indices])
+        except Exception as e:
+            # RateLimited means the shared limiter has already exhausted its retries
+            if attempt >= EMBED_MAX_ATTEMPTS or isinstance(e, RateLimited):
+                if not return_exceptions:
+                    raise
+                for i in indices:
+                    computed[i] = e
+                continue
+            time.sleep(2 ** (attempt - 1))
+            if len(indices) > 1:
+                mid = len(indices) // 2
+                pending.append((indices[:mid], attempt + 1))
+                pending.append((indices[mid:], attempt + 1))
+            else:
+                pending.append((indices, attempt + 1))
+            continue
+        for i, vector in zip(indices, vectors):
+            computed[i] = vector
+
+    fresh = {h: v for h, v in zip(missing_hashes, computed) if not isinstance(v, Exception)}
+    try:
+        embedding_cache.put_many(_cache_model(), EMBED_TASK_TYPE, fresh)
+    except Exception:
+        pass
+
+    by_hash = {**cached, **dict(zip(missing_hashes, computed))}
+    return [by_hash[h] for h in hashes]
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and case so trivially different queries share a cache entry."""
+    return " ".join(query.split()).lower()
+
+
+@metrics.traced("get_query_embedding")
+def get_query_embedding(query: str) -> list[float]:
+    """
+    Embed a search query with the RETRIEVAL_QUERY task type.
+    Results are cached per normalized query (LRU + TTL) across all sessions.
+    """
+    global _query_embed_seconds
+    key = normalize_query(query)[:EMBED_MAX_CHARS]
+    cached = _query_cache.get(key)
+    metrics.annotate(cache_hit=cached is not None)
+    if cached is not None:
+        return cached
+    start = time.perf_counter()
+    embedding = _embed_batch([key], task_type=QUERY_TASK_TYPE)[0]
+    _query_embed_seconds += time.perf_counter() - start
+    _query_cache.set(key, embedding)
+    return embedding
+
+
+def query_cache_stats() -> dict:
+    """
+    Hit/miss counters for the query embedding cache, plus an estimate of the
+    embedding latency saved (hits × average miss latency).
+    """
+    stats = _query_cache.stats()
+    avg_miss = _query_embed_seconds / stats["misses"] if stats["misses"] else 0.0
+    stats["avg_miss_seconds"] = avg_miss
+    stats["saved_seconds"] = stats["hits"] * avg_miss
+    return stats
+
+
+NAME_MODEL = "gemini-2.5-flash"
+NAME_SNIPPET_CHARS = 400
+
+# Resumes whose names are asked for in one request.
+NAME_BATCH_SIZE = int(os.environ.get("NAME_BATCH_SIZE", "25"))
+
+_NAME_SCHEMA = types.Schema(
+    type=types.Type.ARRAY,
+    items=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "resume": types.Schema(type=types.Type.INTEGER),
+            "name": types.Schema(type=types.Type.STRING),
+        },
+        required=["resume", "name"],
+    ),
+)
 
 
 def extract_candidate_name(resume_text: str) -> str:
@@ -43,36 +265,250 @@ def extract_candidate_name(resume_text: str) -> str:
     Ask Gemini to extract the candidate's name from the top of their resume.
     Falls back gracefully on any error.
     """
+    return extract_candidate_names([resume_text])[0]
+
+
+@metrics.traced("extract_candidate_names")
+def extract_candidate_names(resume_texts: list[str]) -> list[str]:
+    """
+    Extract candidate names for many resumes, NAME_BATCH_SIZE per request,
+    using structured JSON output. Returns names in input order, with 'Unknown'
+    where the model could not tell or a request failed.
+    """
+    size = max(1, NAME_BATCH_SIZE)
+    metrics.annotate(resumes=len(resume_texts))
+    names = []
+    for start in range(0, len(resume_texts), size):
+        names += _extract_name_batch(resume_texts[start:start + size])
+    return names
+
+
+def _extract_name_batch(resume_texts: list[str]) -> list[str]:
     client = _get_client()
-    snippet = resume_text[:400]
+    snippets = "\n\n".join(
+        f"RESUME {i + 1}:\n{text[:NAME_SNIPPET_CHARS]}" for i, text in enumerate(resume_texts)
+    )
     prompt = (
-        "Extract the candidate's full name from the following resume text. "
-        "Return ONLY the name, nothing else. If you cannot determine the name, return 'Unknown'.\n\n"
-        f"Resume text:\n{snippet}"
+        "Extract each candidate's full name from the top of their resume below. "
+        "Return one object per resume with its number and the name, or 'Unknown' "
+        "if you cannot determine it.\n\n"
+        f"{snippets}"
     )
+    names = ["Unknown"] * len(resume_texts)
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
+        response = _limiter.call(
+            client.models.generate_content,
+            model=NAME_MODEL,
             contents=prompt,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=_NAME_SCHEMA,
+            ),
         )
-        name = response.text.strip()
-        if len(name) > 80 or "\n" in name:
-            return "Unknown"
-        return name
+        metrics.record_usage("extract_candidate_names", response)
+        results = json.loads(response.text)
+    except Exception:
+        return names
+    for item in results if isinstance(results, list) else []:
+        try:
+            index = int(item["resume"]) - 1
+            name = str(item["name"]).strip()
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= index < len(names) and name and len(name) <= 80 and "\n" not in name:
+            names[index] = name
+    return names
+
+
+SCORE_MODEL = "gemini-2.5-flash"
+
+# Candidates are scored in chunks of this size, several chunks at a time.
+SCORE_CHUNK_SIZE = int(os.environ.get("SCORE_CHUNK_SIZE", "5"))
+SCORE_MAX_WORKERS = int(os.environ.get("SCORE_MAX_WORKERS", "4"))
+
+
+def _content_version(candidate: dict) -> str:
+    """Version of a resume's content for score caching: its text hash."""
+    return candidate.get("text_hash") or embedding_cache.text_hash(_resume_excerpt(candidate))
+
+
+def _resume_excerpt(candidate: dict) -> str:
+    """The part of a resume the scorer reads; search rows only carry this excerpt."""
+    return (candidate.get("text_excerpt") or candidate.get("extracted_text") or "")[:1500]
+
+
+def _cached_scores(query: str, candidates: list[dict]) -> tuple[str, dict, dict]:
+    """Return (query hash, content versions by id, cached scores by id)."""
+    query_hash = embedding_cache.text_hash(normalize_query(query))
+    versions = {c["id"]: _content_version(c) for c in candidates}
+    try:
+        cached = score_cache.get_many(SCORE_MODEL, query_hash, list(versions.items()))
+    except Exception:
+        cached = {}
+    return query_hash, versions, cached
+
+
+def _store_scores(query_hash: str, versions: dict, results: list[dict]):
+    # Failed scores carry "reason" instead of "match_reason" and are never cached
+    to_store = [
+        (r["id"], versions[r["id"]], r)
+        for r in results
+        if r.get("id") in versions and "reason" not in r
+    ]
+    try:
+        score_cache.put_many(SCORE_MODEL, query_hash, to_store)
     except Exception:
-        return "Unknown"
+        pass
+
+
+class ScoreUsage:
+    """
+    What one scoring run spent on Gemini: the candidates sent to the model
+    (not answered from the score cache) and the requests and tokens used.
+    Pass one to score_candidates or score_candidates_stream to fill it in.
+    """
+
+    def __init__(self):
+        self.candidates = 0
+        self.calls = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, candidates: int = 0, calls: int = 0, tokens: int = 0):
+        with self._lock:
+            self.candidates += candidates
+            self.calls += calls
+            self.tokens += tokens
 
 
-def score_candidates(query: str, candidates: list[dict]) -> list[dict]:
+def _record_score_usage(response, usage: ScoreUsage | None):
+    tokens = metrics.record_usage("score_candidates", response)
+    if usage is not None:
+        usage.add(calls=1, tokens=tokens)
+
+
+@metrics.traced("score_candidates")
+def score_candidates(query: str, candidates: list[dict], usage: ScoreUsage | None = None) -> list[dict]:
     """
     Score each candidate 0-100 against the job query and explain why.
     Returns a list of dicts: [{id, score, reason}] sorted by score descending.
+    Scores are cached per (normalized query, candidate, resume version); only
+    candidates without a cached score are sent to the model.
     """
-    client = _get_client()
+    query_hash, versions, cached = _cached_scores(query, candidates)
+    metrics.annotate(candidates=len(candidates), cached=len(cached))
+
+    uncached = [c for c in candidates if c["id"] not in cached]
+    if usage is not None:
+        usage.add(candidates=len(uncached))
+    fresh = _score_in_chunks(query, uncached, usage) if uncached else []
+    _store_scores(query_hash, versions, fresh)
+
+    results = list(cached.values()) + fresh
+    results.sort(key=lambda x: x.get("score", 0), reverse=True)
+    return results
+
+
+@metrics.traced("score_candidates_stream")
+def score_candidates_stream(query: str, candidates: list[dict], usage: ScoreUsage | None = None) -> Iterator[dict]:
+    """
+    Streaming variant of score_candidates: yields each candidate's score dict
+    as soon as the model has finished writing it (cached scores first).
+    Results arrive unsorted; every candidate is yielded exactly once.
+    """
+    query_hash, versions, cached = _cached_scores(query, candidates)
+    metrics.annotate(candidates=len(candidates), cached=len(cached))
+    yield from cached.values()
+
+    uncached = [c for c in candidates if c["id"] not in cached]
+    if not uncached:
+        return
+    if usage is not None:
+        usage.add(candidates=len(uncached))
+    size = max(1, SCORE_CHUNK_SIZE)
+    chunks = [uncached[i:i + size] for i in range(0, len(uncached), size)]
+    results: queue.Queue = queue.Queue()
+    done = object()
+
+    def _run(chunk: list[dict]):
+        seen = set()
+        try:
+            for result in _stream_chunk(query, chunk, usage):
+                seen.add(result["id"])
+                results.put(result)
+        except Exception as e:
+            for result in _failed_scores([c for c in chunk if c["id"] not in seen], e):
+                results.put(result)
+        finally:
+            results.put(done)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(SCORE_MAX_WORKERS, len(chunks)))) as pool:
+        for chunk in chunks:
+            pool.submit(_run, chunk)
+        remaining = len(chunks)
+        while remaining:
+            item = results.get()
+            if item is done:
+                remaining -= 1
+                continue
+            _store_scores(query_hash, versions, [item])
+            yield item
+
+
+def _failed_scores(candidates: list[dict], error) -> list[dict]:
+    return [
+        {"id": c["id"], "score": 0, "reason": f"Scoring failed: {error}"}
+        for c in candidates
+    ]
 
+
+def _score_chunk(query: str, chunk: list[dict], usage: ScoreUsage | None = None) -> list[dict]:
+    """
+    Score one chunk, keeping only results for candidates in the chunk.
+    Candidates the model left out are re-requested once, then marked failed.
+    """
+    results = _score_with_model(query, chunk, usage)
+    chunk_ids = {c["id"] for c in chunk}
+    results = [r for r in results if r.get("id") in chunk_ids]
+    missing = [c for c in chunk if c["id"] not in {r["id"] for r in results}]
+    if missing:
+        retried = [r for r in _score_with_model(query, missing, usage) if r.get("id") in chunk_ids]
+        results += retried
+        returned = {r["id"] for r in retried}
+        results += _failed_scores(
+            [c for c in missing if c["id"] not in returned],
+            "candidate missing from model response",
+        )
+    return results
+
+
+def _score_in_chunks(query: str, candidates: list[dict], usage: ScoreUsage | None = None) -> list[dict]:
+    """
+    Split candidates into SCORE_CHUNK_SIZE chunks and score them concurrently.
+    Each chunk retries and fails on its own, so one bad response only marks
+    that chunk's candidates as failed.
+    """
+    size = max(1, SCORE_CHUNK_SIZE)
+    chunks = [candidates[i:i + size] for i in range(0, len(candidates), size)]
+    if len(chunks) == 1:
+        return _score_chunk(query, chunks[0], usage)
+
+    def _run(chunk: list[dict]) -> list[dict]:
+        try:
+            return _score_chunk(query, chunk, usage)
+        except Exception as e:
+            return _failed_scores(chunk, e)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(SCORE_MAX_WORKERS, len(chunks)))) as pool:
+        chunk_results = list(pool.map(_run, chunks))
+    return [r for results in chunk_results for r in results]
+
+
+def _build_score_prompt(query: str, candidates: list[dict]) -> str:
+    """Build the scoring prompt for a list of candidates."""
     summaries = []
     for i, c in enumerate(candidates):
-        text_snippet = c["extracted_text"][:1500]
+        text_snippet = _resume_excerpt(c)
         summaries.append(
             f"CANDIDATE {i+1}\n"
             f"ID: {c['id']}\n"
@@ -107,13 +543,104 @@ Return a JSON array (no markdown, no extra text) with one object per candidate:
 ]
 
 Score based on: skills alignment, relevant experience, seniority fit, and tool/tech overlap with the job description."""
+    return prompt
+
+
+class _JsonArrayStream:
+    """
+    Incrementally pulls complete top-level objects out of a streamed JSON array.
+    Anything before the opening '[' (e.g. a markdown fence) is ignored.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._obj_start = None
+
+    def feed(self, text: str) -> list[dict]:
+        self._buffer += text
+        objects = []
+        while self._pos < len(self._buffer):
+            ch = self._buffer[self._pos]
+            if not self._started:
+                self._started = ch == "["
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._obj_start = self._pos
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        objects.append(json.loads(self._buffer[self._obj_start:self._pos + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._obj_start = None
+            self._pos += 1
+        # Drop consumed text that can no longer be part of an object
+        if self._obj_start is None:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        return objects
+
+
+def _stream_chunk(query: str, chunk: list[dict], usage: ScoreUsage | None = None) -> Iterator[dict]:
+    """
+    Stream scores for one chunk, yielding each candidate object as it completes.
+    Candidates the stream didn't deliver (error or malformed output) are then
+    scored with the regular non-streaming path.
+    """
+    chunk_ids = {c["id"] for c in chunk}
+    seen: set[str] = set()
+    try:
+        # Holds a limiter slot until the whole response has been read
+        stream = _limiter.stream(
+            _get_client().models.generate_content_stream,
+            model=SCORE_MODEL,
+            contents=_build_score_prompt(query, chunk),
+        )
+        parser = _JsonArrayStream()
+        piece = None
+        for piece in stream:
+            for obj in parser.feed(piece.text or ""):
+                if isinstance(obj, dict) and obj.get("id") in chunk_ids and obj["id"] not in seen:
+                    seen.add(obj["id"])
+                    yield obj
+        # Usage totals arrive with the final chunk
+        _record_score_usage(piece, usage)
+    except Exception:
+        pass
+    missing = [c for c in chunk if c["id"] not in seen]
+    if missing:
+        yield from _score_chunk(query, missing, usage)
+
+
+def _score_with_model(query: str, candidates: list[dict], usage: ScoreUsage | None = None) -> list[dict]:
+    """Ask Gemini to score the given candidates in a single prompt."""
+    client = _get_client()
+    prompt = _build_score_prompt(query, candidates)
 
     for attempt in range(3):
         try:
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
+            response = _limiter.call(
+                client.models.generate_content,
+                model=SCORE_MODEL,
                 contents=prompt,
             )
+            _record_score_usage(response, usage)
             raw = response.text.strip()
 
             # Strip markdown code fences if Gemini adds them
@@ -124,17 +651,15 @@ Score based on: skills alignment, relevant experience, seniority fit, and tool/t
                 raw = raw.strip()
 
             results = json.loads(raw)
+            if not isinstance(results, list):
+                raise ValueError("Expected a JSON array of candidate scores")
             results.sort(key=lambda x: x.get("score", 0), reverse=True)
             return results
 
+        except RateLimited as e:
+            # The limiter has already backed off and retried
+            return _failed_scores(candidates, e)
         except Exception as e:
-            err = str(e)
-            if "429" in err and attempt < 2:
-                wait = 60 * (attempt + 1)  # 60s, then 120s
-                st.warning(f"Rate limit hit — waiting {wait}s before retry ({attempt+1}/3)...")
-                time.sleep(wait)
-            else:
-                return [
-                    {"id": c["id"], "score": 0, "reason": f"Scoring failed: {e}"}
-                    for c in candidates
-                ]
+            if attempt >= 2:
+                return _failed_scores(candidates, e)
+            # Malformed output is retried straight away
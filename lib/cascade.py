@@ -0,0 +1,164 @@
+import math
+import os
+
+from lib import lexical_index
+from lib.ai import SCORE_CHUNK_SIZE, SCORE_MAX_WORKERS, ScoreUsage
+from lib.lexical_index import STOPWORDS, tokenize
+
+# First stage: how many candidates to retrieve cheaply before local ranking.
+POOL_SIZE = int(os.environ.get("CASCADE_POOL_SIZE", "200"))
+
+# Second stage budget for Gemini scoring.
+MIN_LLM_CANDIDATES = int(os.environ.get("CASCADE_MIN_LLM_CANDIDATES", "5"))
+MAX_LLM_CANDIDATES = int(os.environ.get("CASCADE_MAX_LLM_CANDIDATES", "20"))
+TOKEN_BUDGET = int(os.environ.get("CASCADE_TOKEN_BUDGET", "20000"))
+LATENCY_BUDGET_SECONDS = float(os.environ.get("CASCADE_LATENCY_BUDGET_SECONDS", "15"))
+
+# Cost model for one scoring chunk, used to turn budgets into a candidate count.
+# What the cascade saved is reported from measured usage instead (see savings).
+PROMPT_OVERHEAD_TOKENS = 350
+TOKENS_PER_CANDIDATE = 520  # ~1500-char excerpt in, ~150 tokens of JSON out
+SECONDS_PER_CHUNK = float(os.environ.get("CASCADE_SECONDS_PER_CHUNK", "6"))
+
+# Early exit: stop at the first local score below this fraction of the best one.
+CUTOFF_RATIO = float(os.environ.get("CASCADE_CUTOFF_RATIO", "0.6"))
+
+SIMILARITY_WEIGHT = 0.6
+OVERLAP_WEIGHT = 0.4
+
+
+def query_terms(query: str) -> set[str]:
+    """Distinct non-stopword tokens of the job query."""
+    return {t for t in tokenize(query) if t not in STOPWORDS and len(t) > 1}
+
+
+def retrieval_scores(candidates: list[dict]) -> list[float]:
+    """
+    The retriever's own score per candidate, min-max normalized to [0, 1]:
+    rrf_score when every row has one (hybrid_search results, whose keyword-only
+    rows carry no similarity), else similarity. A row without the score gets 0.
+    Falls back to rank order when no row has either.
+    """
+    n = len(candidates)
+    key = "rrf_score" if all(c.get("rrf_score") is not None for c in candidates) else "similarity"
+    values = [c.get(key) for c in candidates]
+    present = [v for v in values if v is not None]
+    if not present:
+        return [1 - i / n for i in range(n)]
+    lo, hi = min(present), max(present)
+    return [
+        0.0 if v is None else (v - lo) / (hi - lo) if hi > lo else 1.0
+        for v in values
+    ]
+
+
+def local_scores(query: str, candidates: list[dict]) -> list[float]:
+    """
+    Cheap relevance score in [0, 1] per candidate: a blend of the retrieval
+    score (see retrieval_scores) and the fraction of query terms that appear
+    in the resume text. Term matches come from the local keyword index over
+    the full text, or the row's text excerpt for resumes not indexed yet.
+    """
+    terms = query_terms(query)
+    ids = [c["id"] for c in candidates]
+    try:
+        indexed = lexical_index.is_indexed(ids)
+        matched = lexical_index.matched_terms(terms, ids)
+    except Exception:
+        indexed, matched = set(), {}
+
+    sim_norm = retrieval_scores(candidates)
+    scores = []
+    for c, sim in zip(candidates, sim_norm):
+        if not terms:
+            overlap = 0.0
+        elif c["id"] in indexed:
+            overlap = len(matched.get(c["id"], ())) / len(terms)
+        else:
+            text = c.get("extracted_text") or c.get("text_excerpt") or ""
+            overlap = len(terms & set(tokenize(text))) / len(terms)
+        scores.append(SIMILARITY_WEIGHT * sim + OVERLAP_WEIGHT * overlap)
+    return scores
+
+
+def budget_limit(
+    token_budget: int = TOKEN_BUDGET,
+    latency_budget: float = LATENCY_BUDGET_SECONDS,
+) -> int:
+    """Largest number of candidates the LLM stage can score within both budgets."""
+    chunk = max(1, SCORE_CHUNK_SIZE)
+    by_tokens = 0
+    while True:
+        n = by_tokens + 1
+        tokens = math.ceil(n / chunk) * PROMPT_OVERHEAD_TOKENS + n * TOKENS_PER_CANDIDATE
+        if tokens > token_budget:
+            break
+        by_tokens = n
+    rounds = max(1, int(latency_budget // SECONDS_PER_CHUNK))
+    by_latency = rounds * max(1, SCORE_MAX_WORKERS) * chunk
+    return max(MIN_LLM_CANDIDATES, min(MAX_LLM_CANDIDATES, by_tokens, by_latency))
+
+
+def estimate_cost(n: int) -> dict:
+    """Estimated LLM calls and tokens to score n candidates."""
+    chunk = max(1, SCORE_CHUNK_SIZE)
+    calls = math.ceil(n / chunk)
+    return {"calls": calls, "tokens": calls * PROMPT_OVERHEAD_TOKENS + n * TOKENS_PER_CANDIDATE}
+
+
+def select_for_llm(
+    query: str,
+    candidates: list[dict],
+    token_budget: int = TOKEN_BUDGET,
+    latency_budget: float = LATENCY_BUDGET_SECONDS,
+) -> tuple[list[dict], dict]:
+    """
+    Rank a retrieved pool locally and pick the top-N worth sending to Gemini.
+    N is capped by the token/latency budget and cut early at the first
+    candidate whose local score falls below CUTOFF_RATIO of the best.
+    Returns (selected candidates, report) where the report shows how many
+    candidates were retrieved and sent, and the cost model's estimate for
+    those sent; see savings for what skipping the rest saved.
+    """
+    scores = local_scores(query, candidates)
+    ranked = sorted(zip(candidates, scores), key=lambda x: x[1], reverse=True)
+    limit = min(len(ranked), budget_limit(token_budget, latency_budget))
+
+    n = limit
+    if ranked and ranked[0][1] > 0:
+        best = ranked[0][1]
+        for i in range(MIN_LLM_CANDIDATES, limit):
+            if ranked[i][1] < best * CUTOFF_RATIO:
+                n = i
+                break
+
+    selected = [{**c, "local_score": s} for c, s in ranked[:n]]
+    used = estimate_cost(len(selected))
+    report = {
+        "retrieved": len(candidates),
+        "budget_limit": limit,
+        "sent_to_llm": len(selected),
+        "early_exit": n < limit,
+        "llm_calls": used["calls"],
+        "tokens_estimated": used["tokens"],
+    }
+    return selected, report
+
+
+def savings(report: dict, usage: ScoreUsage) -> dict:
+    """
+    What scoring the selected candidates actually cost (usage, filled in by
+    score_candidates) and an extrapolation of what the cascade saved: that
+    cost per candidate sent to the model, times the retrieved candidates that
+    weren't selected. Empty when nothing reached the model (all scores cached).
+    """
+    if not usage.candidates or not usage.calls:
+        return {}
+    skipped = report["retrieved"] - report["sent_to_llm"]
+    return {
+        "llm_calls_used": usage.calls,
+        "tokens_used": usage.tokens,
+        "skipped": skipped,
+        "llm_calls_saved": round(usage.calls / usage.candidates * skipped),
+        "tokens_saved": round(usage.tokens / usage.candidates * skipped),
+    }
@@ -1,7 +1,16 @@
+import copy
+import functools
+import json
 import os
+import threading
+import time
+import uuid
 import streamlit as st
 from supabase import create_client, Client
 
+from lib import fakes, metrics
+from lib.cache import TTLCache
+
 _client: Client | None = None
 
 
@@ -15,6 +24,9 @@ def _get_secret(key: str) -> str:
 def _get_client() -> Client:
     global _client
     if _client is None:
+        if fakes.FAKE_SERVICES:
+            _client = fakes.supabase_client()
+            return _client
         _client = create_client(
             _get_secret("SUPABASE_URL"),
             _get_secret("SUPABASE_SERVICE_KEY"),
@@ -22,6 +34,76 @@ def _get_client() -> Client:
     return _client
 
 
+# ── Read cache ────────────────────────────────────────────────────────────────
+# Listing reads are cached per arguments together with the version of each
+# table they read. Writes through this module bump the table's version, which
+# invalidates exactly the cached reads that depend on it. The TTL bounds
+# staleness from writes made by other processes.
+
+_table_versions: dict[str, int] = {}
+_versions_lock = threading.Lock()
+_read_cache = TTLCache(
+    maxsize=int(os.environ.get("DB_READ_CACHE_MAX_ENTRIES", "256")),
+    ttl=float(os.environ.get("DB_READ_CACHE_TTL_SECONDS", "60")),
+)
+
+
+def _bump(*tables: str):
+    """Record a write to the given tables."""
+    with _versions_lock:
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+
+
+def invalidate_reads(*tables: str):
+    """Drop cached reads of tables written by another process (e.g. an ingest worker)."""
+    _bump(*tables)
+
+
+def _freeze(value):
+    """Hashable form of (nested) call arguments for use in cache keys."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _cached_read(*tables: str):
+    """Cache a read function's result until one of `tables` is written."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__name__, _freeze(args), _freeze(sorted(kwargs.items())))
+            with _versions_lock:
+                versions = tuple(_table_versions.get(t, 0) for t in tables)
+            entry = _read_cache.get(key)
+            if entry is not None and entry[0] == versions:
+                return copy.deepcopy(entry[1])
+            value = fn(*args, **kwargs)
+            _read_cache.set(key, (versions, value))
+            return copy.deepcopy(value)
+        return wrapper
+    return decorator
+
+
+def read_cache_stats() -> dict:
+    """Hit/miss counters of the listing read cache and current table versions."""
+    with _versions_lock:
+        versions = dict(_table_versions)
+    return {**_read_cache.stats(), "table_versions": versions}
+
+
+class DuplicateContent(Exception):
+    """A row was not inserted because its batch already holds the same PDF (content_hash)."""
+
+
+# Rows per insert request. Each row carries a full embedding and extracted
+# text, so keep requests to a few MB.
+INSERT_CHUNK_SIZE = int(os.environ.get("DB_INSERT_CHUNK_SIZE", "50"))
+INSERT_MAX_ATTEMPTS = 3
+
+
 def insert_resume(
     batch_name: str,
     candidate_name: str,
@@ -29,28 +111,192 @@ def insert_resume(
     storage_path: str,
     extracted_text: str,
     embedding: list[float],
+    content_hash: str | None = None,
+    text_hash: str | None = None,
 ) -> dict:
     """Insert a resume record and return the inserted row."""
+    [result] = insert_resumes([
+        {
+            "batch_name": batch_name,
+            "candidate_name": candidate_name,
+            "file_name": file_name,
+            "storage_path": storage_path,
+            "extracted_text": extracted_text,
+            "embedding": embedding,
+            "content_hash": content_hash,
+            "text_hash": text_hash,
+        }
+    ])
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+@metrics.traced("insert_resumes")
+def insert_resumes(rows: list[dict], chunk_size: int | None = None) -> list:
+    """
+    Insert many resume records with multi-row requests of up to `chunk_size`
+    (default INSERT_CHUNK_SIZE) rows. Returns one entry per input row, in
+    order: the row as sent, with its id, or the exception that row failed
+    with. Rows aren't sent back by the server, only the number written.
+    A failed chunk is split in half and each half retried, so one bad row
+    only fails itself; a single row is retried up to INSERT_MAX_ATTEMPTS times.
+    Rows are given an id up front and upserted on (batch_name, content_hash)
+    with conflicts ignored (sql/006_unique_content_hash.sql): re-sending a
+    chunk whose response was lost cannot store a row twice, and a row whose
+    PDF another worker stored in the batch meanwhile comes back as
+    DuplicateContent.
+    """
+    if not rows:
+        return []
     client = _get_client()
-    result = (
-        client.table("resumes")
-        .insert(
-            {
-                "batch_name": batch_name,
-                "candidate_name": candidate_name,
-                "file_name": file_name,
-                "storage_path": storage_path,
-                "extracted_text": extracted_text,
-                "embedding": embedding,
-            }
-        )
-        .execute()
+    rows = [{**row, "id": row.get("id") or str(uuid.uuid4())} for row in rows]
+    chunk_size = max(1, chunk_size or INSERT_CHUNK_SIZE)
+    metrics.annotate(rows=len(rows), chunk_size=chunk_size)
+
+    results: list = [None] * len(rows)
+    pending = [(list(range(start, min(start + chunk_size, len(rows)))), 1)
+             for start in range(0, len(rows), chunk_size)]
+    while pending:
+        indices, attempt = pending.pop(0)
+        try:
+            result = (
+                client.table("resumes")
+                .upsert(
+                    [rows[i] for i in indices],
+                    count="exact",
+                    returning="minimal",
+                    ignore_duplicates=True,
+                    on_conflict="batch_name,content_hash",
+                )
+                .execute()
+            )
+        except Exception as e:
+            if len(indices) > 1:
+                # Splitting isolates the failing rows; it doesn't use up an attempt
+                mid = len(indices) // 2
+                pending.append((indices[:mid], attempt))
+                pending.append((indices[mid:], attempt))
+            elif attempt < INSERT_MAX_ATTEMPTS:
+                time.sleep(2 ** (attempt - 1))
+                pending.append((indices, attempt + 1))
+            else:
+                results[indices[0]] = e
+            continue
+        if result.count is not None and result.count >= len(indices):
+            stored = {rows[i]["id"] for i in indices}
+        else:
+            # Some rows were skipped: ours if stored by an earlier attempt of this chunk
+            stored = {r["id"] for r in _select_resumes_by_ids([rows[i]["id"] for i in indices], "id")}
+        for i in indices:
+            if rows[i]["id"] in stored:
+                results[i] = rows[i]
+            else:
+                results[i] = DuplicateContent(f"already uploaded to batch {rows[i]['batch_name']}")
+
+    _bump("resumes")
+    metrics.annotate(failed=sum(isinstance(r, Exception) for r in results))
+    return results
+
+
+def _parse_embedding(value) -> list[float] | None:
+    """pgvector columns come back from PostgREST as a '[0.1,0.2,...]' string."""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def find_resume_by_hash(
+    content_hash: str | None = None,
+    text_hash: str | None = None,
+    batch_name: str | None = None,
+    columns: str = "*",
+) -> dict | None:
+    """
+    Return the most recent resume whose PDF bytes (content_hash) or extracted
+    text (text_hash) match, optionally only within batch_name, or None.
+    Only `columns` are fetched; an embedding among them is parsed to a list.
+    """
+    client = _get_client()
+    query = client.table("resumes").select(columns)
+    if content_hash:
+        query = query.eq("content_hash", content_hash)
+    if text_hash:
+        query = query.eq("text_hash", text_hash)
+    if batch_name is not None:
+        query = query.eq("batch_name", batch_name)
+    rows = query.order("upload_date", desc=True).limit(1).execute().data
+    if not rows:
+        return None
+    row = rows[0]
+    if "embedding" in row:
+        row["embedding"] = _parse_embedding(row["embedding"])
+    return row
+
+
+# Set to False the first time the aggregate views (sql/002_aggregates.sql) are
+# missing, after which the row-scanning fallbacks are used for this process.
+_aggregate_views_available = True
+
+
+def _select_aggregate_view(view: str, columns: str) -> list[dict] | None:
+    """Read an aggregate view ordered by latest activity, or None if it doesn't exist."""
+    global _aggregate_views_available
+    if not _aggregate_views_available:
+        return None
+    client = _get_client()
+    try:
+        result = client.table(view).select(columns).order("latest", desc=True).execute()
+    except Exception as e:
+        if not _is_missing_relation(e):
+            raise
+        _aggregate_views_available = False
+        return None
+    return result.data
+
+
+def _is_missing_relation(e: Exception) -> bool:
+    code = getattr(e, "code", None)
+    err = str(e)
+    return (
+        code in ("PGRST202", "PGRST205", "42P01", "42883")
+        or "does not exist" in err
+        or "Could not find the" in err
     )
-    return result.data[0]
 
 
+def aggregate_batch_stats(rows: list[dict]) -> list[dict]:
+    """
+    Fallback for the batch_stats view: group resumes rows (batch_name, upload_date)
+    already ordered by upload_date descending.
+    """
+    stats: dict[str, dict] = {}
+    for row in rows:
+        name = row["batch_name"]
+        if name not in stats:
+            stats[name] = {"batch_name": name, "count": 0, "latest": row["upload_date"]}
+        stats[name]["count"] += 1
+    return list(stats.values())
+
+
+def distinct_in_order(rows: list[dict], key: str) -> list[str]:
+    """Fallback for DISTINCT: first occurrence of each value, preserving row order."""
+    seen = set()
+    values = []
+    for row in rows:
+        value = row[key]
+        if value not in seen:
+            seen.add(value)
+            values.append(value)
+    return values
+
+
+@_cached_read("resumes")
 def get_batch_stats() -> list[dict]:
     """Return each batch with resume count and latest upload date."""
+    data = _select_aggregate_view("batch_stats", "batch_name, count, latest")
+    if data is not None:
+        return data
     client = _get_client()
     result = (
         client.table("resumes")
@@ -58,18 +304,15 @@ def get_batch_stats() -> list[dict]:
         .order("upload_date", desc=True)
         .execute()
     )
-    from collections import defaultdict
-    stats: dict[str, dict] = {}
-    for row in result.data:
-        name = row["batch_name"]
-        if name not in stats:
-            stats[name] = {"batch_name": name, "count": 0, "latest": row["upload_date"]}
-        stats[name]["count"] += 1
-    return list(stats.values())
+    return aggregate_batch_stats(result.data)
 
 
+@_cached_read("resumes")
 def list_batches() -> list[str]:
     """Return distinct batch names ordered by most recent upload first."""
+    data = _select_aggregate_view("batch_stats", "batch_name, latest")
+    if data is not None:
+        return [row["batch_name"] for row in data]
     client = _get_client()
     result = (
         client.table("resumes")
@@ -77,16 +320,51 @@ def list_batches() -> list[str]:
         .order("upload_date", desc=True)
         .execute()
     )
-    seen = set()
-    batches = []
-    for row in result.data:
-        name = row["batch_name"]
-        if name not in seen:
-            seen.add(name)
-            batches.append(name)
-    return batches
+    return distinct_in_order(result.data, "batch_name")
+
+
+# "rpc" uses the pgvector search_resumes function; "local" uses lib.vector_index.
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "rpc")
 
+# Search results carry these columns, text_excerpt being the first
+# TEXT_EXCERPT_CHARS of text (what the scorer reads). Full text is loaded on
+# demand via get_resumes_by_ids.
+SEARCH_COLUMNS = "id, batch_name, candidate_name, file_name, storage_path, upload_date, text_hash, text_excerpt"
+TEXT_EXCERPT_CHARS = 1500
 
+# Every resume column except the embedding.
+RESUME_COLUMNS = "id, batch_name, candidate_name, file_name, storage_path, upload_date, text_hash, extracted_text"
+
+_light_search_available = True
+
+# Set to False the first time the resume_search_rows view
+# (sql/005_resume_search_rows.sql) is missing; full rows are trimmed here instead.
+_search_rows_view_available = True
+
+# With sql/004_compact_embeddings.sql applied, the rpc backend can search in two
+# phases: coarse candidates from the compact half-precision column, then exact
+# rescoring of SEARCH_RESCORE_FACTOR × limit of them with the full embedding.
+SEARCH_TWO_PHASE = os.environ.get("SEARCH_TWO_PHASE", "0") == "1"
+SEARCH_RESCORE_FACTOR = int(os.environ.get("SEARCH_RESCORE_FACTOR", "10"))
+
+_two_phase_search_available = True
+
+# Shared across sessions: full resume rows (without embeddings) by id.
+_resume_cache = TTLCache(
+    maxsize=int(os.environ.get("RESUME_CACHE_MAX_ENTRIES", "500")),
+    ttl=float(os.environ.get("RESUME_CACHE_TTL_SECONDS", "3600")),
+)
+
+
+def _to_light_row(row: dict) -> dict:
+    """Replace full extracted_text with a text_excerpt."""
+    light = {k: v for k, v in row.items() if k not in ("extracted_text", "embedding")}
+    if "text_excerpt" not in light:
+        light["text_excerpt"] = (row.get("extracted_text") or "")[:TEXT_EXCERPT_CHARS]
+    return light
+
+
+@metrics.traced("search_by_embedding")
 def search_by_embedding(
     query_embedding: list[float],
     batch_filter: list[str] | None = None,
@@ -95,8 +373,14 @@ def search_by_embedding(
     """
     Find the most semantically similar resumes to the query embedding.
     Optionally filter to specific batches.
-    Returns up to `limit` rows ordered by cosine similarity.
+    Returns up to `limit` light rows (no full text, see TEXT_EXCERPT_CHARS)
+    ordered by cosine similarity.
     """
+    global _light_search_available, _two_phase_search_available
+    metrics.annotate(backend=SEARCH_BACKEND, limit=limit)
+    if SEARCH_BACKEND == "local":
+        return _search_local(query_embedding, batch_filter, limit)
+
     client = _get_client()
 
     # Use Supabase RPC to call our pgvector similarity search function
@@ -105,22 +389,92 @@ def search_by_embedding(
         "match_count": limit,
         "batch_names": batch_filter if batch_filter else [],
     }
+    if SEARCH_TWO_PHASE and _two_phase_search_available:
+        candidates = max(limit, limit * SEARCH_RESCORE_FACTOR)
+        try:
+            return client.rpc("search_resumes_two_phase", {**params, "candidate_count": candidates}).execute().data
+        except Exception as e:
+            if not _is_missing_relation(e):
+                raise
+            _two_phase_search_available = False
+    if _light_search_available:
+        try:
+            return client.rpc("search_resumes_light", params).execute().data
+        except Exception as e:
+            if not _is_missing_relation(e):
+                raise
+            _light_search_available = False
     result = client.rpc("search_resumes", params).execute()
+    return [_to_light_row(row) for row in result.data]
+
+
+def _select_resumes_by_ids(resume_ids: list[str], columns: str) -> list[dict]:
+    """Fetch the given columns for many resumes in one request (unordered)."""
+    if not resume_ids:
+        return []
+    client = _get_client()
+    result = client.table("resumes").select(columns).in_("id", resume_ids).execute()
     return result.data
 
 
+def select_search_rows(resume_ids: list[str]) -> list[dict]:
+    """Light search rows for the given ids, in one request (unordered)."""
+    global _search_rows_view_available
+    if not resume_ids:
+        return []
+    if _search_rows_view_available:
+        client = _get_client()
+        try:
+            return client.table("resume_search_rows").select(SEARCH_COLUMNS).in_("id", resume_ids).execute().data
+        except Exception as e:
+            if not _is_missing_relation(e):
+                raise
+            _search_rows_view_available = False
+    return [_to_light_row(row) for row in _select_resumes_by_ids(resume_ids, RESUME_COLUMNS)]
+
+
+def _search_local(
+    query_embedding: list[float],
+    batch_filter: list[str] | None,
+    limit: int,
+) -> list[dict]:
+    """search_by_embedding backed by the in-process vector index."""
+    from lib.vector_index import get_index
+
+    hits = get_index().search(query_embedding, batch_filter, limit)
+    rows = {r["id"]: r for r in select_search_rows([rid for rid, _ in hits])}
+    return [
+        {**rows[rid], "similarity": similarity}
+        for rid, similarity in hits
+        if rid in rows
+    ]
+
+
+def get_resumes_by_ids(resume_ids: list[str]) -> list[dict]:
+    """
+    Fetch full resume rows (without embeddings) for many ids, in input order.
+    Rows are served from a shared LRU cache where possible; the rest are
+    fetched in one request. Unknown ids are skipped.
+    """
+    rows: dict[str, dict] = {}
+    missing = []
+    for rid in dict.fromkeys(resume_ids):
+        row = _resume_cache.get(rid)
+        if row is None:
+            missing.append(rid)
+        else:
+            rows[rid] = row
+    for row in _select_resumes_by_ids(missing, RESUME_COLUMNS):
+        _resume_cache.set(row["id"], row)
+        rows[row["id"]] = row
+    return [rows[rid] for rid in resume_ids if rid in rows]
+
+
 def get_resume_by_id(resume_id: str) -> dict | None:
     """Fetch a single resume by its UUID."""
-    client = _get_client()
-    result = (
-        client.table("resumes")
-        .select("*")
-        .eq("id", resume_id)
-        .limit(1)
-        .execute()
-    )
-    if result.data:
-        return result.data[0]
+    rows = get_resumes_by_ids([resume_id])
+    if rows:
+        return rows[0]
     return None
 
 
@@ -150,9 +504,11 @@ def shortlist_candidates(resume_ids: list[str], role_name: str) -> int:
 
     rows = [{"resume_id": rid, "role_name": role_name} for rid in new_ids]
     client.table("shortlists").insert(rows).execute()
+    _bump("shortlists")
     return len(new_ids)
 
 
+@_cached_read("shortlists", "resumes")
 def list_shortlisted(role_filter: str | None = None) -> list[dict]:
     """
     Return shortlisted candidates joined with their resume data.
@@ -169,16 +525,65 @@ def list_shortlisted(role_filter: str | None = None) -> list[dict]:
         query = query.eq("role_name", role_filter)
 
     result = query.execute()
+    return _flatten_shortlist_rows(result.data)
+
+
+def _flatten_shortlist_rows(data: list[dict]) -> list[dict]:
     # Flatten nested resume data for easier use in UI
     rows = []
-    for row in result.data:
+    for row in data:
         resume = row.pop("resumes", {}) or {}
         rows.append({**row, **resume})
     return rows
 
 
+def _escape_like(value: str) -> str:
+    """Escape LIKE's wildcards (and its escape character) so value matches literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@_cached_read("shortlists", "resumes")
+def list_shortlisted_page(
+    role_filter: str | None = None,
+    status_filter: list[str] | None = None,
+    name_search: str | None = None,
+    page: int = 0,
+    page_size: int = 25,
+) -> tuple[list[dict], int]:
+    """
+    One page of list_shortlisted, with every filter applied in the query.
+    name_search matches candidate names case-insensitively, as plain text
+    (LIKE wildcards in it are escaped).
+    Returns (rows, total matching rows).
+    """
+    client = _get_client()
+    query = client.table("shortlists").select(
+        "id, role_name, status, notes, shortlisted_at, "
+        "resume_id, resumes!inner(candidate_name, file_name, batch_name, storage_path)",
+        count="exact",
+    )
+    if role_filter:
+        query = query.eq("role_name", role_filter)
+    if status_filter:
+        query = query.in_("status", status_filter)
+    if name_search:
+        query = query.ilike("resumes.candidate_name", f"%{_escape_like(name_search)}%")
+
+    start = page * page_size
+    result = (
+        query.order("shortlisted_at", desc=True)
+        .range(start, start + page_size - 1)
+        .execute()
+    )
+    return _flatten_shortlist_rows(result.data), result.count or 0
+
+
+@_cached_read("shortlists")
 def list_shortlist_roles() -> list[str]:
     """Return distinct role names ordered by most recent shortlist entry."""
+    data = _select_aggregate_view("shortlist_roles", "role_name, latest")
+    if data is not None:
+        return [row["role_name"] for row in data]
     client = _get_client()
     result = (
         client.table("shortlists")
@@ -186,14 +591,7 @@ def list_shortlist_roles() -> list[str]:
         .order("shortlisted_at", desc=True)
         .execute()
     )
-    seen = set()
-    roles = []
-    for row in result.data:
-        name = row["role_name"]
-        if name not in seen:
-            seen.add(name)
-            roles.append(name)
-    return roles
+    return distinct_in_order(result.data, "role_name")
 
 
 def update_shortlist(shortlist_id: str, status: str, notes: str) -> dict:
@@ -205,10 +603,36 @@ def update_shortlist(shortlist_id: str, status: str, notes: str) -> dict:
         .eq("id", shortlist_id)
         .execute()
     )
+    _bump("shortlists")
     return result.data[0] if result.data else {}
 
 
+def update_shortlists(updates: list[dict]) -> int:
+    """
+    Bulk-save edited shortlist entries in a single upsert.
+    Each update needs id, resume_id, role_name, status and notes.
+    Entries deleted meanwhile (e.g. removed in another session) are skipped
+    rather than recreated. Returns the number of rows written.
+    """
+    if not updates:
+        return 0
+    client = _get_client()
+    ids = [u["id"] for u in updates]
+    existing = {r["id"] for r in client.table("shortlists").select("id").in_("id", ids).execute().data}
+    rows = [
+        {k: u[k] for k in ("id", "resume_id", "role_name", "status", "notes")}
+        for u in updates
+        if u["id"] in existing
+    ]
+    if not rows:
+        return 0
+    result = client.table("shortlists").upsert(rows, on_conflict="id").execute()
+    _bump("shortlists")
+    return len(result.data)
+
+
 def remove_from_shortlist(shortlist_id: str):
     """Delete a shortlist entry."""
     client = _get_client()
     client.table("shortlists").delete().eq("id", shortlist_id).execute()
+    _bump("shortlists")
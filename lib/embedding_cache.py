@@ -0,0 +1,109 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+# Local on-disk cache of document embeddings, keyed by (model, task type, text hash).
+# Entries are evicted least-recently-used first once the cache exceeds MAX_BYTES.
+CACHE_PATH = os.environ.get("EMBED_CACHE_PATH", ".cache/embeddings.sqlite3")
+MAX_BYTES = int(os.environ.get("EMBED_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+
+
+def text_hash(text: str) -> str:
+    """Stable sha256 hex digest of a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute(
+            """
+            create table if not exists embeddings (
+                model      text not null,
+                task_type  text not null,
+                text_hash  text not null,
+                vector     blob not null,
+                last_used  real not null,
+                primary key (model, task_type, text_hash)
+            )
+            """
+        )
+        _conn.execute("create index if not exists embeddings_last_used_idx on embeddings (last_used)")
+        _conn.commit()
+    return _conn
+
+
+def get_many(model: str, task_type: str, hashes: list[str]) -> dict[str, list[float]]:
+    """Return cached vectors for whichever of the given text hashes are present."""
+    if not hashes:
+        return {}
+    found: dict[str, list[float]] = {}
+    with _lock:
+        conn = _get_conn()
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"select text_hash, vector from embeddings "
+                f"where model = ? and task_type = ? and text_hash in ({placeholders})",
+                [model, task_type, *chunk],
+            ).fetchall()
+            for h, blob in rows:
+                found[h] = array("f", blob).tolist()
+        if found:
+            now = time.time()
+            conn.executemany(
+                "update embeddings set last_used = ? where model = ? and task_type = ? and text_hash = ?",
+                [(now, model, task_type, h) for h in found],
+            )
+            conn.commit()
+    return found
+
+
+def put_many(model: str, task_type: str, items: dict[str, list[float]]):
+    """Store vectors by text hash, then evict old entries if over the size limit."""
+    if not items:
+        return
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        conn.executemany(
+            "insert or replace into embeddings (model, task_type, text_hash, vector, last_used) "
+            "values (?, ?, ?, ?, ?)",
+            [(model, task_type, h, array("f", v).tobytes(), now) for h, v in items.items()],
+        )
+        _evict(conn)
+        conn.commit()
+
+
+def _evict(conn: sqlite3.Connection):
+    """Delete least-recently-used rows until the cache is back under 90% of MAX_BYTES."""
+    total, count = conn.execute("select coalesce(sum(length(vector)), 0), count(*) from embeddings").fetchone()
+    if total <= MAX_BYTES or count == 0:
+        return
+    avg = total / count
+    to_delete = int((total - MAX_BYTES * 0.9) / avg) + 1
+    conn.execute(
+        "delete from embeddings where rowid in "
+        "(select rowid from embeddings order by last_used limit ?)",
+        (to_delete,),
+    )
+
+
+def clear():
+    """Remove every cached embedding."""
+    with _lock:
+        conn = _get_conn()
+        conn.execute("delete from embeddings")
+        conn.commit()
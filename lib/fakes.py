@@ -0,0 +1,677 @@
+"""
+In-process stand-ins for Supabase and Gemini, for offline development and
+load tests.
+
+With FAKE_SERVICES=1 in the environment the _get_client factories in lib.db,
+lib.storage and lib.ai return these fakes instead of live clients (install()
+does the same programmatically). The fakes implement only what this app
+calls: PostgREST-style table queries including the resumes join and the
+aggregate and search-row views, the search_resumes / search_resumes_light RPCs, a storage
+bucket with signed URLs, and Gemini embed / generate / stream calls.
+
+Embeddings are deterministic feature-hashed bags of words, so similar texts
+land close together; scores are the share of job-query terms found in the
+resume excerpt. Each service gets a FaultProfile adding latency and random
+429 errors, configured with FAKE_<SERVICE>_LATENCY_MS, FAKE_<SERVICE>_JITTER
+and FAKE_<SERVICE>_429_RATE for SERVICE in DB, STORAGE and GEMINI.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+FAKE_SERVICES = os.environ.get("FAKE_SERVICES", "").lower() in ("1", "true", "yes")
+FAKE_EMBED_DIM = int(os.environ.get("FAKE_EMBED_DIM", "768"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./\-]*")
+
+
+class FakeAPIError(Exception):
+    """Error raised by a fake service; carries an HTTP-style status code."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FaultProfile:
+    """Latency and 429 injection for one fake service."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float | None = None,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, service: str) -> "FaultProfile":
+        prefix = f"FAKE_{service.upper()}_"
+        return cls(
+            latency=float(os.environ.get(prefix + "LATENCY_MS", "0")) / 1000,
+            jitter=float(os.environ.get(prefix + "JITTER", "0")),
+            rate_limit_rate=float(os.environ.get(prefix + "429_RATE", "0")),
+        )
+
+    def delay(self, fraction: float = 1.0) -> float:
+        with self._lock:
+            spread = self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency * fraction * (1 + spread))
+
+    def apply(self, fraction: float = 1.0):
+        """Sleep for one request's latency, then maybe raise a 429."""
+        delay = self.delay(fraction)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            limited = self.rate_limit_rate and self._rng.random() < self.rate_limit_rate
+        if limited:
+            hint = f" {{'retryDelay': '{self.retry_after:g}s'}}" if self.retry_after is not None else ""
+            raise FakeAPIError(429, "RESOURCE_EXHAUSTED: fake rate limit" + hint)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _tokens(text: str) -> list[str]:
+    return [t.rstrip(".-/") for t in _TOKEN_RE.findall(text.lower()) if t.rstrip(".-/")]
+
+
+# ── Supabase ──────────────────────────────────────────────────────────────────
+
+# Embedded resources: relation name -> (foreign key on the parent row, table)
+_RELATIONS = {"resumes": ("resume_id", "resumes")}
+
+_ROW_DEFAULTS = {
+    "resumes": lambda: {"upload_date": _now()},
+    "shortlists": lambda: {"shortlisted_at": _now(), "status": "Shortlisted", "notes": ""},
+}
+
+
+# Unique indexes besides the primary key (sql/006_unique_content_hash.sql)
+_UNIQUE_KEYS = {"resumes": (("batch_name", "content_hash"),)}
+
+
+def _split_columns(columns: str) -> list[str]:
+    """Split a PostgREST select list on top-level commas."""
+    parts, depth, current = [], 0, ""
+    for ch in columns:
+        if ch == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        depth += ch == "("
+        depth -= ch == ")"
+        current += ch
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _like(pattern: str, value) -> bool:
+    """Postgres (I)LIKE, case-insensitively: % and _ wildcards, backslash escapes."""
+    parts = re.findall(r"\\.|.", pattern.lower(), re.DOTALL)
+    regex = "".join(
+        ".*" if p == "%" else "." if p == "_" else re.escape(p[-1])
+        for p in parts
+    )
+    return value is not None and re.fullmatch(regex, str(value).lower(), re.DOTALL) is not None
+
+
+def _sort_key(value):
+    return (value is None, value)
+
+
+class _Query:
+    """Chainable PostgREST-style request against the fake database."""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._count = None
+        self._payload = None
+        self._on_conflict = "id"
+        self._ignore_duplicates = False
+        self._returning = "representation"
+        self._filters: list[tuple[str, str, object]] = []
+        self._order: list[tuple[str, bool]] = []
+        self._range: tuple[int, int] | None = None
+        self._limit: int | None = None
+
+    def select(self, columns: str = "*", count: str | None = None) -> "_Query":
+        self._columns, self._count = columns, count
+        return self
+
+    def insert(self, rows) -> "_Query":
+        self._op, self._payload = "insert", rows
+        return self
+
+    def upsert(
+        self,
+        rows,
+        count: str | None = None,
+        returning: str = "representation",
+        ignore_duplicates: bool = False,
+        on_conflict: str = "id",
+    ) -> "_Query":
+        self._op, self._payload, self._on_conflict = "upsert", rows, on_conflict
+        self._count, self._returning = count, returning
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values: dict) -> "_Query":
+        self._op, self._payload = "update", values
+        return self
+
+    def delete(self) -> "_Query":
+        self._op = "delete"
+        return self
+
+    def eq(self, column: str, value) -> "_Query":
+        self._filters.append((column, "eq", value))
+        return self
+
+    def in_(self, column: str, values) -> "_Query":
+        self._filters.append((column, "in", set(values)))
+        return self
+
+    def gte(self, column: str, value) -> "_Query":
+        self._filters.append((column, "gte", value))
+        return self
+
+    def ilike(self, column: str, pattern: str) -> "_Query":
+        self._filters.append((column, "ilike", pattern))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "_Query":
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, n: int) -> "_Query":
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int) -> "_Query":
+        self._range = (start, end)
+        return self
+
+    def execute(self):
+        self._db.faults.apply()
+        self._db.calls[f"{self._table}.{self._op}"] += 1
+        with self._db.lock:
+            if self._op == "select":
+                return self._select()
+            return self._write()
+
+    def _matches(self, row: dict, joined: dict) -> bool:
+        for column, op, value in self._filters:
+            if "." in column:
+                relation, column = column.split(".", 1)
+                target = joined.get(relation) or {}
+            else:
+                target = row
+            actual = target.get(column)
+            if op == "eq" and actual != value:
+                return False
+            if op == "in" and actual not in value:
+                return False
+            if op == "gte" and (actual is None or actual < value):
+                return False
+            if op == "ilike" and not _like(value, actual):
+                return False
+        return True
+
+    def _select(self):
+        rows = self._db.rows(self._table)
+        columns = _split_columns(self._columns)
+        embeds = {}
+        plain = []
+        for column in columns:
+            match = re.fullmatch(r"(\w+)(!inner)?\((.*)\)", column)
+            if match:
+                embeds[match.group(1)] = (bool(match.group(2)), _split_columns(match.group(3)))
+            else:
+                plain.append(column)
+
+        selected = []
+        for row in rows:
+            joined = {}
+            for relation, (inner, _) in embeds.items():
+                key, table = _RELATIONS[relation]
+                joined[relation] = self._db.get(table, row.get(key))
+                if inner and joined[relation] is None:
+                    break
+            else:
+                if self._matches(row, joined):
+                    selected.append((row, joined))
+
+        for column, desc in reversed(self._order):
+            selected.sort(key=lambda rj: _sort_key(rj[0].get(column)), reverse=desc)
+        total = len(selected)
+        if self._range:
+            selected = selected[self._range[0]:self._range[1] + 1]
+        if self._limit is not None:
+            selected = selected[:self._limit]
+
+        data = []
+        for row, joined in selected:
+            out = self._db.project(row, plain)
+            for relation, (_, embed_columns) in embeds.items():
+                target = joined.get(relation)
+                out[relation] = self._db.project(target, embed_columns) if target else None
+            data.append(out)
+        return SimpleNamespace(data=data, count=total if self._count else None)
+
+    def _write(self):
+        if self._op in ("insert", "upsert"):
+            rows = self._payload if isinstance(self._payload, list) else [self._payload]
+            # A multi-row write is one statement: all rows are written or none
+            before = dict(self._db.tables[self._table])
+            try:
+                written = [
+                    self._db.put(self._table, row, self._op == "upsert", self._on_conflict, self._ignore_duplicates)
+                    for row in rows
+                ]
+                written = [row for row in written if row is not None]
+            except Exception:
+                self._db.tables[self._table] = before
+                self._db.touch(self._table)
+                raise
+        else:
+            written = []
+            for row in self._db.rows(self._table):
+                if self._matches(row, {}):
+                    if self._op == "update":
+                        row.update(self._payload)
+                        written.append(row)
+                    else:
+                        self._db.remove(self._table, row["id"])
+                        written.append(row)
+            self._db.touch(self._table)
+        data = [] if self._returning == "minimal" else [self._db.project(r, ["*"]) for r in written]
+        return SimpleNamespace(data=data, count=len(written) if self._count else None)
+
+
+# Dimensions of embedding_compact in sql/004_compact_embeddings.sql.
+_COMPACT_DIM = 768
+
+
+class _Rpc:
+    def __init__(self, db: "FakeSupabase", name: str, params: dict):
+        self._db, self._name, self._params = db, name, params
+
+    def execute(self):
+        self._db.faults.apply()
+        self._db.calls[f"rpc.{self._name}"] += 1
+        if self._name not in ("search_resumes", "search_resumes_light", "search_resumes_two_phase"):
+            raise FakeAPIError(404, f"PGRST202 Could not find the function public.{self._name}")
+        light = self._name != "search_resumes"
+        with self._db.lock:
+            hits = self._db.nearest(
+                self._params["query_embedding"],
+                self._params.get("batch_names") or [],
+                self._params["match_count"],
+                self._params.get("candidate_count"),
+            )
+            data = []
+            for row, similarity in hits:
+                out = self._db.project(row, [c for c in row if c not in ("embedding", "content_hash")])
+                if light:
+                    out["text_excerpt"] = (out.pop("extracted_text") or "")[:1500]
+                out["similarity"] = similarity
+                data.append(out)
+        return SimpleNamespace(data=data, count=None)
+
+
+class _Bucket:
+    def __init__(self, client: "FakeSupabase", name: str):
+        self._client, self._name = client, name
+
+    def upload(self, path: str, file: bytes, file_options: dict | None = None):
+        faults = self._client.storage_faults
+        # Upload time grows with the payload, like a real transfer
+        faults.apply(1 + len(file) / (1024 * 1024))
+        self._client.calls["storage.upload"] += 1
+        with self._client.lock:
+            objects = self._client.objects.setdefault(self._name, {})
+            upsert = str((file_options or {}).get("upsert", "false")).lower() == "true"
+            if path in objects and not upsert:
+                raise FakeAPIError(409, f"Duplicate: The resource already exists ({path})")
+            objects[path] = bytes(file)
+        return SimpleNamespace(path=path, full_path=f"{self._name}/{path}")
+
+    def download(self, path: str) -> bytes:
+        self._client.storage_faults.apply()
+        self._client.calls["storage.download"] += 1
+        with self._client.lock:
+            return self._client.objects.get(self._name, {})[path]
+
+    def create_signed_urls(self, paths: list[str], expires_in: int) -> list[dict]:
+        self._client.storage_faults.apply()
+        self._client.calls["storage.create_signed_urls"] += 1
+        expires = int(time.time()) + expires_in
+        with self._client.lock:
+            objects = self._client.objects.get(self._name, {})
+            return [
+                {
+                    "path": path,
+                    "signedURL": f"fake://{self._name}/{path}?token={uuid.uuid4().hex}&expires={expires}",
+                    "error": None,
+                }
+                if path in objects
+                else {"path": path, "signedURL": None, "error": "Object not found"}
+                for path in paths
+            ]
+
+
+class _Storage:
+    def __init__(self, client: "FakeSupabase"):
+        self._client = client
+
+    def from_(self, bucket: str) -> _Bucket:
+        return _Bucket(self._client, bucket)
+
+
+class FakeSupabase:
+    """In-memory Supabase: tables, aggregate views, search RPCs and storage."""
+
+    def __init__(self, faults: FaultProfile | None = None, storage_faults: FaultProfile | None = None):
+        self.faults = faults or FaultProfile()
+        self.storage_faults = storage_faults or FaultProfile()
+        self.lock = threading.RLock()
+        self.tables: dict[str, dict[str, dict]] = {"resumes": {}, "shortlists": {}}
+        self.objects: dict[str, dict[str, bytes]] = {}
+        self.calls: Counter = Counter()
+        self.storage = _Storage(self)
+        self._matrix = None  # (rows, unit vectors, compact vectors) for nearest(), reset on writes
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict) -> _Rpc:
+        return _Rpc(self, name, params)
+
+    # Storage used by the query objects; callers hold self.lock.
+
+    def rows(self, table: str) -> list[dict]:
+        if table == "batch_stats":
+            return self._aggregate("resumes", "batch_name", "upload_date")
+        if table == "shortlist_roles":
+            return self._aggregate("shortlists", "role_name", "shortlisted_at")
+        if table == "resume_search_rows":
+            return [
+                {**{k: v for k, v in row.items() if k != "extracted_text"},
+                 "text_excerpt": (row.get("extracted_text") or "")[:1500]}
+                for row in self.tables["resumes"].values()
+            ]
+        if table not in self.tables:
+            raise FakeAPIError(404, f"PGRST205 Could not find the table 'public.{table}'")
+        return list(self.tables[table].values())
+
+    def get(self, table: str, row_id) -> dict | None:
+        return self.tables.get(table, {}).get(row_id)
+
+    def put(self, table: str, row: dict, upsert: bool, on_conflict: str, ignore_duplicates: bool = False) -> dict | None:
+        """Insert a row, or on a conflict with on_conflict's columns update it (None if ignored)."""
+        rows = self.tables[table]
+        row = dict(row)
+        target = tuple(c.strip() for c in on_conflict.split(","))
+        keys = [("id",), *_UNIQUE_KEYS.get(table, ())]
+        # Like ON CONFLICT: the target's index is checked first
+        for key in sorted(keys, key=lambda k: k != target):
+            if any(row.get(c) is None for c in key):
+                continue
+            existing = next((r for r in rows.values() if all(r.get(c) == row[c] for c in key)), None)
+            if existing is None:
+                continue
+            if not (upsert and key == target):
+                name = f"{table}_pkey" if key == ("id",) else f"{table}_{'_'.join(key)}_key"
+                raise FakeAPIError(409, f"duplicate key value violates unique constraint \"{name}\"")
+            if ignore_duplicates:
+                return None
+            merged = {**existing, **row}
+            del rows[existing["id"]]
+            rows[merged["id"]] = merged
+            self.touch(table)
+            return merged
+        row.setdefault("id", str(uuid.uuid4()))
+        for key, value in _ROW_DEFAULTS.get(table, dict)().items():
+            row.setdefault(key, value)
+        rows[row["id"]] = row
+        self.touch(table)
+        return row
+
+    def remove(self, table: str, row_id: str):
+        self.tables[table].pop(row_id, None)
+
+    def touch(self, table: str):
+        if table == "resumes":
+            self._matrix = None
+
+    def project(self, row: dict, columns: list[str]) -> dict:
+        names = list(row) if "*" in columns else columns
+        out = {c: row.get(c) for c in names}
+        # pgvector columns come back from PostgREST as strings
+        if isinstance(out.get("embedding"), list):
+            out["embedding"] = json.dumps(out["embedding"])
+        return out
+
+    def _aggregate(self, table: str, key: str, time_column: str) -> list[dict]:
+        stats: dict[str, dict] = {}
+        for row in self.tables[table].values():
+            entry = stats.setdefault(row[key], {key: row[key], "count": 0, "latest": row[time_column]})
+            entry["count"] += 1
+            entry["latest"] = max(entry["latest"], row[time_column])
+        return list(stats.values())
+
+    def nearest(
+        self,
+        query_embedding,
+        batch_names: list[str],
+        limit: int,
+        candidates: int | None = None,
+    ) -> list[tuple[dict, float]]:
+        """
+        Cosine-similarity top-k over resumes, like search_resumes. With
+        `candidates`, ranks that many by the compact embedding first and
+        rescores only those, like search_resumes_two_phase.
+        """
+        if self._matrix is None:
+            rows = [r for r in self.tables["resumes"].values() if r.get("embedding") is not None]
+            vectors = np.array([r["embedding"] for r in rows], dtype=np.float32).reshape(len(rows), -1)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            compact = vectors[:, :_COMPACT_DIM]
+            compact_norms = np.linalg.norm(compact, axis=1, keepdims=True)
+            compact = (compact / np.where(compact_norms == 0, 1, compact_norms)).astype(np.float16)
+            self._matrix = (rows, vectors / np.where(norms == 0, 1, norms), compact)
+        rows, matrix, compact = self._matrix
+        if not rows:
+            return []
+        q = np.asarray(query_embedding, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1)
+        allowed = np.ones(len(rows), dtype=bool)
+        if batch_names:
+            names = set(batch_names)
+            allowed = np.array([r["batch_name"] in names for r in rows])
+        if candidates:
+            qc = q[:_COMPACT_DIM] / (np.linalg.norm(q[:_COMPACT_DIM]) or 1)
+            coarse = np.where(allowed, compact.astype(np.float32) @ qc, -np.inf)
+            shortlist = np.zeros(len(rows), dtype=bool)
+            shortlist[np.argsort(-coarse)[:candidates]] = True
+            allowed &= shortlist
+        scores = np.where(allowed, matrix @ q, -np.inf)
+        order = np.argsort(-scores)[:limit]
+        return [(rows[i], float(scores[i])) for i in order if np.isfinite(scores[i])]
+
+
+# ── Gemini ────────────────────────────────────────────────────────────────────
+
+def fake_embedding(text: str, dim: int = FAKE_EMBED_DIM) -> list[float]:
+    """Deterministic unit vector: signed feature hashing of the text's tokens."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token, count in Counter(_tokens(text)).items():
+        digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += (1.0 if digest[4] & 1 else -1.0) * (1 + np.log(count))
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector.tolist()
+
+
+_CANDIDATE_RE = re.compile(
+    r"ID: (?P<id>\S+)\nName: (?P<name>.*?)\nResume excerpt:\n(?P<excerpt>.*?)(?=\n---\n|\Z)",
+    re.DOTALL,
+)
+
+
+def fake_scores(prompt: str) -> list[dict]:
+    """Score every candidate in a scoring prompt by job-query term overlap."""
+    query = prompt.split("JOB QUERY:\n", 1)[1].split("\n\nCANDIDATES:\n", 1)[0]
+    block = prompt.split("\n\nCANDIDATES:\n", 1)[1].split("\n\nReturn a JSON array", 1)[0]
+    terms = {t for t in _tokens(query) if len(t) > 2}
+    results = []
+    for match in _CANDIDATE_RE.finditer(block):
+        found = terms & set(_tokens(match.group("excerpt")))
+        score = round(100 * len(found) / len(terms)) if terms else 0
+        results.append({
+            "id": match.group("id"),
+            "score": score,
+            "summary": f"{match.group('name')} (synthetic profile).",
+            "match_reason": "Mentions " + (", ".join(sorted(found)) or "none of the query terms") + ".",
+            "gaps": ", ".join(sorted(terms - found)) or "None",
+        })
+    return results
+
+
+_RESUME_RE = re.compile(r"^RESUME (\d+):\n(.*?)(?=\n\nRESUME \d+:\n|\Z)", re.MULTILINE | re.DOTALL)
+
+
+def fake_names(prompt: str) -> list[dict]:
+    """Answer a name extraction prompt with each snippet's first non-empty line."""
+    results = []
+    for match in _RESUME_RE.finditer(prompt):
+        lines = [line.strip() for line in match.group(2).splitlines() if line.strip()]
+        results.append({"resume": int(match.group(1)), "name": lines[0] if lines else "Unknown"})
+    return results
+
+
+def _usage(prompt: str, text: str) -> SimpleNamespace:
+    """Token counts estimated at ~4 characters per token."""
+    return SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4)
+
+
+class _Models:
+    def __init__(self, client: "FakeGemini"):
+        self._client = client
+
+    def embed_content(self, model: str, contents, config=None):
+        self._client.faults.apply()
+        self._client.calls["embed_content"] += 1
+        texts = [contents] if isinstance(contents, str) else list(contents)
+        dim = getattr(config, "output_dimensionality", None) or FAKE_EMBED_DIM
+        self._client.calls["embedded_texts"] += len(texts)
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=fake_embedding(t, dim)) for t in texts])
+
+    def _respond(self, prompt: str) -> str:
+        if "JOB QUERY:" in prompt:
+            return json.dumps(fake_scores(prompt), indent=2)
+        return json.dumps(fake_names(prompt))
+
+    def generate_content(self, model: str, contents, config=None):
+        self._client.faults.apply()
+        self._client.calls["generate_content"] += 1
+        text = self._respond(contents)
+        return SimpleNamespace(text=text, usage_metadata=_usage(contents, text))
+
+    def generate_content_stream(self, model: str, contents, config=None):
+        # Time to first chunk is a fifth of the latency; the rest is spread over the chunks
+        self._client.faults.apply(0.2)
+        self._client.calls["generate_content_stream"] += 1
+        text = self._respond(contents)
+        pieces = [text[i:i + 200] for i in range(0, len(text), 200)] or [""]
+        delay = self._client.faults.delay(0.8) / len(pieces)
+
+        def chunks():
+            for i, piece in enumerate(pieces):
+                if i and delay:
+                    time.sleep(delay)
+                last = i == len(pieces) - 1
+                yield SimpleNamespace(text=piece, usage_metadata=_usage(contents, text) if last else None)
+
+        return chunks()
+
+
+class FakeGemini:
+    """Stand-in for genai.Client: deterministic embeddings, names and scores."""
+
+    def __init__(self, faults: FaultProfile | None = None):
+        self.faults = faults or FaultProfile()
+        self.calls: Counter = Counter()
+        self.models = _Models(self)
+
+
+# ── Wiring ────────────────────────────────────────────────────────────────────
+
+_supabase: FakeSupabase | None = None
+_gemini: FakeGemini | None = None
+_lock = threading.Lock()
+
+
+def supabase_client() -> FakeSupabase:
+    """The process-wide fake Supabase (database and storage share it)."""
+    global _supabase
+    with _lock:
+        if _supabase is None:
+            _supabase = FakeSupabase(FaultProfile.from_env("db"), FaultProfile.from_env("storage"))
+        return _supabase
+
+
+def gemini_client() -> FakeGemini:
+    """The process-wide fake Gemini client."""
+    global _gemini
+    with _lock:
+        if _gemini is None:
+            _gemini = FakeGemini(FaultProfile.from_env("gemini"))
+        return _gemini
+
+
+def install(
+    db: FaultProfile | None = None,
+    storage: FaultProfile | None = None,
+    gemini: FaultProfile | None = None,
+) -> tuple[FakeSupabase, FakeGemini]:
+    """
+    Replace the clients of lib.db, lib.storage and lib.ai with fresh fakes.
+    Profiles not given are read from the environment.
+    """
+    global _supabase, _gemini
+    from lib import ai, db as db_module, storage as storage_module
+
+    with _lock:
+        _supabase = FakeSupabase(db or FaultProfile.from_env("db"), storage or FaultProfile.from_env("storage"))
+        _gemini = FakeGemini(gemini or FaultProfile.from_env("gemini"))
+    db_module._client = _supabase
+    storage_module._client = _supabase
+    ai._client = _gemini
+    return _supabase, _gemini
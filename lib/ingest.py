@@ -0,0 +1,304 @@
+import hashlib
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Iterable, Iterator
+
+from lib import lexical_index, metrics
+from lib.pdf_parser import NAME_MIN_CONFIDENCE, extract_text, extract_name_heuristic, guess_candidate_name
+from lib.ai import get_embeddings, extract_candidate_names
+from lib.embedding_cache import text_hash
+from lib.storage import upload_pdf
+from lib.db import DuplicateContent, insert_resumes, find_resume_by_hash
+
+# Number of files in flight at once. Most of the per-file time is spent
+# waiting on Gemini and Supabase, so this can comfortably exceed the CPU count.
+DEFAULT_CONCURRENCY = int(os.environ.get("INGEST_CONCURRENCY", "4"))
+
+# Prepared files are embedded and inserted together once this many are ready.
+EMBED_FLUSH_SIZE = int(os.environ.get("INGEST_EMBED_FLUSH_SIZE", "32"))
+
+
+class IngestError(Exception):
+    """A file was read successfully but could not be ingested."""
+
+
+class DuplicateResume(IngestError):
+    """The same resume is already stored in the target batch."""
+
+    def __init__(self, row: dict):
+        super().__init__(f"already uploaded to batch {row['batch_name']}")
+        self.row = row
+
+
+# What DuplicateResume carries: enough to tell whose row it is (see lib.job_worker)
+_DUPLICATE_COLUMNS = "id, batch_name, candidate_name, file_name, storage_path"
+
+
+def _find_reusable(batch_name: str, extra_columns: str = "", **hash_filter) -> dict | None:
+    """
+    Look up an existing resume by hash. Raises DuplicateResume if one is already
+    in this batch; otherwise returns the most recent match (or None) for reuse,
+    with _DUPLICATE_COLUMNS and `extra_columns`. One request when nothing
+    matches, two when the latest match is in another batch.
+    """
+    columns = f"{_DUPLICATE_COLUMNS}, {extra_columns}" if extra_columns else _DUPLICATE_COLUMNS
+    latest = find_resume_by_hash(columns=columns, **hash_filter)
+    if latest is None:
+        return None
+    if latest["batch_name"] == batch_name:
+        raise DuplicateResume(latest)
+    in_batch = find_resume_by_hash(batch_name=batch_name, columns=_DUPLICATE_COLUMNS, **hash_filter)
+    if in_batch is not None:
+        raise DuplicateResume(in_batch)
+    return latest
+
+
+class _PendingHashes:
+    """
+    Content and text hashes of the files an ingest run is still processing,
+    per batch. Their rows aren't in the database until their group is
+    inserted, so a second copy of a file in the same upload would pass the
+    database lookups; it is caught here instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._owners: dict[tuple, dict] = {}  # (batch, column, hash) -> stand-in row of the first file
+        self._keys: dict[int, list[tuple]] = {}  # input index -> keys it holds
+
+    def claim(self, index: int, row: dict, column: str, value: str):
+        """Record the hash for file `index`, or raise DuplicateResume if another file holds it."""
+        key = (row["batch_name"], column, value)
+        with self._lock:
+            owner = self._owners.setdefault(key, row)
+            if owner is not row:
+                raise DuplicateResume(owner)
+            self._keys.setdefault(index, []).append(key)
+
+    def release(self, index: int):
+        """Forget file `index`'s hashes, e.g. because it failed before being stored."""
+        with self._lock:
+            for key in self._keys.pop(index, []):
+                self._owners.pop(key, None)
+
+
+def prepare_file(
+    file_name: str,
+    pdf_bytes: bytes,
+    batch_name: str,
+    storage_path: str | None = None,
+    claim: Callable[[str, str], None] | None = None,
+) -> dict:
+    """
+    Run the per-file part of the ingest pipeline:
+    extract text → candidate name → storage upload (to storage_path if given,
+    so a retried file overwrites its own earlier upload).
+    Returns the row fields for insert_resumes. "embedding" is set when it could
+    be reused from an identical resume, otherwise None. "candidate_name" is None
+    when the name heuristic wasn't confident; finish_files asks the model then.
+    Raises DuplicateResume for exact duplicates within the batch and
+    IngestError for files with no text. `claim(column, hash)`, if given, is
+    called with each hash before its lookup and may raise DuplicateResume too.
+    """
+    content_hash = hashlib.sha256(pdf_bytes).hexdigest()
+    if claim:
+        claim("content_hash", content_hash)
+
+    # Same PDF already stored in another batch: reuse everything, skip all calls
+    source = _find_reusable(
+        batch_name, "extracted_text, embedding, text_hash", content_hash=content_hash
+    )
+    if source and source.get("embedding"):
+        return {
+            "batch_name": batch_name,
+            "candidate_name": source["candidate_name"],
+            "file_name": file_name,
+            "storage_path": source["storage_path"],
+            "extracted_text": source["extracted_text"],
+            "embedding": source["embedding"],
+            "content_hash": content_hash,
+            "text_hash": source.get("text_hash") or text_hash(source["extracted_text"]),
+        }
+
+    # 1. Extract text
+    text = extract_text(pdf_bytes)
+    if not text.strip():
+        raise IngestError("no text could be extracted (scanned PDF?)")
+    doc_text_hash = text_hash(text)
+    if claim:
+        claim("text_hash", doc_text_hash)
+
+    # 2. Candidate name: reused when the same text was seen before, else the
+    #    heuristic's guess if it is confident enough
+    source = _find_reusable(batch_name, text_hash=doc_text_hash)
+    if source:
+        name = source["candidate_name"]
+        metrics.count("candidate_names", source="reused")
+    else:
+        name, confidence = guess_candidate_name(text)
+        if confidence < NAME_MIN_CONFIDENCE:
+            name = None
+        else:
+            metrics.count("candidate_names", source="heuristic")
+
+    # 3. Upload PDF to Supabase Storage
+    if storage_path is None:
+        safe_filename = file_name.replace(" ", "_")
+        storage_path = f"{batch_name}/{uuid.uuid4().hex}_{safe_filename}"
+    upload_pdf(pdf_bytes, storage_path)
+
+    return {
+        "batch_name": batch_name,
+        "candidate_name": name,
+        "file_name": file_name,
+        "storage_path": storage_path,
+        "extracted_text": text,
+        "embedding": source.get("embedding") if source else None,
+        "content_hash": content_hash,
+        "text_hash": doc_text_hash,
+    }
+
+
+def finish_files(docs: list[dict]) -> list[dict]:
+    """
+    Name, embed and insert a group of prepared files with batched requests:
+    names the heuristic wasn't sure of are extracted in one model request,
+    alongside the embedding requests, and rows go in with bulk inserts.
+    Docs that already carry a reused embedding are not re-embedded.
+    Returns one result per doc, in order.
+    """
+    unnamed = [d for d in docs if d["candidate_name"] is None]
+    to_embed = [d for d in docs if d["embedding"] is None]
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        names = pool.submit(extract_candidate_names, [d["extracted_text"] for d in unnamed]) if unnamed else None
+
+        # 4. Generate embeddings
+        embeddings = get_embeddings([d["extracted_text"] for d in to_embed], return_exceptions=True)
+        for doc, embedding in zip(to_embed, embeddings):
+            doc["embedding"] = embedding
+
+        # 2. (cont.) Model names, with the heuristic's best guess as the fallback
+        for doc, name in zip(unnamed, names.result() if names else []):
+            if name == "Unknown":
+                name = extract_name_heuristic(doc["extracted_text"])
+                metrics.count("candidate_names", source="fallback")
+            else:
+                metrics.count("candidate_names", source="model")
+            doc["candidate_name"] = name
+
+    # 5. Insert into DB
+    to_insert = [d for d in docs if not isinstance(d["embedding"], Exception)]
+    inserted = iter(insert_resumes(to_insert))
+    results = []
+    for doc in docs:
+        if isinstance(doc["embedding"], Exception):
+            results.append(_result(doc["file_name"], error=f"embedding failed: {doc['embedding']}"))
+            continue
+        row = next(inserted)
+        if isinstance(row, DuplicateContent):
+            # Stored meanwhile by another worker or session
+            existing = find_resume_by_hash(
+                content_hash=doc["content_hash"], batch_name=doc["batch_name"], columns=_DUPLICATE_COLUMNS
+            )
+            results.append(_result(doc["file_name"], row=existing, duplicate=True) if existing
+                           else _result(doc["file_name"], error=str(row)))
+            continue
+        if isinstance(row, Exception):
+            results.append(_result(doc["file_name"], error=str(row)))
+            continue
+        results.append(_result(doc["file_name"], row=row))
+
+        # 6. Add to the local keyword index (it also catches up on its own at search time)
+        try:
+            lexical_index.add_document(row["id"], row["batch_name"], row["extracted_text"])
+        except Exception:
+            pass
+    return results
+
+
+def _result(file_name: str, row: dict | None = None, error: str | None = None, duplicate: bool = False) -> dict:
+    return {"file_name": file_name, "row": row, "error": error, "duplicate": duplicate}
+
+
+def ingest_files(
+    files: Iterable,
+    batch_name: str | None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> Iterator[dict]:
+    """
+    Ingest files concurrently, yielding one result per file as it finishes.
+    `files` is any iterable of objects with `.name` and `.read()` (e.g. Streamlit
+    UploadedFile), optionally with a `.storage_path` to upload to instead of a
+    fresh random one and a `.batch_name` that overrides `batch_name`. At most
+    `concurrency` tasks are in flight at once; the iterable is only advanced
+    as slots free up.
+    Prepared files are embedded and inserted together in groups of EMBED_FLUSH_SIZE.
+    Each result is {"file_name", "index", "row", "error", "duplicate"} where
+    index is the file's position in `files` — exactly one of row/error is set.
+    Files already in the batch come back with duplicate=True and the existing
+    row; a second copy of a file earlier in the same run, not stored yet,
+    comes back with duplicate=True and a row without an id.
+    """
+    concurrency = max(1, concurrency)
+    files_iter = enumerate(files)
+    pending = _PendingHashes()
+
+    def _prepare(index: int, file) -> dict:
+        target_batch = getattr(file, "batch_name", None) or batch_name
+        storage_path = getattr(file, "storage_path", None)
+        owner = {"id": None, "batch_name": target_batch, "file_name": file.name, "storage_path": storage_path}
+        try:
+            doc = prepare_file(
+                file.name,
+                file.read(),
+                target_batch,
+                storage_path,
+                claim=lambda column, value: pending.claim(index, owner, column, value),
+            )
+            return {"index": index, "doc": doc, "result": None}
+        except DuplicateResume as e:
+            result = _result(file.name, row=e.row, duplicate=True)
+        except Exception as e:
+            result = _result(file.name, error=str(e))
+        pending.release(index)
+        return {"index": index, "doc": None, "result": {**result, "index": index}}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        preparing = set()
+        finishing: dict = {}  # future -> input indices of its docs
+        ready: list[tuple[int, dict]] = []
+        exhausted = False
+        while True:
+            while not exhausted and len(preparing) + len(finishing) < concurrency:
+                item = next(files_iter, None)
+                if item is None:
+                    exhausted = True
+                    break
+                preparing.add(pool.submit(_prepare, *item))
+
+            # Flush when a full group is ready, or when nothing else will arrive.
+            if ready and (len(ready) >= EMBED_FLUSH_SIZE or (exhausted and not preparing)):
+                future = pool.submit(finish_files, [doc for _, doc in ready])
+                finishing[future] = [index for index, _ in ready]
+                ready = []
+
+            if not preparing and not finishing:
+                return
+
+            done, _ = wait(preparing | set(finishing), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in preparing:
+                    preparing.discard(future)
+                    prepared = future.result()
+                    if prepared["result"]:
+                        yield prepared["result"]
+                    else:
+                        ready.append((prepared["index"], prepared["doc"]))
+                else:
+                    indices = finishing.pop(future)
+                    for index, result in zip(indices, future.result()):
+                        if result["error"]:
+                            pending.release(index)  # so a later copy isn't reported as its duplicate
+                        yield {**result, "index": index}
@@ -0,0 +1,154 @@
+"""
+Ingest worker: drains the upload job queue in lib.jobs.
+
+    python -m lib.job_worker [--concurrency 4] [--idle-exit SECONDS]
+
+Run as many as needed, on this machine or others sharing the queue file;
+throughput scales with the number of workers. Each file is re-runnable: it
+uploads to a fixed storage path (overwriting a partial earlier attempt), and a
+row an earlier attempt already inserted is found by its content hash and
+recognised as our own by that storage path, so a file retried after a crash
+is neither stored twice nor reported as a duplicate.
+
+A worker running in its own process saves its metrics (lib.metrics) to the
+queue database with every heartbeat, where the app's Metrics page merges them
+with its own.
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from typing import Iterator
+
+from lib import jobs, metrics
+from lib.ingest import ingest_files
+
+POLL_SECONDS = 2.0
+
+# Recent spans included in each saved metrics snapshot
+METRICS_RECENT_SPANS = 200
+
+
+class _SpooledFile:
+    """A queued file as ingest_files expects it: .name, .read(), its .batch_name and a fixed .storage_path."""
+
+    def __init__(self, file: dict):
+        self.name = file["file_name"]
+        self.batch_name = file["batch_name"]
+        self.storage_path = file["storage_path"]
+        self._path = file["spool_path"]
+
+    def read(self) -> bytes:
+        with open(self._path, "rb") as f:
+            return f.read()
+
+
+def _outcome(file: dict, result: dict) -> tuple[str, str | None, str | None]:
+    """(state, error, resume_id) to record for one ingest result."""
+    if result["error"]:
+        return "error", result["error"], None
+    row = result["row"]
+    # Our own row from an earlier attempt that died before it was recorded
+    if result["duplicate"] and row.get("storage_path") != file["storage_path"]:
+        return "duplicate", None, row.get("id")
+    return "done", None, row.get("id")
+
+
+def _claim_stream(worker_id: str, stop: threading.Event, claimed: list[dict]) -> Iterator[_SpooledFile]:
+    """
+    Claim queued files one at a time, as ingest_files frees a slot for the
+    next one. Ends when the queue is empty or the worker is stopping.
+    """
+    while not stop.is_set():
+        files = jobs.claim_files(worker_id, limit=1)
+        if not files:
+            return
+        claimed.append(files[0])
+        yield _SpooledFile(files[0])
+
+
+def process(worker_id: str, stop: threading.Event, concurrency: int) -> int:
+    """
+    Ingest queued files until the queue runs dry, recording each outcome as
+    soon as it is known. Files are claimed lazily into one ingest_files run,
+    so embedding, naming and insert groups fill up to EMBED_FLUSH_SIZE and
+    new files start while earlier groups finish. Returns the number claimed.
+    """
+    claimed: list[dict] = []
+    for result in ingest_files(_claim_stream(worker_id, stop, claimed), None, concurrency):
+        file = claimed[result["index"]]
+        state, error, resume_id = _outcome(file, result)
+        jobs.complete_file(worker_id, file["job_id"], file["idx"], state, error, resume_id)
+    return len(claimed)
+
+
+def run(
+    worker_id: str,
+    concurrency: int,
+    idle_exit: float | None = None,
+    stop: threading.Event | None = None,
+):
+    """Process queued files until stopped (SIGTERM/SIGINT or `stop`) or idle for idle_exit seconds."""
+    stop = stop or threading.Event()
+    # Run as a thread of the app (FAKE_SERVICES, benchmarks), the worker shares
+    # the app's signal handling and metrics
+    own_process = threading.current_thread() is threading.main_thread()
+    if own_process:
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    jobs.register_worker(worker_id)
+
+    def _save_metrics():
+        if own_process:
+            jobs.save_worker_metrics(worker_id, _metrics_snapshot)
+
+    def _beat():
+        while not stop.wait(jobs.HEARTBEAT_SECONDS):
+            try:
+                jobs.heartbeat(worker_id)
+                _save_metrics()
+            except Exception:
+                pass
+
+    threading.Thread(target=_beat, daemon=True).start()
+    idle_since = time.monotonic()
+    try:
+        while not stop.is_set():
+            if process(worker_id, stop, concurrency):
+                idle_since = time.monotonic()
+                continue
+            if idle_exit and time.monotonic() - idle_since > idle_exit:
+                break
+            stop.wait(POLL_SECONDS)
+    finally:
+        stop.set()  # ends the heartbeat thread
+        try:
+            _save_metrics()
+        except Exception:
+            pass
+        jobs.unregister_worker(worker_id)
+
+
+def _metrics_snapshot(reset: bool) -> dict:
+    if reset:
+        metrics.reset()
+    return metrics.to_json(recent=METRICS_RECENT_SPANS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=jobs.WORKER_CONCURRENCY, help="files in flight")
+    parser.add_argument("--idle-exit", type=float, default=None, help="exit after this many idle seconds")
+    parser.add_argument("--worker-id", default=None)
+    args = parser.parse_args()
+    worker_id = args.worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+    print(f"job worker {worker_id} (pid {os.getpid()}) started", flush=True)
+    run(worker_id, args.concurrency, args.idle_exit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,690 @@
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+from lib import db, fakes
+
+# Durable upload queue. The Upload page spools PDFs to disk and records a job
+# with one row per file; worker processes (python -m lib.job_worker) claim
+# pending files under a time-limited lease and run them through the ingest
+# pipeline. A worker that dies simply stops renewing its leases, so its files
+# are picked up again by another worker once the lease runs out.
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", ".cache/jobs.sqlite3")
+SPOOL_DIR = os.environ.get("JOBS_SPOOL_DIR", ".cache/job_spool")
+
+LEASE_SECONDS = float(os.environ.get("JOBS_LEASE_SECONDS", "120"))
+HEARTBEAT_SECONDS = float(os.environ.get("JOBS_HEARTBEAT_SECONDS", "10"))
+MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", "3"))
+
+# Worker processes the app keeps running (see ensure_workers) and how many
+# files each processes in parallel.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+WORKER_CONCURRENCY = int(os.environ.get("JOB_WORKER_CONCURRENCY", os.environ.get("INGEST_CONCURRENCY", "4")))
+WORKER_IDLE_EXIT_SECONDS = float(os.environ.get("JOB_WORKER_IDLE_EXIT_SECONDS", "600"))
+
+FILE_STATES = ("pending", "done", "duplicate", "error", "cancelled")
+
+# Files larger than this are recorded as failed instead of being queued.
+MAX_FILE_BYTES = int(float(os.environ.get("JOBS_MAX_FILE_MB", "50")) * 1024 * 1024)
+
+# Folders and ZIP archives on the server can only be imported from inside this
+# directory. Empty disables server-side imports.
+IMPORT_ROOT = os.environ.get("JOBS_IMPORT_ROOT", "")
+
+# While a job is spooled its files are queued in groups of this size, so
+# workers start on the first files before the last ones are unpacked.
+SPOOL_FLUSH_FILES = 16
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+_completions_seen: tuple | None = None
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(JOBS_DB_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode; multi-statement updates use explicit transactions
+        _conn = sqlite3.connect(JOBS_DB_PATH, timeout=30, check_same_thread=False, isolation_level=None)
+        _conn.execute("pragma journal_mode = wal")
+        _conn.executescript(
+            """
+            create table if not exists jobs (
+                job_id      text primary key,
+                batch_name  text not null,
+                status      text not null,      -- spooling | queued | running | done | cancelled
+                total       integer not null,
+                created_at  real not null,
+                finished_at real,
+                error       text                -- set when spooling was cut short
+            );
+            create table if not exists job_files (
+                job_id        text not null,
+                idx           integer not null,
+                file_name     text not null,
+                spool_path    text not null,
+                storage_path  text not null,
+                state         text not null default 'pending',
+                attempts      integer not null default 0,
+                lease_owner   text,
+                lease_until   real,
+                error         text,
+                resume_id     text,
+                updated_at    real not null,
+                primary key (job_id, idx)
+            );
+            create index if not exists job_files_state_idx on job_files (state, lease_until);
+            create table if not exists workers (
+                worker_id   text primary key,
+                pid         integer,
+                host        text,
+                started_at  real not null,
+                heartbeat   real not null,
+                files_done  integer not null default 0
+            );
+            create table if not exists rate_buckets (
+                name          text primary key,
+                rate          real not null,    -- tokens per second
+                tokens        real not null,
+                updated       real not null,
+                blocked_until real not null default 0
+            );
+            create table if not exists worker_metrics (
+                worker_id   text primary key,
+                updated_at  real not null,
+                snapshot    text,               -- lib.metrics.to_json() of the worker; null after a reset
+                reset       integer not null default 0  -- set by reset_worker_metrics until the worker resets
+            );
+            """
+        )
+        # Queue files created before jobs.error existed
+        if "error" not in {row[1] for row in _conn.execute("pragma table_info(jobs)")}:
+            _conn.execute("alter table jobs add column error text")
+    return _conn
+
+
+class _Transaction:
+    """`with _Transaction() as conn:` — process-exclusive write transaction."""
+
+    def __enter__(self) -> sqlite3.Connection:
+        _lock.acquire()
+        try:
+            self.conn = _get_conn()
+            self.conn.execute("begin immediate")
+        except BaseException:
+            _lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("rollback" if exc_type else "commit")
+        finally:
+            _lock.release()
+
+
+def _rows(cursor: sqlite3.Cursor) -> list[dict]:
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+# ── Jobs ──────────────────────────────────────────────────────────────────────
+
+class ArchiveEntry:
+    """A PDF inside a ZIP archive, read straight from the archive when spooled."""
+
+    def __init__(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        self.name = os.path.basename(info.filename)
+        self.size = info.file_size
+        self._archive, self._info = archive, info
+
+    def open(self):
+        return self._archive.open(self._info)
+
+
+class FolderFile:
+    """A PDF in a server-side folder. Jobs use it in place rather than copying it."""
+
+    def __init__(self, path: str):
+        self.name = os.path.basename(path)
+        self.size = os.path.getsize(path)
+        self.path = path
+
+
+def _is_pdf_name(name: str) -> bool:
+    base = os.path.basename(name)
+    return base.lower().endswith(".pdf") and not base.startswith(".") and "__MACOSX/" not in name
+
+
+@contextmanager
+def zip_entries(source) -> Iterator[list[ArchiveEntry]]:
+    """
+    `with zip_entries(source) as entries:` the PDFs in a ZIP archive (a path or
+    binary file object), in archive order; the archive is closed on exit. Only
+    its directory is read here; each entry is decompressed when it is spooled.
+    Raises zipfile.BadZipFile for anything that isn't a ZIP.
+    """
+    with zipfile.ZipFile(source) as archive:
+        yield [ArchiveEntry(archive, info) for info in archive.infolist() if not info.is_dir() and _is_pdf_name(info.filename)]
+
+
+def folder_files(path: str) -> list[FolderFile]:
+    """The PDFs under a server-side folder (recursively), sorted by path."""
+    paths = []
+    for directory, subdirectories, names in os.walk(path):
+        subdirectories.sort()
+        paths += [os.path.join(directory, n) for n in sorted(names) if _is_pdf_name(n)]
+    return [FolderFile(p) for p in paths]
+
+
+def resolve_import_path(path: str) -> str:
+    """Absolute form of a server-side import path, which must exist inside IMPORT_ROOT."""
+    if not IMPORT_ROOT:
+        raise ValueError("server-side imports are disabled (JOBS_IMPORT_ROOT is not set)")
+    root = os.path.realpath(IMPORT_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"{path} is outside the import folder {IMPORT_ROOT}")
+    if not os.path.exists(resolved):
+        raise ValueError(f"{path} does not exist")
+    return resolved
+
+
+def _spool(file, spool_path: str) -> str | None:
+    """
+    Copy a file to spool_path a chunk at a time, so memory use doesn't depend
+    on the file's size. Returns an error message instead for oversized files.
+    """
+    written = 0
+    source = file.open() if hasattr(file, "open") else file
+    try:
+        with open(spool_path, "wb") as f:
+            while chunk := source.read(_COPY_CHUNK_BYTES):
+                written += len(chunk)
+                if written > MAX_FILE_BYTES:
+                    break
+                f.write(chunk)
+    finally:
+        if source is not file:
+            source.close()
+    if written > MAX_FILE_BYTES:
+        os.remove(spool_path)
+        return _too_large()
+    return None
+
+
+def _too_large() -> str:
+    return f"larger than the {MAX_FILE_BYTES / (1024 * 1024):g} MB limit"
+
+
+def create_job(
+    batch_name: str,
+    files: Iterable,
+    on_progress: Callable[[int], None] | None = None,
+) -> str:
+    """
+    Queue files as one job and return its id. `files` are objects with `.name`
+    and either `.read()` (e.g. Streamlit UploadedFile), `.open()`
+    (ArchiveEntry) or `.path` (FolderFile, used in place). They are spooled to
+    disk one at a time and queued in groups of SPOOL_FLUSH_FILES, so workers
+    start before the last file is spooled. on_progress gets the number of
+    files queued so far. Cancelling the job stops the spooling. If spooling
+    is cut short (e.g. a Streamlit rerun interrupts the page), the files
+    spooled so far stay queued and the job records an error saying so.
+    """
+    job_id = uuid.uuid4().hex
+    directory = os.path.join(SPOOL_DIR, job_id)
+    os.makedirs(directory, exist_ok=True)
+    with _Transaction() as conn:
+        conn.execute(
+            "insert into jobs (job_id, batch_name, status, total, created_at) values (?, ?, 'spooling', 0, ?)",
+            (job_id, batch_name, time.time()),
+        )
+
+    rows = []
+    queued = 0
+    spool_path = None
+    complete = False
+    try:
+        for idx, file in enumerate(files):
+            # Fixed per file, so a retried upload overwrites its own earlier attempt
+            safe_filename = file.name.replace(" ", "_")
+            storage_path = f"{batch_name}/{job_id[:12]}{idx:05d}_{safe_filename}"
+            if hasattr(file, "path"):
+                spool_path = file.path
+                error = None if file.size <= MAX_FILE_BYTES else _too_large()
+            else:
+                spool_path = os.path.join(directory, f"{idx:05d}.pdf")
+                error = _spool(file, spool_path)
+            rows.append((job_id, idx, file.name, "" if error else spool_path, storage_path,
+                         "error" if error else "pending", error, time.time()))
+            spool_path = None
+            if len(rows) >= SPOOL_FLUSH_FILES:
+                if not _queue_files(job_id, rows):
+                    complete = True  # cancelled meanwhile
+                    return job_id
+                queued, rows = queued + len(rows), []
+                if on_progress:
+                    on_progress(queued)
+        if rows and _queue_files(job_id, rows):
+            queued, rows = queued + len(rows), []
+            if on_progress:
+                on_progress(queued)
+        complete = True
+    finally:
+        if not complete:
+            # Interrupted: drop the partly copied file, keep the rest
+            if spool_path:
+                _remove_spooled(job_id, [spool_path])
+            if rows and _queue_files(job_id, rows):
+                queued += len(rows)
+            with _Transaction() as conn:
+                conn.execute(
+                    "update jobs set error = ? where job_id = ? and status = 'spooling'",
+                    (f"upload interrupted after {queued} files were queued; upload the rest again", job_id),
+                )
+        with _Transaction() as conn:
+            conn.execute(
+                "update jobs set status = case when exists "
+                "(select 1 from job_files where job_id = ? and state != 'pending') then 'running' else 'queued' end "
+                "where job_id = ? and status = 'spooling'",
+                (job_id, job_id),
+            )
+            _finish_jobs(conn, {job_id})
+    return job_id
+
+
+def _queue_files(job_id: str, rows: list[tuple]) -> bool:
+    """Add spooled files to a job. Returns False (and drops them) if the job was cancelled meanwhile."""
+    with _Transaction() as conn:
+        status = conn.execute("select status from jobs where job_id = ?", (job_id,)).fetchone()[0]
+        if status == "spooling":
+            conn.executemany(
+                "insert into job_files (job_id, idx, file_name, spool_path, storage_path, state, error, updated_at) "
+                "values (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("update jobs set total = total + ? where job_id = ?", (len(rows), job_id))
+            return True
+    _remove_spooled(job_id, [row[3] for row in rows])
+    return False
+
+
+def sync_read_cache():
+    """
+    Resumes are inserted by worker processes, whose writes this process's
+    read cache (lib.db) can't see: invalidate its resume listings whenever
+    more files have been stored since the last call.
+    """
+    global _completions_seen
+    with _lock:
+        marker = _get_conn().execute(
+            "select count(*), max(updated_at) from job_files where state = 'done'"
+        ).fetchone()
+    if marker != _completions_seen:
+        _completions_seen = marker
+        db.invalidate_reads("resumes")
+
+
+def list_jobs(limit: int = 20) -> list[dict]:
+    """Most recent jobs first, each with a count of its files per state."""
+    sync_read_cache()
+    with _lock:
+        conn = _get_conn()
+        jobs = _rows(conn.execute("select * from jobs order by created_at desc limit ?", (limit,)))
+        if not jobs:
+            return []
+        placeholders = ",".join("?" * len(jobs))
+        counts = conn.execute(
+            f"select job_id, state, count(*) from job_files where job_id in ({placeholders}) "
+            "group by job_id, state",
+            [j["job_id"] for j in jobs],
+        ).fetchall()
+    by_job: dict[str, dict] = {j["job_id"]: {s: 0 for s in FILE_STATES} for j in jobs}
+    for job_id, state, n in counts:
+        by_job[job_id][state] = n
+    for job in jobs:
+        job["counts"] = by_job[job["job_id"]]
+        job["finished"] = job["total"] - job["counts"]["pending"]
+    return jobs
+
+
+def job_files(job_id: str, states: tuple[str, ...] | None = None) -> list[dict]:
+    """A job's files in upload order, optionally only those in the given states."""
+    sql = "select * from job_files where job_id = ?"
+    params: list = [job_id]
+    if states:
+        sql += f" and state in ({','.join('?' * len(states))})"
+        params += list(states)
+    with _lock:
+        return _rows(_get_conn().execute(sql + " order by idx", params))
+
+
+def cancel_job(job_id: str):
+    """Stop a job: its pending files are not started (files already in progress may still be stored)."""
+    now = time.time()
+    with _Transaction() as conn:
+        cancelled = [
+            row[0] for row in conn.execute(
+                "select spool_path from job_files where job_id = ? and state = 'pending'", (job_id,)
+            ).fetchall()
+        ]
+        conn.execute(
+            "update job_files set state = 'cancelled', updated_at = ? where job_id = ? and state = 'pending'",
+            (now, job_id),
+        )
+        conn.execute(
+            "update jobs set status = 'cancelled', finished_at = ? "
+            "where job_id = ? and status in ('spooling', 'queued', 'running')",
+            (now, job_id),
+        )
+    _remove_spooled(job_id, cancelled)
+
+
+def retry_failed(job_id: str) -> int:
+    """Queue a job's failed files again. Returns how many were re-queued."""
+    with _Transaction() as conn:
+        spooled = [
+            (idx, path) for idx, path in conn.execute(
+                "select idx, spool_path from job_files where job_id = ? and state = 'error'", (job_id,)
+            ).fetchall()
+            if os.path.exists(path)
+        ]
+        conn.executemany(
+            "update job_files set state = 'pending', attempts = 0, error = null, lease_owner = null, "
+            "lease_until = null, updated_at = ? where job_id = ? and idx = ?",
+            [(time.time(), job_id, idx) for idx, _ in spooled],
+        )
+        if spooled:
+            conn.execute("update jobs set status = 'queued', finished_at = null where job_id = ?", (job_id,))
+    return len(spooled)
+
+
+def _remove_spooled(job_id: str, paths: list[str]):
+    """
+    Delete spooled copies that are no longer needed. Failed files keep theirs
+    so they can be retried; the job's directory goes once it is empty.
+    Files imported in place from a server folder are never deleted.
+    """
+    directory = os.path.join(SPOOL_DIR, job_id)
+    for path in paths:
+        if os.path.dirname(path) != directory:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    try:
+        os.rmdir(directory)
+    except OSError:
+        pass
+
+
+# ── Worker side ───────────────────────────────────────────────────────────────
+
+def claim_files(worker_id: str, limit: int) -> list[dict]:
+    """
+    Lease up to `limit` pending files (oldest job first) to this worker.
+    Files whose lease expired or was released are claimable again; one that
+    has already been claimed MAX_ATTEMPTS times (its workers keep dying or
+    being stopped on it) is failed instead.
+    """
+    now = time.time()
+    with _Transaction() as conn:
+        abandoned = conn.execute(
+            "select job_id, idx from job_files where state = 'pending' and attempts >= ? "
+            "and (lease_until is null or lease_until < ?)",
+            (MAX_ATTEMPTS, now),
+        ).fetchall()
+        conn.executemany(
+            "update job_files set state = 'error', error = ?, lease_owner = null, updated_at = ? "
+            "where job_id = ? and idx = ?",
+            [(f"gave up after {MAX_ATTEMPTS} attempts (worker crashed, was stopped or timed out)", now, j, i)
+             for j, i in abandoned],
+        )
+        files = _rows(conn.execute(
+            "select f.job_id, f.idx, f.file_name, f.spool_path, f.storage_path, f.attempts, j.batch_name "
+            "from job_files f join jobs j on j.job_id = f.job_id "
+            "where f.state = 'pending' and f.attempts < ? and (f.lease_until is null or f.lease_until < ?) "
+            "order by j.created_at, f.idx limit ?",
+            (MAX_ATTEMPTS, now, limit),
+        ))
+        conn.executemany(
+            "update job_files set lease_owner = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? "
+            "where job_id = ? and idx = ?",
+            [(worker_id, now + LEASE_SECONDS, now, f["job_id"], f["idx"]) for f in files],
+        )
+        job_ids = {f["job_id"] for f in files}
+        conn.executemany(
+            "update jobs set status = 'running' where job_id = ? and status = 'queued'",
+            [(j,) for j in job_ids],
+        )
+        _finish_jobs(conn, {j for j, _ in abandoned})
+    return files
+
+
+def complete_file(worker_id: str, job_id: str, idx: int, state: str, error: str | None = None, resume_id: str | None = None):
+    """Record a file's outcome; the job is marked done once no files are pending."""
+    if state not in FILE_STATES:
+        raise ValueError(f"Unknown file state {state!r}")
+    with _Transaction() as conn:
+        spooled = [
+            row[0] for row in conn.execute(
+                "select spool_path from job_files where job_id = ? and idx = ? and state = 'pending'", (job_id, idx)
+            ).fetchall()
+        ]
+        conn.execute(
+            "update job_files set state = ?, error = ?, resume_id = ?, lease_owner = null, lease_until = null, "
+            "updated_at = ? where job_id = ? and idx = ? and state = 'pending'",
+            (state, error, resume_id, time.time(), job_id, idx),
+        )
+        conn.execute("update workers set files_done = files_done + 1 where worker_id = ?", (worker_id,))
+        _finish_jobs(conn, {job_id})
+    if state != "error":
+        _remove_spooled(job_id, spooled)
+
+
+def _finish_jobs(conn: sqlite3.Connection, job_ids: set[str]):
+    """Mark jobs with no pending files left as done."""
+    for job_id in job_ids:
+        pending = conn.execute(
+            "select count(*) from job_files where job_id = ? and state = 'pending'", (job_id,)
+        ).fetchone()[0]
+        if not pending:
+            conn.execute(
+                "update jobs set status = 'done', finished_at = ? where job_id = ? and status in ('queued', 'running')",
+                (time.time(), job_id),
+            )
+
+
+def register_worker(worker_id: str):
+    now = time.time()
+    with _Transaction() as conn:
+        conn.execute(
+            "insert or replace into workers (worker_id, pid, host, started_at, heartbeat) values (?, ?, ?, ?, ?)",
+            (worker_id, os.getpid(), socket.gethostname(), now, now),
+        )
+
+
+def heartbeat(worker_id: str):
+    """Mark the worker alive and extend the leases on the files it holds."""
+    now = time.time()
+    with _Transaction() as conn:
+        conn.execute("update workers set heartbeat = ?, pid = ? where worker_id = ?", (now, os.getpid(), worker_id))
+        conn.execute(
+            "update job_files set lease_until = ? where lease_owner = ? and state = 'pending'",
+            (now + LEASE_SECONDS, worker_id),
+        )
+
+
+def unregister_worker(worker_id: str):
+    """Forget a worker that is exiting and release its leases straight away."""
+    with _Transaction() as conn:
+        conn.execute("delete from workers where worker_id = ?", (worker_id,))
+        conn.execute(
+            "update job_files set lease_owner = null, lease_until = null where lease_owner = ? and state = 'pending'",
+            (worker_id,),
+        )
+
+
+def save_worker_metrics(worker_id: str, snapshot: Callable[[bool], dict]):
+    """
+    Store a worker process's metrics for the app's Metrics page. `snapshot(reset)`
+    returns them as lib.metrics.to_json() data, clearing them first when reset
+    is True (reset_worker_metrics was called since the last save). Rows outlive
+    their workers, so files ingested by workers that have exited still count.
+    """
+    with _Transaction() as conn:
+        row = conn.execute("select reset from worker_metrics where worker_id = ?", (worker_id,)).fetchone()
+        data = json.dumps(snapshot(bool(row and row[0])), default=str)
+        conn.execute(
+            """
+            insert into worker_metrics (worker_id, updated_at, snapshot) values (?, ?, ?)
+            on conflict (worker_id) do update set updated_at = excluded.updated_at, snapshot = excluded.snapshot, reset = 0
+            """,
+            (worker_id, time.time(), data),
+        )
+
+
+def worker_metrics() -> list[dict]:
+    """The metrics snapshots saved by worker processes, for lib.metrics.merge."""
+    with _lock:
+        rows = _get_conn().execute("select snapshot from worker_metrics where snapshot is not null").fetchall()
+    return [json.loads(snapshot) for (snapshot,) in rows]
+
+
+def reset_worker_metrics():
+    """Forget the workers' metrics; live workers clear their own before their next save."""
+    cutoff = time.time() - 3 * HEARTBEAT_SECONDS
+    with _Transaction() as conn:
+        conn.execute(
+            "delete from worker_metrics where worker_id not in (select worker_id from workers where heartbeat >= ?)",
+            (cutoff,),
+        )
+        conn.execute("update worker_metrics set snapshot = null, reset = 1")
+
+
+class SharedTokenBucket:
+    """
+    A lib.rate_limit.TokenBucket kept in the queue database, so the app and
+    all workers using this queue file draw from one budget: whichever of them
+    is busy can use all of it. Back-off after a 429 applies to all of them too.
+    `rate` is the refill rate last seen by this process.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float | None = None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._ceiling = rate
+
+    def take(self) -> float:
+        """Take a token and return 0, or return the seconds to wait before one can be available."""
+        now = time.time()
+        with _Transaction() as conn:
+            row = conn.execute(
+                "select rate, tokens, updated, blocked_until from rate_buckets where name = ?", (self.name,)
+            ).fetchone()
+            rate, tokens, updated, blocked_until = row or (self._ceiling, self.capacity, now, 0.0)
+            rate = min(rate, self._ceiling)  # the configured rate may have been lowered since
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * rate)
+            if now >= blocked_until and tokens >= 1:
+                tokens -= 1
+                delay = 0.0
+            else:
+                delay = max(blocked_until - now, (1 - tokens) / rate)
+            conn.execute(
+                "insert or replace into rate_buckets (name, rate, tokens, updated, blocked_until) values (?, ?, ?, ?, ?)",
+                (self.name, rate, tokens, now, blocked_until),
+            )
+        self.rate = rate
+        return delay
+
+    def increase(self, step: float, ceiling: float):
+        """Raise the refill rate by `step`, up to `ceiling`."""
+        self._update("rate = min(?, rate + ?)", (ceiling, step))
+
+    def throttle(self, floor: float, pause: float | None = None):
+        """Halve the refill rate (not below `floor`), drop saved-up tokens and pause for `pause` seconds."""
+        self._update(
+            "rate = max(?, rate / 2), tokens = min(tokens, 0), blocked_until = max(blocked_until, ?)",
+            (floor, time.time() + (pause or 0)),
+        )
+
+    def _update(self, assignments: str, params: tuple):
+        with _Transaction() as conn:
+            conn.execute(f"update rate_buckets set {assignments} where name = ?", (*params, self.name))
+            row = conn.execute("select rate from rate_buckets where name = ?", (self.name,)).fetchone()
+        if row:
+            self.rate = row[0]
+
+
+def live_workers() -> list[dict]:
+    """Workers that sent a heartbeat recently."""
+    cutoff = time.time() - 3 * HEARTBEAT_SECONDS
+    with _lock:
+        return _rows(_get_conn().execute(
+            "select * from workers where heartbeat >= ? order by started_at", (cutoff,)
+        ))
+
+
+def ensure_workers(count: int = JOB_WORKERS) -> int:
+    """
+    Start worker processes until `count` are alive on this machine. Started
+    workers exit on their own after WORKER_IDLE_EXIT_SECONDS without work.
+    With FAKE_SERVICES they run as threads of this process instead.
+    Returns the number started.
+    """
+    host = socket.gethostname()
+    with _Transaction() as conn:
+        cutoff = time.time() - 3 * HEARTBEAT_SECONDS
+        conn.execute("delete from workers where heartbeat < ?", (cutoff,))
+        alive = conn.execute("select count(*) from workers where host = ?", (host,)).fetchone()[0]
+        started = []
+        for _ in range(max(0, count - alive)):
+            worker_id = f"{host}-{uuid.uuid4().hex[:8]}"
+            # Registered before the process is up, so concurrent callers don't over-spawn
+            now = time.time()
+            conn.execute(
+                "insert into workers (worker_id, pid, host, started_at, heartbeat) values (?, null, ?, ?, ?)",
+                (worker_id, host, now, now),
+            )
+            started.append(worker_id)
+    if fakes.FAKE_SERVICES:
+        # The fake services live in this process's memory, so workers must too
+        from lib import job_worker
+
+        for worker_id in started:
+            threading.Thread(
+                target=job_worker.run,
+                args=(worker_id, WORKER_CONCURRENCY, WORKER_IDLE_EXIT_SECONDS),
+                daemon=True,
+            ).start()
+        return len(started)
+    for worker_id in started:
+        directory = os.path.dirname(JOBS_DB_PATH) or "."
+        with open(os.path.join(directory, "job_worker.log"), "ab") as log:
+            subprocess.Popen(
+                [
+                    sys.executable, "-m", "lib.job_worker",
+                    "--worker-id", worker_id,
+                    "--idle-exit", str(WORKER_IDLE_EXIT_SECONDS),
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                start_new_session=True,
+            )
+    return len(started)
@@ -0,0 +1,239 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+# Local BM25 inverted index over resume text, stored in SQLite.
+# Postings are (term_id, doc_id, tf) rows in a WITHOUT ROWID table, so each
+# posting costs three small integers on disk.
+INDEX_PATH = os.environ.get("LEXICAL_INDEX_PATH", ".cache/lexical_index.sqlite3")
+SYNC_SECONDS = float(os.environ.get("LEXICAL_INDEX_SYNC_SECONDS", "30"))
+FETCH_PAGE_SIZE = 200
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Query terms in more than this share of resumes are left out of search():
+# they add little to the ranking but dominate the postings scanned. STOPWORDS
+# are never searched (lib.cascade drops them from its term overlap too).
+MAX_DF_RATIO = float(os.environ.get("LEXICAL_MAX_DF_RATIO", "0.5"))
+
+STOPWORDS = {
+    "a", "an", "and", "or", "the", "of", "in", "on", "for", "to", "with", "at", "by",
+    "from", "as", "is", "are", "be", "we", "you", "our", "who", "has", "have", "will",
+    "experience", "years", "year", "strong", "looking", "candidate", "role", "etc",
+}
+
+# Keeps tokens like "c++", "c#", "node.js", "ci/cd" and "aws-certified" intact
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./\-]*")
+
+_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+_last_sync = 0.0
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens, trailing punctuation stripped."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        token = token.rstrip(".-/")
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(INDEX_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _conn = sqlite3.connect(INDEX_PATH, check_same_thread=False)
+        _conn.executescript(
+            """
+            create table if not exists docs (
+                doc_id      integer primary key,
+                resume_id   text not null unique,
+                batch_name  text not null,
+                length      integer not null
+            );
+            create table if not exists terms (
+                term_id  integer primary key,
+                term     text not null unique,
+                df       integer not null default 0
+            );
+            create table if not exists postings (
+                term_id  integer not null,
+                doc_id   integer not null,
+                tf       integer not null,
+                primary key (term_id, doc_id)
+            ) without rowid;
+            create table if not exists meta (
+                key    text primary key,
+                value  text
+            );
+            """
+        )
+        _conn.commit()
+    return _conn
+
+
+def _add(conn: sqlite3.Connection, resume_id: str, batch_name: str, text: str) -> bool:
+    if conn.execute("select 1 from docs where resume_id = ?", (resume_id,)).fetchone():
+        return False
+    counts = Counter(tokenize(text))
+    cur = conn.execute(
+        "insert into docs (resume_id, batch_name, length) values (?, ?, ?)",
+        (resume_id, batch_name, sum(counts.values())),
+    )
+    doc_id = cur.lastrowid
+    conn.executemany("insert or ignore into terms (term) values (?)", [(t,) for t in counts])
+    conn.executemany("update terms set df = df + 1 where term = ?", [(t,) for t in counts])
+    conn.executemany(
+        "insert into postings (term_id, doc_id, tf) "
+        "select term_id, ?, ? from terms where term = ?",
+        [(doc_id, tf, t) for t, tf in counts.items()],
+    )
+    return True
+
+
+def add_document(resume_id: str, batch_name: str, text: str) -> bool:
+    """Index one resume. Returns False if it was already indexed."""
+    with _lock:
+        conn = _get_conn()
+        added = _add(conn, resume_id, batch_name, text)
+        conn.commit()
+    return added
+
+
+def sync():
+    """Index resumes rows uploaded since the last sync (at most every SYNC_SECONDS)."""
+    global _last_sync
+    if time.monotonic() - _last_sync < SYNC_SECONDS:
+        return
+    from lib.db import _get_client
+
+    client = _get_client()
+    with _lock:
+        conn = _get_conn()
+        row = conn.execute("select value from meta where key = 'watermark'").fetchone()
+        watermark = row[0] if row else None
+        start = 0
+        while True:
+            query = client.table("resumes").select("id, batch_name, upload_date, extracted_text")
+            if watermark:
+                query = query.gte("upload_date", watermark)
+            page = query.order("upload_date").range(start, start + FETCH_PAGE_SIZE - 1).execute().data
+            for r in page:
+                _add(conn, r["id"], r["batch_name"], r.get("extracted_text") or "")
+            if page:
+                newest = max(r["upload_date"] for r in page)
+                conn.execute(
+                    "insert or replace into meta (key, value) values ('watermark', ?)",
+                    (max(newest, watermark or newest),),
+                )
+            conn.commit()
+            if len(page) < FETCH_PAGE_SIZE:
+                break
+            start += FETCH_PAGE_SIZE
+        _last_sync = time.monotonic()
+
+
+def search(
+    query: str,
+    batch_filter: list[str] | None = None,
+    limit: int = 20,
+) -> list[tuple[str, float]]:
+    """
+    Return up to `limit` (resume_id, BM25 score) pairs, best first.
+    Stopwords and terms in more than MAX_DF_RATIO of resumes are skipped
+    (the rarest term is always kept), so common words don't scan most postings.
+    """
+    terms = set(tokenize(query)) - STOPWORDS
+    if not terms:
+        return []
+    with _lock:
+        conn = _get_conn()
+        n_docs, total_length = conn.execute("select count(*), coalesce(sum(length), 0) from docs").fetchone()
+        if not n_docs:
+            return []
+        avgdl = total_length / n_docs
+        known = conn.execute(
+            f"select term_id, df from terms where term in ({','.join('?' * len(terms))}) and df > 0",
+            list(terms),
+        ).fetchall()
+        if not known:
+            return []
+        rarest = min(df for _, df in known)
+        term_ids = [tid for tid, df in known if df <= MAX_DF_RATIO * n_docs or df == rarest]
+        sql = (
+            "select d.resume_id, d.length, t.df, p.tf "
+            "from terms t join postings p on p.term_id = t.term_id "
+            "join docs d on d.doc_id = p.doc_id "
+            f"where t.term_id in ({','.join('?' * len(term_ids))})"
+        )
+        params: list = list(term_ids)
+        if batch_filter:
+            sql += f" and d.batch_name in ({','.join('?' * len(batch_filter))})"
+            params += batch_filter
+        rows = conn.execute(sql, params).fetchall()
+
+    scores: dict[str, float] = {}
+    for resume_id, length, df, tf in rows:
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl)
+        scores[resume_id] = scores.get(resume_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    return ranked[:limit]
+
+
+def matched_terms(terms: set[str], resume_ids: list[str]) -> dict[str, set[str]]:
+    """Which of the given (already tokenized) terms each indexed resume contains."""
+    if not terms or not resume_ids:
+        return {}
+    matched: dict[str, set[str]] = {}
+    term_list = list(terms)
+    with _lock:
+        conn = _get_conn()
+        for start in range(0, len(resume_ids), 500):
+            chunk = resume_ids[start:start + 500]
+            rows = conn.execute(
+                "select d.resume_id, t.term "
+                "from terms t join postings p on p.term_id = t.term_id "
+                "join docs d on d.doc_id = p.doc_id "
+                f"where t.term in ({','.join('?' * len(term_list))}) "
+                f"and d.resume_id in ({','.join('?' * len(chunk))})",
+                [*term_list, *chunk],
+            ).fetchall()
+            for resume_id, term in rows:
+                matched.setdefault(resume_id, set()).add(term)
+    return matched
+
+
+def is_indexed(resume_ids: list[str]) -> set[str]:
+    """The subset of resume ids present in the index."""
+    if not resume_ids:
+        return set()
+    found = set()
+    with _lock:
+        conn = _get_conn()
+        for start in range(0, len(resume_ids), 500):
+            chunk = resume_ids[start:start + 500]
+            rows = conn.execute(
+                f"select resume_id from docs where resume_id in ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            found.update(r[0] for r in rows)
+    return found
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[tuple[str, float]]:
+    """Fuse several ranked id lists: score(id) = Σ 1 / (k + rank)."""
+    fused: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
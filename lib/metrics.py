@@ -0,0 +1,318 @@
+"""
+Lightweight in-process tracing and metrics for the ingest and search pipeline.
+
+Each instrumented stage runs inside a span that records its duration into a
+per-stage histogram and keeps the most recent spans (with attributes) for
+the Metrics page. Counters track tokens and bytes, and registered gauges (e.g. the Gemini rate
+limiter's stats) are read at export time. Everything is process-wide and
+thread-safe, and can be exported as OpenMetrics text or JSON; JSON snapshots
+of other processes (upload workers) can be merged in for display.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable
+
+NAMESPACE = "resume_screener"
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+RECENT_SPANS = int(os.environ.get("METRICS_RECENT_SPANS", "2000"))
+
+_lock = threading.Lock()
+_local = threading.local()
+
+# (stage, status) -> [bucket counts..., +Inf count], sum
+_histograms: dict[tuple[str, str], dict] = {}
+# (name, sorted label items) -> value
+_counters: dict[tuple[str, tuple], float] = {}
+_recent: deque = deque(maxlen=RECENT_SPANS)
+# name -> function returning {key: number}
+_gauges: dict[str, Callable[[], dict]] = {}
+
+
+def _observe(stage: str, status: str, seconds: float):
+    with _lock:
+        hist = _histograms.setdefault((stage, status), {"buckets": [0] * (len(BUCKETS) + 1), "sum": 0.0})
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+                break
+        else:
+            hist["buckets"][-1] += 1
+        hist["sum"] += seconds
+
+
+def count(name: str, value: float = 1, **labels):
+    """Add value to a counter, e.g. count("gemini_tokens", 812, stage="score", kind="prompt")."""
+    if not value:
+        return
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def annotate(**attrs):
+    """Attach attributes to the innermost open span on this thread (no-op outside a span)."""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1]["attrs"].update(attrs)
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Time a block as one occurrence of `stage`. Exceptions are recorded and re-raised."""
+    record = {"stage": stage, "attrs": dict(attrs), "status": "ok", "error": None}
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(record)
+    record["start"] = time.time()
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        record["duration"] = time.perf_counter() - start
+        if record in stack:
+            stack.remove(record)
+        _observe(stage, record["status"], record["duration"])
+        with _lock:
+            _recent.append(record)
+
+
+def traced(stage: str):
+    """Decorator: run each call (or, for generators, each full iteration) in a span."""
+    def decorator(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                with span(stage):
+                    yield from fn(*args, **kwargs)
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_usage(stage: str, response) -> int:
+    """
+    Count Gemini prompt/output tokens from a response's usage_metadata, if
+    present. Returns the total counted.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0
+    prompt = getattr(usage, "prompt_token_count", 0) or 0
+    output = getattr(usage, "candidates_token_count", 0) or 0
+    count("gemini_tokens", prompt, stage=stage, kind="prompt")
+    count("gemini_tokens", output, stage=stage, kind="output")
+    return prompt + output
+
+
+def register_gauges(name: str, read: Callable[[], dict]):
+    """Export the numeric values of read() as gauges `<name>_<key>`, e.g. a rate limiter's stats()."""
+    with _lock:
+        _gauges[name] = read
+
+
+def reset():
+    """Forget all recorded metrics."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _recent.clear()
+
+
+# ── Queries and export ────────────────────────────────────────────────────────
+
+def recent_spans(stage: str | None = None) -> list[dict]:
+    """Most recent finished spans, oldest first, optionally for one stage."""
+    with _lock:
+        spans = list(_recent)
+    return [s for s in spans if stage is None or s["stage"] == stage]
+
+
+def _quantile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def stage_summary() -> list[dict]:
+    """
+    Per stage: total calls and errors since start (from the histograms), plus
+    p50/p95/p99 in milliseconds over the recent spans.
+    """
+    with _lock:
+        hists = {k: (sum(v["buckets"]), v["sum"]) for k, v in _histograms.items()}
+        spans = list(_recent)
+    return _summarize(hists, spans)
+
+
+def _summarize(hists: dict[tuple[str, str], tuple[int, float]], spans: list[dict]) -> list[dict]:
+    stages = sorted({stage for stage, _ in hists})
+    summary = []
+    for stage in stages:
+        calls = sum(n for (s, _), (n, _) in hists.items() if s == stage)
+        total = sum(t for (s, _), (_, t) in hists.items() if s == stage)
+        durations = sorted(sp["duration"] * 1000 for sp in spans if sp["stage"] == stage)
+        entry = {
+            "stage": stage,
+            "calls": calls,
+            "errors": hists.get((stage, "error"), (0, 0))[0],
+            "mean_ms": total / calls * 1000 if calls else 0.0,
+        }
+        if durations:
+            entry.update({
+                "p50_ms": _quantile(durations, 0.50),
+                "p95_ms": _quantile(durations, 0.95),
+                "p99_ms": _quantile(durations, 0.99),
+            })
+        summary.append(entry)
+    return summary
+
+
+def _read_gauges() -> dict[str, dict]:
+    with _lock:
+        sources = list(_gauges.items())
+    gauges = {}
+    for name, read in sources:
+        try:
+            values = read()
+        except Exception:
+            continue
+        gauges[name] = {k: v for k, v in values.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+    return gauges
+
+
+def to_json(recent: int = 0) -> dict:
+    """
+    Snapshot of histograms, counters, gauges and per-stage summary as plain
+    data, plus the last `recent` spans under "recent" if asked for.
+    """
+    with _lock:
+        histograms = [
+            {
+                "stage": stage,
+                "status": status,
+                "buckets": dict(zip([*map(str, BUCKETS), "+Inf"], hist["buckets"])),
+                "count": sum(hist["buckets"]),
+                "sum_seconds": hist["sum"],
+            }
+            for (stage, status), hist in sorted(_histograms.items())
+        ]
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+    snapshot = {
+        "stages": stage_summary(),
+        "histograms": histograms,
+        "counters": counters,
+        "gauges": _read_gauges(),
+    }
+    if recent:
+        snapshot["recent"] = [{**sp, "attrs": dict(sp["attrs"])} for sp in recent_spans()[-recent:]]
+    return snapshot
+
+
+def merge(snapshots: list[dict]) -> dict:
+    """
+    Combine to_json() snapshots of several processes into one of the same
+    shape: histograms, counters and gauges are summed, recent spans (where
+    present) interleaved by start time, and the stage summary recomputed.
+    """
+    bounds = [*map(str, BUCKETS), "+Inf"]
+    histograms: dict[tuple[str, str], dict] = {}
+    counters: dict[tuple[str, tuple], float] = {}
+    gauges: dict[str, dict] = {}
+    spans = []
+    for snapshot in snapshots:
+        for hist in snapshot.get("histograms", []):
+            merged = histograms.setdefault(
+                (hist["stage"], hist["status"]),
+                {"stage": hist["stage"], "status": hist["status"], "buckets": dict.fromkeys(bounds, 0),
+                 "count": 0, "sum_seconds": 0.0},
+            )
+            for bound, n in hist["buckets"].items():
+                merged["buckets"][bound] = merged["buckets"].get(bound, 0) + n
+            merged["count"] += hist["count"]
+            merged["sum_seconds"] += hist["sum_seconds"]
+        for counter in snapshot.get("counters", []):
+            key = (counter["name"], tuple(sorted(counter["labels"].items())))
+            counters[key] = counters.get(key, 0) + counter["value"]
+        for name, values in snapshot.get("gauges", {}).items():
+            merged = gauges.setdefault(name, {})
+            for key, value in values.items():
+                merged[key] = merged.get(key, 0) + value
+        spans.extend(snapshot.get("recent", []))
+    spans.sort(key=lambda sp: sp["start"])
+    hists = {k: (h["count"], h["sum_seconds"]) for k, h in histograms.items()}
+    return {
+        "stages": _summarize(hists, spans),
+        "histograms": [histograms[k] for k in sorted(histograms)],
+        "counters": [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(counters.items())
+        ],
+        "gauges": gauges,
+        "recent": spans,
+    }
+
+
+def _labels(**labels) -> str:
+    def escape(v: str) -> str:
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def to_openmetrics(snapshot: dict | None = None) -> str:
+    """All metrics, or those of a to_json()/merge() snapshot, in the OpenMetrics text exposition format."""
+    snapshot = snapshot or to_json()
+    name = f"{NAMESPACE}_stage_duration_seconds"
+    lines = [
+        f"# TYPE {name} histogram",
+        f"# UNIT {name} seconds",
+        f"# HELP {name} Duration of pipeline stages.",
+    ]
+    for hist in snapshot["histograms"]:
+        stage, status = hist["stage"], hist["status"]
+        cumulative = 0
+        for bound in [*BUCKETS, None]:
+            cumulative += hist["buckets"].get("+Inf" if bound is None else str(bound), 0)
+            le = "+Inf" if bound is None else _format_bound(bound)
+            lines.append(f"{name}_bucket{_labels(stage=stage, status=status, le=le)} {cumulative}")
+        lines.append(f"{name}_count{_labels(stage=stage, status=status)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(stage=stage, status=status)} {hist['sum_seconds']}")
+
+    families: dict[str, list] = {}
+    for counter in snapshot["counters"]:
+        families.setdefault(counter["name"], []).append((counter["labels"], counter["value"]))
+    for counter, samples in families.items():
+        family = f"{NAMESPACE}_{counter}"
+        lines.append(f"# TYPE {family} counter")
+        for labels, value in samples:
+            lines.append(f"{family}_total{_labels(**labels)} {value:g}")
+
+    for gauge, values in sorted(snapshot.get("gauges", {}).items()):
+        for key, value in sorted(values.items()):
+            family = f"{NAMESPACE}_{gauge}_{key}"
+            lines.append(f"# TYPE {family} gauge")
+            lines.append(f"{family} {value:g}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
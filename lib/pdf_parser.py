@@ -1,24 +1,301 @@
 import io
-import pdfplumber
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
 
+from lib import metrics
+
+# Extraction runs in a pool of worker processes so a slow or pathological PDF
+# can't block or exhaust memory in the Streamlit server process.
+PDF_BACKEND = os.environ.get("PDF_BACKEND", "pdfplumber")
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))  # 0 = in-process
+PDF_TIMEOUT_SECONDS = float(os.environ.get("PDF_TIMEOUT_SECONDS", "30"))
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", "30"))
+PDF_WORKER_MEMORY_MB = int(os.environ.get("PDF_WORKER_MEMORY_MB", "1024"))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, PDF_WORKERS))
+
+# PDFium is not thread-safe; in-process extraction (PDF_WORKERS = 0) is serialized.
+_pdfium_lock = threading.Lock()
+
+
+class PdfExtractionError(Exception):
+    """Text could not be extracted from a PDF."""
+
+
+class PdfTimeoutError(PdfExtractionError):
+    """Extraction took longer than PDF_TIMEOUT_SECONDS."""
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+def _extract_pdfplumber(pdf_bytes: bytes, max_pages: int) -> str:
+    import pdfplumber
 
-def extract_text(pdf_bytes: bytes) -> str:
-    """Extract all text from a PDF given its raw bytes."""
     text_parts = []
     with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
+        for page in pdf.pages[:max_pages]:
             page_text = page.extract_text()
             if page_text:
                 text_parts.append(page_text)
     return "\n".join(text_parts).strip()
 
 
+def _extract_pdfium(pdf_bytes: bytes, max_pages: int) -> str:
+    """Text-only extraction with PDFium: much faster, no layout analysis."""
+    import pypdfium2 as pdfium
+
+    text_parts = []
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        for i in range(min(len(pdf), max_pages)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            page_text = textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n")
+            textpage.close()
+            page.close()
+            if page_text.strip():
+                text_parts.append(page_text.strip())
+    finally:
+        pdf.close()
+    return "\n".join(text_parts).strip()
+
+
+BACKENDS = {
+    "pdfplumber": _extract_pdfplumber,
+    "pdfium": _extract_pdfium,
+}
+
+
+def _extract(pdf_bytes: bytes, backend: str, max_pages: int) -> str:
+    try:
+        return BACKENDS[backend](pdf_bytes, max_pages)
+    except MemoryError:
+        raise PdfExtractionError(f"PDF exceeded the {PDF_WORKER_MEMORY_MB} MB extraction memory limit")
+
+
+# ── Worker pool ───────────────────────────────────────────────────────────────
+
+def _init_worker(memory_mb: int):
+    """Cap each worker's address space so one PDF can't balloon memory."""
+    try:
+        import resource
+
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(PDF_WORKER_MEMORY_MB,),
+            )
+        return _pool
+
+
+def _reset_pool(pool: ProcessPoolExecutor):
+    """Kill a stuck or broken pool's workers; the next call starts a fresh pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for process in list((pool._processes or {}).values()):
+        process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def configure_pool(workers: int):
+    """Resize the extraction pool (0 = extract in-process). Used by benchmarks."""
+    global _pool, PDF_WORKERS, _slots
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+    PDF_WORKERS = workers
+    _slots = threading.BoundedSemaphore(max(1, workers))
+
+
+@metrics.traced("extract_text")
+def extract_text(pdf_bytes: bytes, backend: str | None = None) -> str:
+    """
+    Extract all text from a PDF given its raw bytes.
+    Runs the selected backend (see BACKENDS) in a worker process, reading at
+    most PDF_MAX_PAGES pages. Raises PdfTimeoutError if it takes longer than
+    PDF_TIMEOUT_SECONDS and PdfExtractionError if the worker runs out of
+    memory or crashes.
+    """
+    backend = backend or PDF_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend {backend!r}; choose from {sorted(BACKENDS)}")
+    metrics.annotate(backend=backend, bytes=len(pdf_bytes))
+    metrics.count("bytes", len(pdf_bytes), stage="extract_text")
+    if PDF_WORKERS <= 0:
+        if backend == "pdfium":
+            with _pdfium_lock:
+                return _extract(pdf_bytes, backend, PDF_MAX_PAGES)
+        return _extract(pdf_bytes, backend, PDF_MAX_PAGES)
+
+    # Only submit when a worker is free, so the timeout covers extraction
+    # rather than time spent queued behind other files.
+    # Another file's timeout or a crashed worker can take the pool down while
+    # this file is in flight, so a broken pool gets one retry on a fresh one.
+    error = None
+    with _slots:
+        for _ in range(2):
+            pool = _get_pool()
+            try:
+                future = pool.submit(_extract, pdf_bytes, backend, PDF_MAX_PAGES)
+            except RuntimeError as e:  # pool already shut down
+                _reset_pool(pool)
+                error = e
+                continue
+            try:
+                return future.result(timeout=PDF_TIMEOUT_SECONDS)
+            except FuturesTimeout:
+                _reset_pool(pool)
+                raise PdfTimeoutError(f"PDF extraction timed out after {PDF_TIMEOUT_SECONDS:.0f}s")
+            except BrokenProcessPool as e:
+                _reset_pool(pool)
+                error = e
+    raise PdfExtractionError(f"PDF extraction worker crashed: {error}")
+
+
+# ── Candidate name heuristic ──────────────────────────────────────────────────
+# Names accepted at or above this confidence skip the model call entirely.
+# Shape and position alone score at most 0.65, so acceptance takes a supporting
+# cue: a "Name:" label, an adjacent contact line or a matching e-mail address.
+NAME_MIN_CONFIDENCE = float(os.environ.get("NAME_MIN_CONFIDENCE", "0.75"))
+
+# Only the top of the resume is considered, like the model prompt.
+_NAME_SCAN_CHARS = 400
+_NAME_SCAN_LINES = 8
+
+_EMAIL_RE = re.compile(r"([\w.+-]+)@[\w-]+(?:\.[\w-]+)+")
+_PHONE_RE = re.compile(r"\+?\d[\d ().-]{6,}\d")
+_YEAR_RANGE_RE = re.compile(r"(?:19|20)\d\d\s*[-–]\s*(?:19|20)\d\d")
+_URL_RE = re.compile(r"(https?://|www\.|linkedin|github)", re.IGNORECASE)
+_LOCATION_RE = re.compile(r",\s*[A-Z]{2}\b")  # "Austin, TX"
+_LABEL_RE = re.compile(r"^(?:full\s+)?name\s*[:\-]\s*(.+)$", re.IGNORECASE)
+_SEPARATOR_RE = re.compile(r"\s*(?:[|•·,]|\s[-–—]\s|\s{3,})\s*")
+_NAME_WORD_RE = re.compile(r"[A-Z][a-z]+(?:['’-][A-Z]?[a-z]+)*|[A-Z]{2,}(?:['’-][A-Z]+)*|[A-Z]\.?")
+_PARTICLES = {"de", "da", "del", "della", "der", "di", "du", "la", "le", "van", "von", "bin", "al", "dos", "y"}
+
+# Lines made of these words are headings, titles or addresses, not names.
+_NOT_NAME_WORDS = {
+    "resume", "résumé", "curriculum", "vitae", "cv", "profile", "summary", "objective",
+    "contact", "experience", "education", "skills", "projects", "references", "about",
+    "work", "history", "employment", "professional", "qualifications", "certifications",
+    "publications", "awards", "interests", "languages", "cover", "letter", "table", "contents",
+    "engineer", "engineering", "developer", "manager", "director", "analyst", "scientist",
+    "designer", "consultant", "architect", "intern", "lead", "senior", "junior", "principal",
+    "software", "data", "product", "marketing", "sales", "specialist", "officer", "assistant",
+    "university", "college", "institute", "school", "inc", "llc", "ltd", "corp",
+    "street", "st", "avenue", "ave", "road", "rd", "suite", "city",
+}
+
+
+def _name_candidate(segment: str) -> str | None:
+    """The segment as a display name if it is shaped like a person's name, else None."""
+    words = segment.split()
+    if not 2 <= len(words) <= 4:
+        return None
+    for word in words:
+        if word.lower() in _PARTICLES:
+            continue
+        if not _NAME_WORD_RE.fullmatch(word) or word.lower().strip(".") in _NOT_NAME_WORDS:
+            return None
+    if sum(len(w) > 2 for w in words) < 1:
+        return None
+    # "JANE DOE" → "Jane Doe"; initials and mixed-case words are kept as written
+    return " ".join(w.title() if w.isupper() and len(w) > 2 else w for w in words)
+
+
+def _has_phone(text: str) -> bool:
+    """Whether the text holds a phone number: 7+ digits that aren't a year range like "2019-2023"."""
+    return any(
+        sum(c.isdigit() for c in m.group()) >= 7 and not _YEAR_RANGE_RE.fullmatch(m.group().strip())
+        for m in _PHONE_RE.finditer(text)
+    )
+
+
+def _email_matches(name: str, local_parts: list[str]) -> bool:
+    """Whether an e-mail address is built from the name, e.g. jane.doe@ or jdoe@."""
+    words = [re.sub(r"[^a-z]", "", w.lower()) for w in name.split()]
+    words = [w for w in words if len(w) > 1]
+    for local in local_parts:
+        local = re.sub(r"[^a-z]", "", local.lower())
+        if sum(w in local for w in words) >= 2:
+            return True
+        if words and words[-1] in local and local.startswith(words[0][0]):
+            return True
+    return False
+
+
+def guess_candidate_name(text: str) -> tuple[str | None, float]:
+    """
+    Score name-shaped lines at the top of a resume and return the best one with
+    a confidence between 0 and 1, or (None, 0.0).
+    Cues: an explicit "Name:" label, a Title Case or ALL CAPS line of 2-4 words
+    that isn't a heading or job title, appearing early, next to a line with an
+    e-mail address or phone number, and agreeing with the e-mail address.
+    """
+    lines = [line.strip() for line in text[:_NAME_SCAN_CHARS].splitlines() if line.strip()]
+    lines = lines[:_NAME_SCAN_LINES]
+    local_parts = [m.group(1) for m in _EMAIL_RE.finditer(text[:_NAME_SCAN_CHARS * 2])]
+    has_contact = [bool(_EMAIL_RE.search(line) or _has_phone(line)) for line in lines]
+
+    best, best_score = None, 0.0
+    for i, line in enumerate(lines):
+        label = _LABEL_RE.match(line)
+        segment = label.group(1) if label else line
+        # "Jane Doe | jane@x.com | 555 0100": the name is the first segment
+        segment = _SEPARATOR_RE.split(segment)[0].strip()
+        if _EMAIL_RE.search(segment) or _has_phone(segment) or _URL_RE.search(segment):
+            continue
+        if _LOCATION_RE.match(line.partition(segment)[2]):
+            continue
+        name = _name_candidate(segment)
+        if name is None:
+            continue
+
+        score = 0.4
+        if label:
+            score += 0.4
+        score += max(0.0, 0.2 - 0.07 * i)  # earlier lines are likelier
+        if has_contact[i] or (i + 1 < len(lines) and has_contact[i + 1]) or (i > 0 and has_contact[i - 1]):
+            score += 0.1
+        if _email_matches(name, local_parts):
+            score += 0.3
+        if segment.isupper() or segment.istitle():
+            score += 0.05
+        score = min(score, 0.99)
+        if score > best_score:
+            best, best_score = name, score
+    return best, round(best_score, 2)
+
+
 def extract_name_heuristic(text: str) -> str:
     """
     Best-effort name extraction from resume text.
-    Takes the first non-empty line as the candidate name.
+    Takes the most name-like line near the top (see guess_candidate_name),
+    or failing that the first short non-empty line.
     This is used as a fallback when the AI-based extraction fails.
     """
+    name, _ = guess_candidate_name(text)
+    if name:
+        return name
     for line in text.splitlines():
         line = line.strip()
         if line and len(line) < 60:
@@ -0,0 +1,240 @@
+import random
+import re
+import threading
+import time
+from typing import Iterator
+
+_RETRY_DELAY_RE = re.compile(r"retry[_ ]?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE)
+
+
+_END = object()
+
+
+class RateLimited(Exception):
+    """Raised when a call is still rate limited after every retry."""
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    code = getattr(e, "code", None) or getattr(e, "status_code", None)
+    if code == 429:
+        return True
+    err = str(e)
+    return "429" in err or "RESOURCE_EXHAUSTED" in err
+
+
+def is_transient_error(e: Exception) -> bool:
+    code = getattr(e, "code", None) or getattr(e, "status_code", None)
+    if code in (500, 502, 503, 504):
+        return True
+    err = str(e)
+    return "503" in err or "UNAVAILABLE" in err
+
+
+def retry_hint(e: Exception) -> float | None:
+    """Seconds the server asked us to wait, from a Retry-After header or RetryInfo detail."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    match = _RETRY_DELAY_RE.search(str(e))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """
+    In-process token bucket: refills at `rate` tokens per second up to
+    `capacity`, and can be paused for a server's retry hint. lib.jobs has a
+    SharedTokenBucket with the same methods that several processes draw from.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Take a token and return 0, or return the seconds to wait before one can be available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if now >= self._blocked_until and self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+
+    def increase(self, step: float, ceiling: float):
+        """Raise the refill rate by `step`, up to `ceiling`."""
+        with self._lock:
+            self.rate = min(ceiling, self.rate + step)
+
+    def throttle(self, floor: float, pause: float | None = None):
+        """Halve the refill rate (not below `floor`), drop saved-up tokens and pause for `pause` seconds."""
+        with self._lock:
+            self.rate = max(floor, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if pause:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+
+
+class RateLimiter:
+    """
+    Token bucket plus process-wide concurrency cap for calls to one API.
+
+    The refill rate adapts: it is halved every time the server returns a 429
+    and creeps back up towards `max_rate` on each success. Rate-limited and
+    transient failures are retried with jittered exponential backoff, waiting
+    at least as long as any server retry hint. The bucket is the limiter's own
+    unless one shared with other processes is passed in.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        max_concurrency: int = 8,
+        max_attempts: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        min_rate: float = 0.05,
+        bucket: TokenBucket | None = None,
+    ):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.bucket = bucket or TokenBucket(max_rate)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        # Metrics
+        self.waiting = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def _acquire_token(self):
+        """Block until the bucket has a token and no server back-off is active."""
+        while delay := self.bucket.take():
+            # Jittered, so waiters (threads, or processes sharing the bucket) take turns
+            time.sleep(min(delay, 1.0) * random.uniform(1.0, 1.2))
+
+    def _on_success(self):
+        # Additive increase back towards the configured ceiling
+        if self.bucket.rate < self.max_rate:
+            self.bucket.increase(self.max_rate * 0.05, self.max_rate)
+
+    def _on_throttled(self, hint: float | None):
+        with self._lock:
+            self.throttled += 1
+        # Multiplicative decrease, and pause everyone for the server's hint
+        self.bucket.throttle(self.min_rate, hint)
+
+    def _backoff(self, attempt: int, hint: float | None) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, hint or 0.0)
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) under the limiter, retrying throttled calls."""
+        return self._call(fn, args, kwargs, hold=False)
+
+    def stream(self, fn, *args, **kwargs) -> Iterator:
+        """
+        Iterate the stream fn(*args, **kwargs) returns under the limiter. Opening
+        it and reading its first item are retried like call(); the concurrency
+        slot is then held until the stream is read to the end or closed.
+        """
+        def open_stream():
+            items = iter(fn(*args, **kwargs))
+            return items, next(items, _END)
+
+        items, first = self._call(open_stream, (), {}, hold=True)
+        try:
+            if first is not _END:
+                yield first
+                yield from items
+        finally:
+            self._release()
+
+    def _call(self, fn, args: tuple, kwargs: dict, hold: bool):
+        """call() itself; with `hold`, a successful call keeps its slot until _release()."""
+        for attempt in range(self.max_attempts):
+            start = time.monotonic()
+            with self._lock:
+                self.waiting += 1
+            try:
+                self._acquire_token()
+                self._slots.acquire()
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+                    self.wait_seconds += time.monotonic() - start
+            succeeded = False
+            try:
+                with self._lock:
+                    self.in_flight += 1
+                    self.calls += 1
+                result = fn(*args, **kwargs)
+                succeeded = True
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                if not (rate_limited or is_transient_error(e)):
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                hint = retry_hint(e)
+                if rate_limited:
+                    self._on_throttled(hint)
+                if attempt == self.max_attempts - 1:
+                    with self._lock:
+                        self.failures += 1
+                    if rate_limited:
+                        raise RateLimited(str(e)) from e
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self._backoff(attempt, hint))
+                continue
+            finally:
+                if not (hold and succeeded):
+                    self._release()
+            self._on_success()
+            return result
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        """Queue depth, throttle counts and the current adaptive rate."""
+        with self._lock:
+            return {
+                "rate_per_second": self.rate,
+                "max_rate_per_second": self.max_rate,
+                "max_concurrency": self.max_concurrency,
+                "waiting": self.waiting,
+                "in_flight": self.in_flight,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "failures": self.failures,
+                "wait_seconds": self.wait_seconds,
+            }
@@ -0,0 +1,84 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Local on-disk cache of LLM candidate scores, keyed by
+# (model, normalized query hash, candidate id, resume content version).
+CACHE_PATH = os.environ.get("SCORE_CACHE_PATH", ".cache/scores.sqlite3")
+TTL_SECONDS = float(os.environ.get("SCORE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute(
+            """
+            create table if not exists scores (
+                model         text not null,
+                query_hash    text not null,
+                candidate_id  text not null,
+                version       text not null,
+                result        text not null,
+                created_at    real not null,
+                primary key (model, query_hash, candidate_id, version)
+            )
+            """
+        )
+        _conn.commit()
+    return _conn
+
+
+def get_many(model: str, query_hash: str, keys: list[tuple[str, str]]) -> dict[str, dict]:
+    """
+    Return cached score dicts by candidate id for the given
+    (candidate_id, version) pairs. Expired entries are ignored.
+    """
+    if not keys:
+        return {}
+    found: dict[str, dict] = {}
+    cutoff = time.time() - TTL_SECONDS
+    with _lock:
+        conn = _get_conn()
+        for candidate_id, version in keys:
+            row = conn.execute(
+                "select result from scores where model = ? and query_hash = ? "
+                "and candidate_id = ? and version = ? and created_at >= ?",
+                (model, query_hash, candidate_id, version, cutoff),
+            ).fetchone()
+            if row:
+                found[candidate_id] = json.loads(row[0])
+    return found
+
+
+def put_many(model: str, query_hash: str, items: list[tuple[str, str, dict]]):
+    """Store (candidate_id, version, result) score entries."""
+    if not items:
+        return
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        conn.executemany(
+            "insert or replace into scores "
+            "(model, query_hash, candidate_id, version, result, created_at) "
+            "values (?, ?, ?, ?, ?, ?)",
+            [(model, query_hash, cid, version, json.dumps(result), now) for cid, version, result in items],
+        )
+        conn.execute("delete from scores where created_at < ?", (now - TTL_SECONDS,))
+        conn.commit()
+
+
+def clear():
+    """Remove every cached score."""
+    with _lock:
+        conn = _get_conn()
+        conn.execute("delete from scores")
+        conn.commit()
@@ -0,0 +1,41 @@
+import os
+
+from lib import lexical_index
+from lib.db import search_by_embedding, select_search_rows
+
+# Each retriever contributes this many candidates before fusion.
+HYBRID_POOL_SIZE = int(os.environ.get("HYBRID_POOL_SIZE", "50"))
+RRF_K = 60
+
+
+def hybrid_search(
+    query: str,
+    query_embedding: list[float],
+    batch_filter: list[str] | None = None,
+    limit: int = 20,
+) -> list[dict]:
+    """
+    Combine pgvector similarity with BM25 keyword matching over the resume text.
+    Both rankings are fused with reciprocal rank fusion, so exact matches on
+    certifications or tool names surface even when the embedding misses them.
+    Returns up to `limit` rows shaped like search_by_embedding, best first.
+    Falls back to vector-only results if the lexical index is unavailable.
+    """
+    pool = max(limit, HYBRID_POOL_SIZE)
+    vector_rows = search_by_embedding(query_embedding, batch_filter, limit=pool)
+    try:
+        lexical_index.sync()
+        lexical_hits = lexical_index.search(query, batch_filter, limit=pool)
+    except Exception:
+        return vector_rows[:limit]
+
+    fused = lexical_index.reciprocal_rank_fusion(
+        [[r["id"] for r in vector_rows], [rid for rid, _ in lexical_hits]],
+        k=RRF_K,
+    )[:limit]
+
+    rows = {r["id"]: r for r in vector_rows}
+    missing = [rid for rid, _ in fused if rid not in rows]
+    for row in select_search_rows(missing):
+        rows[row["id"]] = row
+    return [{**rows[rid], "rrf_score": score} for rid, score in fused if rid in rows]
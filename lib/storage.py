@@ -2,8 +2,17 @@ import os
 import streamlit as st
 from supabase import create_client, Client
 
+from lib import fakes, metrics
+from lib.cache import TTLCache
+
 BUCKET = "resumes"
 
+# Signed URLs are reused until this many seconds before they expire.
+SIGNED_URL_REFRESH_MARGIN = 300
+
+# Shared across sessions: signed URL by (storage path, requested lifetime).
+_signed_url_cache = TTLCache(maxsize=int(os.environ.get("SIGNED_URL_CACHE_MAX_ENTRIES", "2000")), ttl=None)
+
 _client: Client | None = None
 
 
@@ -17,6 +26,9 @@ def _get_secret(key: str) -> str:
 def _get_client() -> Client:
     global _client
     if _client is None:
+        if fakes.FAKE_SERVICES:
+            _client = fakes.supabase_client()
+            return _client
         _client = create_client(
             _get_secret("SUPABASE_URL"),
             _get_secret("SUPABASE_SERVICE_KEY"),
@@ -24,17 +36,21 @@ def _get_client() -> Client:
     return _client
 
 
+@metrics.traced("upload_pdf")
 def upload_pdf(file_bytes: bytes, storage_path: str) -> str:
     """
     Upload a PDF to Supabase Storage.
     storage_path: e.g. "2026-02-26/john_doe_abc123.pdf"
     Returns the storage_path on success.
     """
+    metrics.annotate(bytes=len(file_bytes))
+    metrics.count("bytes", len(file_bytes), stage="upload_pdf")
     client = _get_client()
     client.storage.from_(BUCKET).upload(
         path=storage_path,
         file=file_bytes,
-        file_options={"content-type": "application/pdf"},
+        # Overwrite, so re-running an interrupted upload to the same path succeeds
+        file_options={"content-type": "application/pdf", "upsert": "true"},
     )
     return storage_path
 
@@ -44,9 +60,42 @@ def get_signed_url(storage_path: str, expires: int = 3600) -> str:
     Generate a temporary signed URL for downloading a PDF.
     expires: seconds until the URL expires (default 1 hour).
     """
+    urls = get_signed_urls([storage_path], expires)
+    if storage_path not in urls:
+        raise ValueError(f"Could not sign {storage_path!r}")
+    return urls[storage_path]
+
+
+def get_signed_urls(storage_paths: list[str], expires: int = 3600) -> dict[str, str]:
+    """
+    Signed URLs for many PDFs, keyed by storage path.
+    Cached URLs signed for the same `expires` are reused until
+    SIGNED_URL_REFRESH_MARGIN seconds before they expire; the rest are signed
+    together in a single storage request.
+    Paths that could not be signed are left out.
+    """
+    urls: dict[str, str] = {}
+    missing = []
+    for path in dict.fromkeys(p for p in storage_paths if p):
+        url = _signed_url_cache.get((path, expires))
+        if url is None:
+            missing.append(path)
+        else:
+            urls[path] = url
+    if not missing:
+        return urls
+
     client = _get_client()
-    result = client.storage.from_(BUCKET).create_signed_url(
-        path=storage_path,
+    result = client.storage.from_(BUCKET).create_signed_urls(
+        paths=missing,
         expires_in=expires,
     )
-    return result["signedURL"]
+    ttl = max(0, expires - SIGNED_URL_REFRESH_MARGIN)
+    for item in result:
+        url = item.get("signedURL") or item.get("signedUrl")
+        if item.get("error") or not url:
+            continue
+        urls[item["path"]] = url
+        if ttl:
+            _signed_url_cache.set((item["path"], expires), url, ttl=ttl)
+    return urls
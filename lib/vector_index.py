@@ -0,0 +1,359 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Optional in-process search backend: a memory-mapped float32 matrix of
+# L2-normalized resume embeddings plus parallel id / batch arrays.
+INDEX_DIR = os.environ.get("VECTOR_INDEX_DIR", ".cache/vector_index")
+REFRESH_SECONDS = float(os.environ.get("VECTOR_INDEX_REFRESH_SECONDS", "30"))
+FETCH_PAGE_SIZE = 500
+
+# Two-phase search: the coarse pass scans a compact copy of the vectors (the
+# first COMPACT_DIM dimensions, re-normalized, stored at COMPACT_PRECISION) and
+# the best RESCORE_FACTOR × limit are rescored exactly from the full vectors,
+# which are then only paged in for that shortlist. COMPACT_DIM = 0 searches
+# the full vectors directly.
+COMPACT_DIM = int(os.environ.get("VECTOR_INDEX_COMPACT_DIM", "0"))
+COMPACT_PRECISION = os.environ.get("VECTOR_INDEX_PRECISION", "int8")
+RESCORE_FACTOR = int(os.environ.get("VECTOR_INDEX_RESCORE_FACTOR", "10"))
+
+PRECISIONS = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Rows converted to float32 at a time when scoring compact vectors.
+_SCORE_BLOCK_ROWS = 4096
+
+
+def compact_vectors(vectors: np.ndarray, dim: int, precision: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """
+    Truncate rows to their first `dim` dimensions, re-normalize and store at
+    `precision`. Returns (codes, per-row scales); scales are only used by int8,
+    where each row is quantized symmetrically to [-127, 127].
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}; expected one of {', '.join(PRECISIONS)}")
+    prefix = np.array(vectors[:, :dim], dtype=np.float32)
+    norms = np.linalg.norm(prefix, axis=1, keepdims=True)
+    prefix /= np.where(norms == 0, 1, norms)
+    if precision != "int8":
+        return prefix.astype(PRECISIONS[precision]), None
+    scales = np.abs(prefix).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.rint(prefix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class VectorIndex:
+    """
+    Append-only on-disk vector index.
+
+    Layout of `path`:
+      vectors.f32  raw float32 rows, one normalized embedding per resume
+      compact.bin  the compact copy of each row (when compact_dim is set)
+      scales.f32   per-row int8 scales for compact.bin
+      ids.json     resume ids, batch names and the upload_date watermark
+    """
+
+    def __init__(
+        self,
+        path: str,
+        compact_dim: int = COMPACT_DIM,
+        precision: str = COMPACT_PRECISION,
+        rescore_factor: int = RESCORE_FACTOR,
+    ):
+        self.path = path
+        self.compact_dim = compact_dim
+        self.precision = precision
+        self.rescore_factor = rescore_factor
+        self.dim: int | None = None
+        self.ids: list[str] = []
+        self.batch_names: list[str] = []
+        self.batch_codes = np.zeros(0, dtype=np.int32)
+        self.watermark: str | None = None
+        self._id_set: set[str] = set()
+        self._batch_lookup: dict[str, int] = {}
+        # (full vectors, compact copy or None, int8 scales or None), replaced
+        # as one tuple so a concurrent search never pairs arrays of different sizes
+        self._arrays: tuple[np.ndarray, np.ndarray | None, np.ndarray | None] = (
+            np.zeros((0, 0), dtype=np.float32), None, None
+        )
+        self._compact_layout: tuple[int, str] | None = None  # (dim, precision) on disk
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def _compact_path(self) -> str:
+        return os.path.join(self.path, "compact.bin")
+
+    @property
+    def _scales_path(self) -> str:
+        return os.path.join(self.path, "scales.f32")
+
+    @property
+    def _compact_shape(self) -> tuple[int, str] | None:
+        """(dim, precision) of the compact copy this index should have, or None."""
+        if not self.compact_dim or not self.dim:
+            return None
+        dim = min(self.compact_dim, self.dim)
+        if dim == self.dim and self.precision == "float32":
+            return None  # identical to the full vectors
+        return dim, self.precision
+
+    def nbytes(self) -> dict:
+        """Bytes held on disk by the full and compact vectors."""
+        return {
+            "full": os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0,
+            "compact": sum(
+                os.path.getsize(p) for p in (self._compact_path, self._scales_path) if os.path.exists(p)
+            ),
+        }
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "ids.json")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def load(self):
+        """Load the index from disk, memory-mapping the vectors."""
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.ids = meta["ids"]
+        self.batch_names = meta["batch_names"]
+        self.watermark = meta["watermark"]
+        self._id_set = set(self.ids)
+        self._batch_lookup = {name: i for i, name in enumerate(self.batch_names)}
+        self.batch_codes = np.asarray(meta["batch_codes"], dtype=np.int32)
+        layout = meta.get("compact")
+        self._compact_layout = tuple(layout) if layout else None
+        self._remap()
+        if self._compact_layout != self._compact_shape:
+            self._rebuild_compact()
+
+    def configure_compact(self, compact_dim: int, precision: str):
+        """Change the compact copy's dimension and precision, rebuilding it from the full vectors."""
+        self.compact_dim, self.precision = compact_dim, precision
+        if self._compact_layout != self._compact_shape:
+            self._rebuild_compact()
+
+    def _rebuild_compact(self):
+        for path in (self._compact_path, self._scales_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._compact_layout = self._compact_shape
+        if self._compact_layout:
+            matrix = self._arrays[0]
+            for start in range(0, len(matrix), _SCORE_BLOCK_ROWS):
+                self._append_compact(matrix[start:start + _SCORE_BLOCK_ROWS])
+        self._write_meta()
+        self._remap()
+
+    def _append_compact(self, vectors: np.ndarray):
+        dim, precision = self._compact_layout
+        codes, scales = compact_vectors(vectors, dim, precision)
+        with open(self._compact_path, "ab") as f:
+            f.write(codes.tobytes())
+        if scales is not None:
+            with open(self._scales_path, "ab") as f:
+                f.write(scales.tobytes())
+
+    def _remap(self):
+        if self.dim and self.ids:
+            matrix = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(len(self.ids), self.dim)
+            )
+        else:
+            matrix = np.zeros((0, self.dim or 0), dtype=np.float32)
+        compact = scales = None
+        if self._compact_layout and self.ids:
+            dim, precision = self._compact_layout
+            compact = np.memmap(
+                self._compact_path, dtype=PRECISIONS[precision], mode="r", shape=(len(self.ids), dim)
+            )
+            if precision == "int8":
+                scales = np.fromfile(self._scales_path, dtype=np.float32, count=len(self.ids))
+        self._arrays = (matrix, compact, scales)
+
+    def add(self, rows: list[dict]):
+        """
+        Append rows with id, batch_name, embedding and upload_date.
+        Rows already in the index are skipped.
+        """
+        rows = [r for r in rows if r["id"] not in self._id_set and r.get("embedding") is not None]
+        if not rows:
+            return
+        watermark = max((r["upload_date"] for r in rows if r.get("upload_date")), default=None)
+        self.add_arrays(
+            [r["id"] for r in rows],
+            [r["batch_name"] for r in rows],
+            np.asarray([r["embedding"] for r in rows], dtype=np.float32),
+            watermark,
+        )
+
+    def add_arrays(
+        self,
+        ids: list[str],
+        batch_names: list[str],
+        vectors: np.ndarray,
+        watermark: str | None = None,
+    ):
+        """Append a block of embeddings (n × dim) with their ids and batch names."""
+        vectors = np.array(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        if self._compact_layout is None and not self.ids:
+            self._compact_layout = self._compact_shape
+        if self._compact_layout:
+            self._append_compact(vectors)
+
+        codes = []
+        for name in batch_names:
+            if name not in self._batch_lookup:
+                self._batch_lookup[name] = len(self.batch_names)
+                self.batch_names.append(name)
+            codes.append(self._batch_lookup[name])
+        self.ids.extend(ids)
+        self._id_set.update(ids)
+        if watermark and (self.watermark is None or watermark > self.watermark):
+            self.watermark = watermark
+        self.batch_codes = np.concatenate([self.batch_codes, np.asarray(codes, dtype=np.int32)])
+        self._write_meta()
+        self._remap()
+
+    def _write_meta(self):
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "dim": self.dim,
+                    "ids": self.ids,
+                    "batch_names": self.batch_names,
+                    "batch_codes": self.batch_codes.tolist(),
+                    "watermark": self.watermark,
+                    "compact": list(self._compact_layout) if self._compact_layout else None,
+                },
+                f,
+            )
+        os.replace(tmp_path, self._meta_path)
+
+    def search(
+        self,
+        query_embedding: list[float],
+        batch_filter: list[str] | None = None,
+        limit: int = 20,
+    ) -> list[tuple[str, float]]:
+        """
+        Return up to `limit` (id, cosine similarity) pairs, best first.
+        With a compact copy, candidates come from it and similarities are
+        exact scores from the full vectors.
+        """
+        # Snapshot so a concurrent add() can't change the shapes under us
+        (matrix, compact, scales), ids = self._arrays, self.ids
+        if not len(matrix) or limit <= 0:
+            return []
+        codes = self.batch_codes[:matrix.shape[0]]
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        if compact is not None:
+            scores = self._coarse_scores(compact, scales, query)
+        else:
+            scores = matrix @ query
+
+        if batch_filter:
+            wanted = [self._batch_lookup[b] for b in batch_filter if b in self._batch_lookup]
+            mask = np.zeros(len(self.batch_names), dtype=bool)
+            mask[wanted] = True
+            scores = np.where(mask[codes], scores, -np.inf)
+
+        if compact is not None:
+            # Rescore the coarse shortlist exactly; rows are read in file order
+            k = min(max(limit, limit * self.rescore_factor), len(scores))
+            shortlist = np.sort(np.argpartition(-scores, k - 1)[:k])
+            shortlist = shortlist[np.isfinite(scores[shortlist])]
+            exact = np.full(len(scores), -np.inf, dtype=np.float32)
+            exact[shortlist] = matrix[shortlist] @ query
+            scores = exact
+
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    @staticmethod
+    def _coarse_scores(compact: np.ndarray, scales: np.ndarray | None, query: np.ndarray) -> np.ndarray:
+        """Approximate cosine similarities from the compact vectors, in blocks of float32."""
+        dim = compact.shape[1]
+        q = query[:dim] / (np.linalg.norm(query[:dim]) or 1)
+        scores = np.empty(len(compact), dtype=np.float32)
+        for start in range(0, len(compact), _SCORE_BLOCK_ROWS):
+            block = compact[start:start + _SCORE_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ q
+        if scales is not None:
+            scores *= scales[:len(scores)]
+        return scores
+
+
+_index: VectorIndex | None = None
+_last_refresh = 0.0
+_refresh_lock = threading.Lock()
+
+
+def _fetch_new_rows(client, watermark: str | None) -> list[dict]:
+    """Page through resumes uploaded at or after the watermark."""
+    from lib.db import _parse_embedding
+
+    rows: list[dict] = []
+    start = 0
+    while True:
+        query = client.table("resumes").select("id, batch_name, upload_date, embedding")
+        if watermark:
+            query = query.gte("upload_date", watermark)
+        page = (
+            query.order("upload_date")
+            .range(start, start + FETCH_PAGE_SIZE - 1)
+            .execute()
+            .data
+        )
+        for row in page:
+            row["embedding"] = _parse_embedding(row["embedding"])
+        rows.extend(page)
+        if len(page) < FETCH_PAGE_SIZE:
+            return rows
+        start += FETCH_PAGE_SIZE
+
+
+def get_index(force_refresh: bool = False) -> VectorIndex:
+    """
+    Return the process-wide index, loading it from disk on first use and
+    pulling new resumes rows at most every REFRESH_SECONDS.
+    """
+    global _index, _last_refresh
+    from lib.db import _get_client
+
+    with _refresh_lock:
+        if _index is None:
+            _index = VectorIndex(INDEX_DIR)
+            _index.load()
+        if force_refresh or time.monotonic() - _last_refresh >= REFRESH_SECONDS:
+            _index.add(_fetch_new_rows(_get_client(), _index.watermark))
+            _last_refresh = time.monotonic()
+        return _index
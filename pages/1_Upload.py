@@ -1,9 +1,8 @@
-import uuid
+import os
+import zipfile
+from contextlib import ExitStack
 import streamlit as st
-from lib.pdf_parser import extract_text, extract_name_heuristic
-from lib.ai import get_embedding, extract_candidate_name
-from lib.storage import upload_pdf
-from lib.db import insert_resume
+from lib import jobs
 
 st.set_page_config(page_title="Upload Resumes", page_icon="📤", layout="wide")
 st.title("Upload Resumes")
@@ -14,64 +13,63 @@ batch_name = st.text_input(
     help="Give this upload a name so you can filter by it later.",
 )
 
-uploaded_files = st.file_uploader(
-    "Select PDF resumes",
-    type=["pdf"],
-    accept_multiple_files=True,
-)
-
-if st.button("Upload & Process", type="primary", disabled=not (batch_name and uploaded_files)):
-    total = len(uploaded_files)
-    progress = st.progress(0, text="Starting...")
-    success_count = 0
-    errors = []
-
-    for i, file in enumerate(uploaded_files):
-        progress.progress((i) / total, text=f"Processing {file.name} ({i+1}/{total})...")
-
-        try:
-            pdf_bytes = file.read()
-
-            # 1. Extract text
-            text = extract_text(pdf_bytes)
-            if not text.strip():
-                errors.append(f"{file.name}: no text could be extracted (scanned PDF?)")
-                continue
-
-            # 2. Extract candidate name
-            name = extract_candidate_name(text)
-            if name == "Unknown":
-                name = extract_name_heuristic(text)
-
-            # 3. Upload PDF to Supabase Storage
-            safe_filename = file.name.replace(" ", "_")
-            storage_path = f"{batch_name}/{uuid.uuid4().hex}_{safe_filename}"
-            upload_pdf(pdf_bytes, storage_path)
-
-            # 4. Generate embedding
-            embedding = get_embedding(text)
-
-            # 5. Insert into DB
-            insert_resume(
-                batch_name=batch_name,
-                candidate_name=name,
-                file_name=file.name,
-                storage_path=storage_path,
-                extracted_text=text,
-                embedding=embedding,
-            )
-
-            success_count += 1
-
-        except Exception as e:
-            errors.append(f"{file.name}: {e}")
-
-    progress.progress(1.0, text="Done!")
-
-    if success_count:
-        st.success(f"✅ {success_count} resume{'s' if success_count != 1 else ''} uploaded to batch **{batch_name}**")
-
-    if errors:
-        st.warning(f"{len(errors)} file(s) had issues:")
-        for err in errors:
-            st.markdown(f"- {err}")
+SOURCES = ["PDF files", "ZIP archive"] + (["Server folder"] if jobs.IMPORT_ROOT else [])
+source = st.radio("Upload", SOURCES, horizontal=True, label_visibility="collapsed")
+
+uploaded_files = None
+uploaded_zip = None
+server_path = ""
+if source == "PDF files":
+    uploaded_files = st.file_uploader(
+        "Select PDF resumes",
+        type=["pdf"],
+        accept_multiple_files=True,
+    )
+elif source == "ZIP archive":
+    uploaded_zip = st.file_uploader(
+        "Select a ZIP archive of PDF resumes",
+        type=["zip"],
+        help="PDFs anywhere in the archive are queued one at a time as they are unpacked.",
+    )
+else:
+    server_path = st.text_input(
+        "Folder or ZIP archive on the server",
+        placeholder="e.g. 2026-02/senior-eng or 2026-02/senior-eng.zip",
+        help=f"Relative to {jobs.IMPORT_ROOT}. Files are read from there directly, never held in memory.",
+    )
+
+ready = bool(batch_name and (uploaded_files or uploaded_zip or server_path))
+if st.button("Upload & Process", type="primary", disabled=not ready):
+    # Holds an uploaded or server-side ZIP archive open until its files are spooled
+    archive = ExitStack()
+    try:
+        if uploaded_files:
+            files = uploaded_files
+        elif uploaded_zip:
+            files = archive.enter_context(jobs.zip_entries(uploaded_zip))
+        else:
+            path = jobs.resolve_import_path(server_path)
+            files = jobs.folder_files(path) if os.path.isdir(path) else archive.enter_context(jobs.zip_entries(path))
+    except (ValueError, OSError, zipfile.BadZipFile) as e:
+        st.error(f"Could not read {server_path or 'the archive'}: {e}")
+        st.stop()
+    with archive:
+        if not files:
+            st.warning("No PDF files found.")
+            st.stop()
+
+        count = len(files)
+        progress = st.progress(0.0, text=f"Queueing {count} files...")
+        jobs.ensure_workers()
+        job_id = jobs.create_job(
+            batch_name,
+            files,
+            on_progress=lambda queued: progress.progress(queued / count, text=f"Queued {queued}/{count} files..."),
+        )
+    progress.empty()
+    st.session_state.setdefault("upload_job_ids", []).append(job_id)
+    st.success(
+        f"✅ {count} file{'s' if count != 1 else ''} queued for batch **{batch_name}**. "
+        "Processing continues in the background — you can close this tab."
+    )
+    st.page_link("pages/7_Jobs.py", label="Follow progress on Upload Jobs", icon="⏳")
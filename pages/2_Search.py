@@ -1,12 +1,49 @@
 import streamlit as st
-from lib.db import list_batches, search_by_embedding, shortlist_candidates
-from lib.ai import get_embedding, score_candidates
-from lib.storage import get_signed_url
+from lib import jobs
+from lib.db import get_resumes_by_ids, list_batches, shortlist_candidates
+from lib.ai import (
+    ScoreUsage,
+    get_query_embedding,
+    query_cache_stats,
+    rate_limiter_stats,
+    score_candidates,
+    score_candidates_stream,
+)
+from lib.cascade import POOL_SIZE, savings, select_for_llm
+from lib.search import hybrid_search
+from lib.storage import get_signed_urls
 
 st.set_page_config(page_title="Search Candidates", page_icon="🔍", layout="wide")
 st.title("Search Candidates")
 
+
+# Only these fields of each hit are kept in session state; full text is
+# fetched on demand when a card's text is shown.
+CARD_FIELDS = ("candidate_name", "batch_name", "file_name", "storage_path")
+
+
+def score_badge(score: int) -> str:
+    if score >= 80:
+        return f"🟢 {score}/100"
+    elif score >= 60:
+        return f"🟡 {score}/100"
+    return f"🔴 {score}/100"
+
+
+# ── Query cache stats ──────────────────────────────────────────────────────────
+cache_stats = query_cache_stats()
+st.sidebar.caption(
+    f"Query cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses · "
+    f"~{cache_stats['saved_seconds']:.1f}s saved"
+)
+limiter_stats = rate_limiter_stats()
+st.sidebar.caption(
+    f"Gemini: {limiter_stats['in_flight']} in flight · {limiter_stats['waiting']} queued · "
+    f"{limiter_stats['throttled']} throttled"
+)
+
 # ── Batch selector ────────────────────────────────────────────────────────────
+jobs.sync_read_cache()  # pick up resumes stored by upload workers
 batches = list_batches()
 
 if not batches:
@@ -31,27 +68,61 @@ query = st.text_area(
     height=120,
 )
 
+stream_results = st.toggle(
+    "Show results as they are scored",
+    value=True,
+    help="Render each candidate as soon as Gemini finishes scoring it.",
+)
+
 if st.button("Search", type="primary", disabled=not query.strip()):
     st.session_state.pop("search_results", None)
     st.session_state.pop("search_candidate_map", None)
+    st.session_state.pop("search_cascade_report", None)
 
     with st.spinner("Searching resumes..."):
-        query_embedding = get_embedding(query)
-        candidates = search_by_embedding(
+        query_embedding = get_query_embedding(query)
+        candidates = hybrid_search(
+            query=query,
             query_embedding=query_embedding,
             batch_filter=batch_filter,
-            limit=20,
+            limit=POOL_SIZE,
         )
 
     if not candidates:
         st.warning("No matching resumes found. Try a different query or check that resumes have been uploaded.")
         st.stop()
 
-    with st.spinner(f"Scoring {len(candidates)} candidates with Gemini..."):
-        scored = score_candidates(query, candidates)
+    # Rank the pool locally and only send the most promising to Gemini
+    candidates, cascade_report = select_for_llm(query, candidates)
+    usage = ScoreUsage()
+
+    if stream_results:
+        # Live, widget-free preview re-sorted as each score arrives; the full
+        # interactive cards are rendered below once scoring is complete.
+        names = {c["id"]: c.get("candidate_name", "Unknown") for c in candidates}
+        live = st.empty()
+        scored = []
+        for result in score_candidates_stream(query, candidates, usage):
+            scored.append(result)
+            scored.sort(key=lambda x: x.get("score", 0), reverse=True)
+            with live.container():
+                st.caption(f"Scored {len(scored)}/{len(candidates)} candidates with Gemini...")
+                for rank, r in enumerate(scored, start=1):
+                    st.markdown(
+                        f"**{rank}. {names.get(r.get('id'), 'Unknown')}** · {score_badge(r.get('score', 0))}  \n"
+                        f"*{r.get('summary', '')}*"
+                    )
+        live.empty()
+    else:
+        with st.spinner(f"Scoring {len(candidates)} candidates with Gemini..."):
+            scored = score_candidates(query, candidates, usage)
+    cascade_report.update(savings(cascade_report, usage))
 
     st.session_state["search_results"] = scored
-    st.session_state["search_candidate_map"] = {c["id"]: c for c in candidates}
+    st.session_state["search_candidate_map"] = {
+        c["id"]: {k: c.get(k) for k in CARD_FIELDS} for c in candidates
+    }
+    st.session_state["search_cascade_report"] = cascade_report
 
 # ── Render results ─────────────────────────────────────────────────────────────
 if "search_results" in st.session_state:
@@ -72,6 +143,30 @@ if "search_results" in st.session_state:
 
     st.markdown(f"### Top {len(scored)} Results")
 
+    report = st.session_state.get("search_cascade_report")
+    if report:
+        caption = (
+            f"Ranked {report['retrieved']} candidates locally, sent {report['sent_to_llm']} to Gemini"
+            f"{' (early cutoff)' if report['early_exit'] else ''}"
+        )
+        if "tokens_saved" in report:
+            caption += (
+                f" · used {report['llm_calls_used']} LLM calls / {report['tokens_used']:,} tokens; "
+                f"at that cost per candidate, skipping the other {report['skipped']} saved "
+                f"~{report['llm_calls_saved']} calls / ~{report['tokens_saved']:,} tokens (extrapolated)"
+            )
+        st.caption(caption)
+
+    # One bulk fetch for every card whose extracted text is switched on
+    shown_ids = [r.get("id") for r in scored if st.session_state.get(f"show_text_{r.get('id')}")]
+    full_text = {row["id"]: row["extracted_text"] for row in get_resumes_by_ids(shown_ids)}
+
+    # One signing request for every card (none on reruns while URLs are fresh)
+    try:
+        signed_urls = get_signed_urls([candidate_map.get(r.get("id"), {}).get("storage_path") for r in scored])
+    except Exception:
+        signed_urls = {}
+
     for rank, result in enumerate(scored, start=1):
         candidate_id = result.get("id")
         score = result.get("score", 0)
@@ -83,12 +178,7 @@ if "search_results" in st.session_state:
         batch = candidate.get("batch_name", "")
         file_name = candidate.get("file_name", "")
 
-        if score >= 80:
-            badge = f"🟢 {score}/100"
-        elif score >= 60:
-            badge = f"🟡 {score}/100"
-        else:
-            badge = f"🔴 {score}/100"
+        badge = score_badge(score)
 
         with st.container(border=True):
             col_name, col_score, col_btn = st.columns([3, 1, 1])
@@ -122,15 +212,14 @@ if "search_results" in st.session_state:
                 st.markdown(f"**Gap:** {gaps}")
 
             with st.expander("View Resume"):
-                try:
-                    signed_url = get_signed_url(candidate.get("storage_path", ""))
+                signed_url = signed_urls.get(candidate.get("storage_path"))
+                if signed_url:
                     st.link_button("Download Original PDF", signed_url, icon="⬇️")
-                except Exception:
-                    pass
-                st.text_area(
-                    label="Extracted Text",
-                    value=candidate.get("extracted_text", ""),
-                    height=400,
-                    label_visibility="collapsed",
-                    key=f"text_{candidate_id}",
-                )
+                if st.toggle("Show extracted text", key=f"show_text_{candidate_id}"):
+                    st.text_area(
+                        label="Extracted Text",
+                        value=full_text.get(candidate_id, ""),
+                        height=400,
+                        label_visibility="collapsed",
+                        key=f"text_{candidate_id}",
+                    )
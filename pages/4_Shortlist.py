@@ -1,5 +1,6 @@
+import math
 import streamlit as st
-from lib.db import list_shortlist_roles, list_shortlisted, update_shortlist, remove_from_shortlist
+from lib.db import list_shortlist_roles, list_shortlisted_page, update_shortlists, remove_from_shortlist
 
 st.set_page_config(page_title="Shortlisted Candidates", page_icon="⭐", layout="wide")
 st.title("Shortlisted Candidates")
@@ -14,6 +15,29 @@ STATUS_ICON = {
     "Rejected":    "🔴",
 }
 
+PAGE_SIZES = [10, 25, 50, 100]
+
+# Unsaved edits by shortlist id, kept across pages until saved or discarded
+edits: dict[str, dict] = st.session_state.setdefault("shortlist_edits", {})
+
+
+def record_edit(entry: dict):
+    """Widget callback: remember the entry's edited status/notes, or forget it if unchanged."""
+    shortlist_id = entry["id"]
+    status = st.session_state[f"status_{shortlist_id}"]
+    notes = st.session_state[f"notes_{shortlist_id}"]
+    if status == entry.get("status", "Shortlisted") and notes == (entry.get("notes", "") or ""):
+        edits.pop(shortlist_id, None)
+    else:
+        edits[shortlist_id] = {
+            "id": shortlist_id,
+            "resume_id": entry["resume_id"],
+            "role_name": entry["role_name"],
+            "status": status,
+            "notes": notes,
+        }
+
+
 # ── Role filter ───────────────────────────────────────────────────────────────
 roles = list_shortlist_roles()
 
@@ -21,14 +45,57 @@ if not roles:
     st.info("No candidates shortlisted yet. Go to **Search Candidates**, check candidates, and click **Shortlist Selected**.")
     st.stop()
 
-role_options = ["All roles"] + roles
-selected_role = st.selectbox("Filter by role", options=role_options)
+col_role, col_status, col_name, col_size = st.columns([2, 2, 2, 1])
+with col_role:
+    role_options = ["All roles"] + roles
+    selected_role = st.selectbox("Filter by role", options=role_options)
+with col_status:
+    status_filter = st.multiselect("Filter by status", options=STATUSES)
+with col_name:
+    name_search = st.text_input("Search by name", placeholder="Candidate name...")
+with col_size:
+    page_size = st.selectbox("Per page", options=PAGE_SIZES, index=1)
 
 role_filter = None if selected_role == "All roles" else selected_role
 
-# ── Load candidates ───────────────────────────────────────────────────────────
-candidates = list_shortlisted(role_filter=role_filter)
+# Go back to the first page whenever the filters change
+filters = (role_filter, tuple(status_filter), name_search.strip(), page_size)
+if st.session_state.get("shortlist_filters") != filters:
+    st.session_state["shortlist_filters"] = filters
+    st.session_state["shortlist_page"] = 0
+page = st.session_state.get("shortlist_page", 0)
+
+# ── Pending edits ─────────────────────────────────────────────────────────────
+if edits:
+    col_msg, col_save, col_discard = st.columns([4, 1, 1])
+    with col_msg:
+        st.info(f"{len(edits)} unsaved change{'s' if len(edits) != 1 else ''}")
+    with col_save:
+        if st.button("Save all", type="primary"):
+            update_shortlists(list(edits.values()))
+            edits.clear()
+            st.rerun()
+    with col_discard:
+        if st.button("Discard"):
+            for shortlist_id in list(edits):
+                st.session_state.pop(f"status_{shortlist_id}", None)
+                st.session_state.pop(f"notes_{shortlist_id}", None)
+            edits.clear()
+            st.rerun()
 
+# ── Load candidates ───────────────────────────────────────────────────────────
+candidates, total = list_shortlisted_page(
+    role_filter=role_filter,
+    status_filter=status_filter or None,
+    name_search=name_search.strip() or None,
+    page=page,
+    page_size=page_size,
+)
+
+if not candidates and page > 0 and total:
+    # Past the last page, e.g. after entries were removed: show the last one
+    st.session_state["shortlist_page"] = math.ceil(total / page_size) - 1
+    st.rerun()
 if not candidates:
     st.info("No candidates found for this role.")
     st.stop()
@@ -48,9 +115,9 @@ for role, entries in by_role.items():
         name = entry.get("candidate_name") or "Unknown"
         file_name = entry.get("file_name", "")
         batch = entry.get("batch_name", "")
-        current_status = entry.get("status", "Shortlisted")
-        current_notes = entry.get("notes", "") or ""
-        icon = STATUS_ICON.get(current_status, "⚪")
+        edit = edits.get(shortlist_id, {})
+        current_status = edit.get("status", entry.get("status", "Shortlisted"))
+        current_notes = edit.get("notes", entry.get("notes", "") or "")
 
         with st.container(border=True):
             live_status = st.session_state.get(f"status_{shortlist_id}", current_status)
@@ -58,7 +125,7 @@ for role, entries in by_role.items():
 
             col_name, col_status = st.columns([3, 1])
             with col_name:
-                st.markdown(f"**{name}**")
+                st.markdown(f"**{name}**" + ("  ✏️" if shortlist_id in edits else ""))
                 st.caption(f"{file_name} · Batch: {batch}")
             with col_status:
                 st.markdown(f"### {live_icon} {live_status}")
@@ -66,32 +133,45 @@ for role, entries in by_role.items():
             col_select, col_notes, col_actions = st.columns([1, 2, 1])
 
             with col_select:
-                new_status = st.selectbox(
+                st.selectbox(
                     "Status",
                     options=STATUSES,
                     index=STATUSES.index(current_status),
                     key=f"status_{shortlist_id}",
                     label_visibility="collapsed",
+                    on_change=record_edit,
+                    args=(entry,),
                 )
 
             with col_notes:
-                new_notes = st.text_input(
+                st.text_input(
                     "Notes",
                     value=current_notes,
                     placeholder="Add notes...",
                     key=f"notes_{shortlist_id}",
                     label_visibility="collapsed",
+                    on_change=record_edit,
+                    args=(entry,),
                 )
 
             with col_actions:
-                col_save, col_remove = st.columns(2)
-                with col_save:
-                    if st.button("Save", key=f"save_{shortlist_id}", type="primary"):
-                        update_shortlist(shortlist_id, new_status, new_notes)
-                        st.rerun()
-                with col_remove:
-                    if st.button("Remove", key=f"remove_{shortlist_id}"):
-                        remove_from_shortlist(shortlist_id)
-                        st.rerun()
+                if st.button("Remove", key=f"remove_{shortlist_id}"):
+                    remove_from_shortlist(shortlist_id)
+                    edits.pop(shortlist_id, None)
+                    st.rerun()
 
     st.divider()
+
+# ── Pagination ────────────────────────────────────────────────────────────────
+page_count = max(1, math.ceil(total / page_size))
+col_prev, col_info, col_next = st.columns([1, 4, 1])
+with col_prev:
+    if st.button("← Previous", disabled=page == 0):
+        st.session_state["shortlist_page"] = page - 1
+        st.rerun()
+with col_info:
+    st.caption(f"Page {page + 1} of {page_count} · {total} candidate{'s' if total != 1 else ''}")
+with col_next:
+    if st.button("Next →", disabled=page + 1 >= page_count):
+        st.session_state["shortlist_page"] = page + 1
+        st.rerun()
@@ -1,4 +1,5 @@
 import streamlit as st
+from lib import jobs
 from lib.db import get_batch_stats
 
 st.set_page_config(page_title="Database", page_icon="🗄️", layout="wide")
@@ -6,6 +7,7 @@ st.title("Database")
 st.caption("All resume batches currently stored.")
 
 try:
+    jobs.sync_read_cache()  # pick up resumes stored by upload workers
     batches = get_batch_stats()
 except Exception as e:
     st.error(f"Could not load database: {e}")
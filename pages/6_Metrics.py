@@ -0,0 +1,133 @@
+import json
+import streamlit as st
+from lib import jobs, metrics
+from lib.metrics import BUCKETS
+
+st.set_page_config(page_title="Metrics", page_icon="📈", layout="wide")
+st.title("Metrics")
+st.caption(
+    "Per-stage latency of the search and ingest pipelines: calls made in this server process, "
+    "merged with the metrics the upload workers (see Upload Jobs) save with each heartbeat."
+)
+
+
+def bucket_label(bound: float | None) -> str:
+    if bound is None:
+        return f"> {BUCKETS[-1]:g}s"
+    return f"≤ {bound * 1000:g} ms" if bound < 1 else f"≤ {bound:g} s"
+
+
+snapshot = metrics.merge([metrics.to_json(recent=metrics.RECENT_SPANS), *jobs.worker_metrics()])
+summary = snapshot["stages"]
+
+col_refresh, col_text, col_json, col_reset = st.columns([1, 1, 1, 1])
+with col_refresh:
+    if st.button("Refresh"):
+        st.rerun()
+with col_text:
+    st.download_button(
+        "OpenMetrics",
+        data=metrics.to_openmetrics(snapshot),
+        file_name="metrics.txt",
+        mime="application/openmetrics-text",
+    )
+with col_json:
+    st.download_button(
+        "JSON",
+        data=json.dumps({k: v for k, v in snapshot.items() if k != "recent"}, indent=2),
+        file_name="metrics.json",
+        mime="application/json",
+    )
+with col_reset:
+    if st.button("Reset"):
+        metrics.reset()
+        jobs.reset_worker_metrics()
+        st.rerun()
+
+if not summary:
+    st.info("No activity recorded yet. Upload or search to collect metrics.")
+    st.stop()
+
+# ── Per-stage summary ─────────────────────────────────────────────────────────
+st.subheader("Stages")
+st.dataframe(
+    [
+        {
+            "Stage": s["stage"],
+            "Calls": s["calls"],
+            "Errors": s["errors"],
+            "Mean (ms)": round(s["mean_ms"], 1),
+            "p50 (ms)": round(s.get("p50_ms", 0), 1),
+            "p95 (ms)": round(s.get("p95_ms", 0), 1),
+            "p99 (ms)": round(s.get("p99_ms", 0), 1),
+        }
+        for s in summary
+    ],
+    hide_index=True,
+)
+
+# ── Recent latency histogram ──────────────────────────────────────────────────
+st.subheader("Recent latency")
+stage = st.selectbox("Stage", options=[s["stage"] for s in summary])
+spans = [sp for sp in snapshot["recent"] if sp["stage"] == stage]
+
+labels = [bucket_label(b) for b in [*BUCKETS, None]]
+counts = [0] * len(labels)
+for sp in spans:
+    for i, bound in enumerate(BUCKETS):
+        if sp["duration"] <= bound:
+            counts[i] += 1
+            break
+    else:
+        counts[-1] += 1
+# Trim empty buckets at both ends so the chart focuses on the observed range
+nonzero = [i for i, n in enumerate(counts) if n]
+lo, hi = (nonzero[0], nonzero[-1] + 1) if nonzero else (0, len(counts))
+st.bar_chart(
+    {"Latency": labels[lo:hi], "Calls": counts[lo:hi]},
+    x="Latency",
+    y="Calls",
+)
+st.caption(f"Last {len(spans)} call{'s' if len(spans) != 1 else ''} of {stage}.")
+
+with st.expander("Recent calls"):
+    st.dataframe(
+        [
+            {
+                "Duration (ms)": round(sp["duration"] * 1000, 1),
+                "Status": sp["status"],
+                "Attributes": ", ".join(f"{k}={v}" for k, v in sp["attrs"].items()),
+                "Error": sp["error"] or "",
+            }
+            for sp in reversed(spans[-200:])
+        ],
+        hide_index=True,
+    )
+
+# ── Gemini rate limiter ───────────────────────────────────────────────────────
+limiter = snapshot["gauges"].get("gemini_limiter")
+if limiter:
+    st.subheader("Gemini rate limiter")
+    st.caption("Summed over this server process and the upload workers.")
+    cols = st.columns(5)
+    cols[0].metric("Calls", f"{limiter.get('calls', 0):g}")
+    cols[1].metric("In flight / queued", f"{limiter.get('in_flight', 0):g} / {limiter.get('waiting', 0):g}")
+    cols[2].metric("Throttled", f"{limiter.get('throttled', 0):g}")
+    cols[3].metric("Retries / failures", f"{limiter.get('retries', 0):g} / {limiter.get('failures', 0):g}")
+    cols[4].metric("Time queued", f"{limiter.get('wait_seconds', 0):.1f} s")
+
+# ── Counters ──────────────────────────────────────────────────────────────────
+counters = snapshot["counters"]
+if counters:
+    st.subheader("Counters")
+    st.dataframe(
+        [
+            {
+                "Counter": c["name"],
+                "Labels": ", ".join(f"{k}={v}" for k, v in c["labels"].items()),
+                "Value": c["value"],
+            }
+            for c in counters
+        ],
+        hide_index=True,
+    )
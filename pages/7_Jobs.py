@@ -0,0 +1,78 @@
+import time
+from datetime import datetime
+import streamlit as st
+from lib import jobs
+
+st.set_page_config(page_title="Upload Jobs", page_icon="⏳", layout="wide")
+st.title("Upload Jobs")
+st.caption("Uploads are processed by background workers and keep going if you close the tab.")
+
+REFRESH_SECONDS = 2
+
+STATUS_ICON = {
+    "spooling":  "🟡",
+    "queued":    "⚪",
+    "running":   "🔵",
+    "done":      "🟢",
+    "cancelled": "🔴",
+}
+
+job_list = jobs.list_jobs(limit=25)
+workers = jobs.live_workers()
+
+col_workers, col_refresh = st.columns([4, 1])
+with col_workers:
+    st.caption(
+        f"{len(workers)} worker{'s' if len(workers) != 1 else ''} running · "
+        f"{sum(w['files_done'] for w in workers)} files processed by current workers"
+    )
+with col_refresh:
+    auto_refresh = st.toggle("Auto-refresh", value=True)
+
+if not job_list:
+    st.info("No uploads yet. Go to **Upload Resumes** to queue a batch.")
+    st.stop()
+
+# Queued work but no workers (e.g. after a restart): start them again
+if any(j["status"] in ("spooling", "queued", "running") for j in job_list) and not workers:
+    jobs.ensure_workers()
+
+for job in job_list:
+    counts = job["counts"]
+    total = job["total"]
+    with st.container(border=True):
+        col_name, col_status = st.columns([3, 1])
+        with col_name:
+            started = datetime.fromtimestamp(job["created_at"]).strftime("%Y-%m-%d %H:%M")
+            st.markdown(f"**{job['batch_name']}**")
+            st.caption(f"{total} file{'s' if total != 1 else ''} · queued {started}")
+        with col_status:
+            st.markdown(f"### {STATUS_ICON.get(job['status'], '⚪')} {job['status'].title()}")
+
+        st.progress(job["finished"] / total if total else float(job["status"] != "spooling"), text=f"{job['finished']}/{total} processed")
+        st.caption(
+            f"✅ {counts['done']} uploaded · {counts['duplicate']} duplicate · "
+            f"⚠️ {counts['error']} failed" + (f" · {counts['cancelled']} cancelled" if counts["cancelled"] else "")
+        )
+        if job.get("error"):
+            st.warning(job["error"])
+
+        col_errors, col_retry, col_cancel = st.columns([4, 1, 1])
+        with col_errors:
+            if counts["error"]:
+                with st.expander(f"{counts['error']} file(s) had issues"):
+                    for f in jobs.job_files(job["job_id"], states=("error",)):
+                        st.markdown(f"- {f['file_name']}: {f['error']}")
+        with col_retry:
+            if counts["error"] and st.button("Retry failed", key=f"retry_{job['job_id']}"):
+                jobs.retry_failed(job["job_id"])
+                jobs.ensure_workers()
+                st.rerun()
+        with col_cancel:
+            if job["status"] in ("spooling", "queued", "running") and st.button("Cancel", key=f"cancel_{job['job_id']}"):
+                jobs.cancel_job(job["job_id"])
+                st.rerun()
+
+if auto_refresh and any(j["status"] in ("spooling", "queued", "running") for j in job_list):
+    time.sleep(REFRESH_SECONDS)
+    st.rerun()
@@ -0,0 +1,9 @@
+-- Content hashes used to de-duplicate re-uploaded resumes at ingest.
+-- content_hash: sha256 of the raw PDF bytes
+-- text_hash:    sha256 of the extracted text
+
+alter table resumes add column if not exists content_hash text;
+alter table resumes add column if not exists text_hash text;
+
+create index if not exists resumes_content_hash_idx on resumes (content_hash);
+create index if not exists resumes_text_hash_idx on resumes (text_hash);
@@ -0,0 +1,21 @@
+-- Server-side aggregates for the batch and role listings, so page loads no
+-- longer download every resumes / shortlists row to count them in Python.
+
+create or replace view batch_stats as
+select
+    batch_name,
+    count(*)         as count,
+    max(upload_date) as latest
+from resumes
+group by batch_name;
+
+create or replace view shortlist_roles as
+select
+    role_name,
+    count(*)            as count,
+    max(shortlisted_at) as latest
+from shortlists
+group by role_name;
+
+create index if not exists resumes_batch_name_upload_date_idx on resumes (batch_name, upload_date desc);
+create index if not exists shortlists_role_name_shortlisted_at_idx on shortlists (role_name, shortlisted_at desc);
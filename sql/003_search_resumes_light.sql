@@ -0,0 +1,37 @@
+-- Light variant of search_resumes: returns display columns plus the first
+-- 1500 characters of text (what the scorer reads) instead of the full
+-- extracted_text. Full text is fetched on demand with get_resumes_by_ids.
+
+create or replace function search_resumes_light(
+    query_embedding vector,
+    match_count int,
+    batch_names text[]
+)
+returns table (
+    id             uuid,
+    batch_name     text,
+    candidate_name text,
+    file_name      text,
+    storage_path   text,
+    upload_date    timestamptz,
+    text_hash      text,
+    text_excerpt   text,
+    similarity     float
+)
+language sql stable
+as $$
+    select
+        r.id,
+        r.batch_name,
+        r.candidate_name,
+        r.file_name,
+        r.storage_path,
+        r.upload_date,
+        r.text_hash,
+        left(r.extracted_text, 1500) as text_excerpt,
+        1 - (r.embedding <=> query_embedding) as similarity
+    from resumes r
+    where cardinality(batch_names) = 0 or r.batch_name = any(batch_names)
+    order by r.embedding <=> query_embedding
+    limit match_count;
+$$;
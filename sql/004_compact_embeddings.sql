@@ -0,0 +1,62 @@
+-- Compact embeddings for two-phase search (SEARCH_TWO_PHASE=1).
+-- embedding_compact is the first 768 dimensions of each embedding,
+-- re-normalized and stored at half precision. gemini-embedding-001 is trained
+-- so that this prefix is what output_dimensionality=768 returns, which keeps
+-- most of the ranking quality in 1.5 KB per row instead of 12 KB, and fits
+-- pgvector's HNSW dimension limit. Requires pgvector 0.7+ and an embedding
+-- column of at least 768 dimensions (see EMBED_DIMENSIONS).
+
+alter table resumes add column if not exists embedding_compact halfvec(768)
+    generated always as (l2_normalize(subvector(embedding, 1, 768))::halfvec(768)) stored;
+
+create index if not exists resumes_embedding_compact_idx
+    on resumes using hnsw (embedding_compact halfvec_cosine_ops);
+
+-- Coarse candidates from the compact column, then exact rescoring of those
+-- candidates with the full embedding. Returns the columns of search_resumes_light.
+create or replace function search_resumes_two_phase(
+    query_embedding vector,
+    match_count int,
+    batch_names text[],
+    candidate_count int
+)
+returns table (
+    id             uuid,
+    batch_name     text,
+    candidate_name text,
+    file_name      text,
+    storage_path   text,
+    upload_date    timestamptz,
+    text_hash      text,
+    text_excerpt   text,
+    similarity     float
+)
+language plpgsql
+as $$
+begin
+    -- An HNSW scan returns at most ef_search rows
+    perform set_config('hnsw.ef_search', greatest(candidate_count, 40)::text, true);
+    return query
+    with candidates as (
+        select r.id
+        from resumes r
+        where cardinality(batch_names) = 0 or r.batch_name = any(batch_names)
+        order by r.embedding_compact <=> l2_normalize(subvector(query_embedding, 1, 768))::halfvec(768)
+        limit candidate_count
+    )
+    select
+        r.id,
+        r.batch_name,
+        r.candidate_name,
+        r.file_name,
+        r.storage_path,
+        r.upload_date,
+        r.text_hash,
+        left(r.extracted_text, 1500) as text_excerpt,
+        1 - (r.embedding <=> query_embedding) as similarity
+    from candidates c
+    join resumes r on r.id = c.id
+    order by r.embedding <=> query_embedding
+    limit match_count;
+end;
+$$;
@@ -0,0 +1,16 @@
+-- Search rows by id without the full text: the display columns plus the first
+-- 1500 characters of text, like search_resumes_light. Read by
+-- select_search_rows, which fills in keyword-only hits and local-backend
+-- results, so those no longer download every resume's extracted_text.
+
+create or replace view resume_search_rows as
+select
+    id,
+    batch_name,
+    candidate_name,
+    file_name,
+    storage_path,
+    upload_date,
+    text_hash,
+    left(extracted_text, 1500) as text_excerpt
+from resumes;
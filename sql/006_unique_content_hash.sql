@@ -0,0 +1,13 @@
+-- One row per PDF per batch. Ingest already skips files whose content_hash is
+-- in the batch, but two workers (or sessions) processing the same file at the
+-- same time can both pass that check; insert_resumes upserts on this index
+-- with conflicts ignored, so the second insert becomes a no-op.
+--
+-- Creating the index fails if a batch already holds duplicates. List them with
+--   select batch_name, content_hash, array_agg(id order by upload_date)
+--   from resumes where content_hash is not null
+--   group by batch_name, content_hash having count(*) > 1;
+-- and delete all but the first id of each before applying this.
+
+create unique index if not exists resumes_batch_name_content_hash_key
+    on resumes (batch_name, content_hash);
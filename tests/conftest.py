@@ -0,0 +1,19 @@
+"""
+Tests run against the in-process fakes (lib/fakes.py), with every cache and
+the job queue in a scratch directory. Settings are read when lib modules are
+imported, so they are set here, before any test module imports them.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_scratch = tempfile.mkdtemp(prefix="resume-screener-tests-")
+os.environ["FAKE_SERVICES"] = "1"
+os.environ["EMBED_CACHE_PATH"] = os.path.join(_scratch, "embeddings.sqlite3")
+os.environ["SCORE_CACHE_PATH"] = os.path.join(_scratch, "scores.sqlite3")
+os.environ["LEXICAL_INDEX_PATH"] = os.path.join(_scratch, "lexical_index.sqlite3")
+os.environ["VECTOR_INDEX_DIR"] = os.path.join(_scratch, "vector_index")
+os.environ["JOBS_DB_PATH"] = os.path.join(_scratch, "jobs.sqlite3")
+os.environ["JOBS_SPOOL_DIR"] = os.path.join(_scratch, "job_spool")
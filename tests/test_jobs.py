@@ -0,0 +1,121 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from lib import jobs
+
+
+class _Upload(io.BytesIO):
+    def __init__(self, name: str):
+        super().__init__(b"%PDF-1.4 " + name.encode())
+        self.name = name
+
+
+@pytest.fixture
+def clock(tmp_path, monkeypatch):
+    """A fresh queue in tmp_path whose time only moves when the test advances it."""
+    monkeypatch.setattr(jobs, "JOBS_DB_PATH", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs, "SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(jobs, "_conn", None)
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(jobs, "time", SimpleNamespace(time=lambda: now.value))
+
+    def advance(seconds: float):
+        now.value += seconds
+
+    yield advance
+    if jobs._conn is not None:
+        jobs._conn.close()
+
+
+def _queue(n: int) -> str:
+    return jobs.create_job("batch", [_Upload(f"resume_{i}.pdf") for i in range(n)])
+
+
+def _states(job_id: str) -> list[str]:
+    return [f["state"] for f in jobs.job_files(job_id)]
+
+
+def _status(job_id: str) -> str:
+    return next(j["status"] for j in jobs.list_jobs() if j["job_id"] == job_id)
+
+
+def test_claim_leases_files_in_order_to_one_worker(clock):
+    job_id = _queue(3)
+    first = jobs.claim_files("w1", 2)
+    assert [(f["job_id"], f["idx"]) for f in first] == [(job_id, 0), (job_id, 1)]
+    assert first[0]["batch_name"] == "batch"
+    assert [f["idx"] for f in jobs.claim_files("w2", 5)] == [2]
+    assert jobs.claim_files("w3", 5) == []
+    assert _status(job_id) == "running"
+
+
+def test_expired_lease_is_claimed_again(clock):
+    _queue(1)
+    [file] = jobs.claim_files("w1", 1)
+    clock(jobs.LEASE_SECONDS - 1)
+    assert jobs.claim_files("w2", 1) == []
+    clock(2)
+    [again] = jobs.claim_files("w2", 1)
+    assert (again["idx"], again["attempts"]) == (file["idx"], 1)
+
+
+def test_heartbeat_extends_the_lease(clock):
+    jobs.register_worker("w1")
+    _queue(1)
+    jobs.claim_files("w1", 1)
+    clock(jobs.LEASE_SECONDS - 1)
+    jobs.heartbeat("w1")
+    clock(2)
+    assert jobs.claim_files("w2", 1) == []
+
+
+def test_unregister_releases_leases_straight_away(clock):
+    jobs.register_worker("w1")
+    _queue(2)
+    jobs.claim_files("w1", 2)
+    jobs.unregister_worker("w1")
+    assert [f["idx"] for f in jobs.claim_files("w2", 5)] == [0, 1]
+
+
+def test_complete_file_finishes_the_job(clock):
+    job_id = _queue(2)
+    for file in jobs.claim_files("w1", 2):
+        jobs.complete_file("w1", job_id, file["idx"], "done", resume_id=f"r{file['idx']}")
+    assert _states(job_id) == ["done", "done"]
+    assert _status(job_id) == "done"
+
+
+def test_gives_up_after_max_attempts_of_released_leases(clock):
+    job_id = _queue(1)
+    for _ in range(jobs.MAX_ATTEMPTS):
+        jobs.register_worker("w1")
+        assert len(jobs.claim_files("w1", 1)) == 1
+        jobs.unregister_worker("w1")
+    assert jobs.claim_files("w2", 1) == []
+    [file] = jobs.job_files(job_id)
+    assert file["state"] == "error"
+    assert f"gave up after {jobs.MAX_ATTEMPTS} attempts" in file["error"]
+    assert _status(job_id) == "done"
+
+
+def test_gives_up_after_max_attempts_of_expired_leases(clock):
+    job_id = _queue(1)
+    for _ in range(jobs.MAX_ATTEMPTS):
+        assert len(jobs.claim_files("w1", 1)) == 1
+        clock(jobs.LEASE_SECONDS + 1)
+    assert jobs.claim_files("w2", 1) == []
+    assert _states(job_id) == ["error"]
+
+
+def test_last_attempt_is_not_failed_while_its_lease_is_live(clock):
+    job_id = _queue(1)
+    for _ in range(jobs.MAX_ATTEMPTS - 1):
+        jobs.claim_files("w1", 1)
+        clock(jobs.LEASE_SECONDS + 1)
+    [file] = jobs.claim_files("w1", 1)
+    assert jobs.claim_files("w2", 1) == []
+    assert _states(job_id) == ["pending"]
+    jobs.complete_file("w1", job_id, file["idx"], "done")
+    assert _states(job_id) == ["done"]
@@ -0,0 +1,82 @@
+import json
+
+from lib import ai, fakes
+from lib.ai import _JsonArrayStream
+
+CANDIDATES = [
+    {"id": f"id-{i}", "candidate_name": f"Candidate {i}", "extracted_text": text}
+    for i, text in enumerate([
+        "Python engineer, machine learning and distributed systems",
+        "Frontend developer: React, TypeScript",
+        "Data engineer with Spark, Kafka and Python",
+    ])
+]
+QUERY = "Senior Python engineer with machine learning experience"
+
+
+def _feed_all(pieces: list[str]) -> list:
+    parser = _JsonArrayStream()
+    return [obj for piece in pieces for obj in parser.feed(piece)]
+
+
+def _fake_stream_pieces() -> list[str]:
+    stream = fakes.FakeGemini().models.generate_content_stream(
+        model=ai.SCORE_MODEL, contents=ai._build_score_prompt(QUERY, CANDIDATES)
+    )
+    return [piece.text for piece in stream]
+
+
+def test_fake_scoring_stream_parses_like_the_whole_response():
+    pieces = _fake_stream_pieces()
+    assert len(pieces) > 1
+    assert _feed_all(pieces) == json.loads("".join(pieces))
+
+
+def test_objects_split_at_any_point_are_parsed_once():
+    text = "".join(_fake_stream_pieces())
+    expected = json.loads(text)
+    for cut in range(1, len(text)):
+        assert _feed_all([text[:cut], text[cut:]]) == expected
+    assert _feed_all(list(text)) == expected
+
+
+def test_partial_object_is_held_back_until_complete():
+    parser = _JsonArrayStream()
+    assert parser.feed('[{"id": "a", "score": 9') == []
+    assert parser.feed('0}, {"id": "b"') == [{"id": "a", "score": 90}]
+    assert parser.feed(", \"score\": 10}]") == [{"id": "b", "score": 10}]
+
+
+def test_text_before_the_array_is_ignored():
+    pieces = ['```json\n{"not": "this"}\n', '[{"id": "a"}', "]\n```"]
+    assert _feed_all(pieces) == [{"id": "a"}]
+
+
+def test_braces_and_quotes_inside_strings():
+    text = '[{"id": "a", "reason": "uses {braces} and \\"quotes\\" \\\\"}, {"id": "b"}]'
+    expected = json.loads(text)
+    for cut in range(1, len(text)):
+        assert _feed_all([text[:cut], text[cut:]]) == expected
+
+
+def test_nested_objects_come_back_whole():
+    assert _feed_all(['[{"id": "a", "detail": {"skills": {"python": 1}}}', "]"]) == [
+        {"id": "a", "detail": {"skills": {"python": 1}}}
+    ]
+
+
+def test_malformed_object_is_skipped():
+    pieces = ['[{"id": "a", "score": }, ', '{"id": "b", "score": 70}, {"id": "c", ', '"score": 5,}]']
+    assert _feed_all(pieces) == [{"id": "b", "score": 70}]
+
+
+def test_truncated_stream_yields_only_complete_objects():
+    text = "".join(_fake_stream_pieces())
+    expected = json.loads(text)
+    cut = text.index("}", text.index("}") + 1) + 1  # just after the second object
+    assert _feed_all([text[:cut + 5]]) == expected[:2]
+
+
+def test_stream_chunk_yields_every_candidate_once():
+    results = list(ai._stream_chunk(QUERY, CANDIDATES))
+    assert sorted(r["id"] for r in results) == [c["id"] for c in CANDIDATES]
@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lib import ai, fakes
+from lib.rate_limit import RateLimiter
+
+PROMPT = ai._build_score_prompt(
+    "Python engineer",
+    [{"id": f"id-{i}", "candidate_name": f"Candidate {i}", "extracted_text": "Python " * 400} for i in range(5)],
+)
+
+
+@pytest.fixture
+def limiter():
+    # One slot, so a slot that isn't given back blocks the next call
+    return RateLimiter(max_rate=1000, max_concurrency=1)
+
+
+def _fake_stream(limiter: RateLimiter):
+    return limiter.stream(fakes.FakeGemini().models.generate_content_stream, model=ai.SCORE_MODEL, contents=PROMPT)
+
+
+def _assert_slot_free(limiter: RateLimiter):
+    assert limiter.stats()["in_flight"] == 0
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(limiter.call, lambda: "ok").result(timeout=5) == "ok"
+
+
+def test_slot_is_held_while_the_stream_is_open(limiter):
+    stream = _fake_stream(limiter)
+    next(stream)
+    assert limiter.stats()["in_flight"] == 1
+    stream.close()
+
+
+def test_slot_is_released_when_closed_early(limiter):
+    stream = _fake_stream(limiter)
+    next(stream)
+    stream.close()
+    _assert_slot_free(limiter)
+
+
+def test_slot_is_released_when_abandoned(limiter):
+    stream = _fake_stream(limiter)
+    next(stream)
+    del stream  # closed by garbage collection
+    _assert_slot_free(limiter)
+
+
+def test_slot_is_released_after_reading_to_the_end(limiter):
+    pieces = list(_fake_stream(limiter))
+    assert len(pieces) > 1
+    _assert_slot_free(limiter)
+
+
+def test_slot_is_released_when_the_stream_fails(limiter):
+    def failing():
+        yield "first"
+        raise ValueError("connection reset")
+
+    stream = limiter.stream(failing)
+    assert next(stream) == "first"
+    with pytest.raises(ValueError):
+        next(stream)
+    _assert_slot_free(limiter)
+
+
+def test_empty_stream_releases_its_slot(limiter):
+    assert list(limiter.stream(lambda: iter(()))) == []
+    _assert_slot_free(limiter)
+
+
+def test_unopened_stream_takes_no_slot(limiter):
+    stream = _fake_stream(limiter)
+    stream.close()
+    assert limiter.stats()["calls"] == 0
+    _assert_slot_free(limiter)